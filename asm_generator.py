@@ -0,0 +1,736 @@
+"""8086/TASM back end.
+
+AsmGenerator turns the typed AST (plus the SemanticContext of the same
+compilation) into a complete `.MODEL SMALL` / `.386` / `.387` program that
+includes `macros.asm` and `number.asm` and links against `numbers.asm`
+(atoi/itoa/atof/ftoa), as `assembler_final/run.bat` does for ejemplo.asm.
+
+Values are kept in registers instead of being spilled to memory after
+every operation:
+
+- Int/DateConverted/Bool expressions are evaluated in the 32-bit general
+  registers (EAX, EBX, ECX, EDX, ESI, EDI), visiting the heavier operand
+  first (Sethi-Ullman) and using immediates or memory operands for leaves.
+- Float expressions are evaluated on the x87 register stack, again with
+  memory operands for leaves (`fadd _x`, `fiadd _n`).
+
+Only when an expression needs more registers than available is an
+intermediate stored in a `__spillN` slot. `naive=True` instead lowers the
+quadruples one by one through memory (load operands, operate, store the
+temporary), which is the baseline the register lowering is measured
+against (benchmarks/bench_codegen.py). Only the naive lowering reads the
+quadruples and sees the IR passes of ir_passes; the register lowering gets
+the AST rewrites of ast_passes (see compiler.assemble).
+
+Generated names never collide with LyC identifiers (which start with a
+letter): variables are `_name`, temporaries `__tN`, numeric constants
+`__c_<value>` and strings `__sN`.
+"""
+from typing import Any, List, Optional
+
+from helpers import diccionarioComparadores, diccionarioComparadoresNot, equal_expressions_type
+
+# Branch mnemonic (as in diccionarioComparadores) -> jump after an integer
+# `cmp` (signed) and after an x87 compare + sahf (unsigned flags)
+JUMPS_INT = {'BLT': 'JL', 'BLE': 'JLE', 'BGT': 'JG', 'BGE': 'JGE', 'BEQ': 'JE', 'BNE': 'JNE', 'BI': 'JMP'}
+JUMPS_FPU = {'BLT': 'JB', 'BLE': 'JBE', 'BGT': 'JA', 'BGE': 'JAE', 'BEQ': 'JE', 'BNE': 'JNE', 'BI': 'JMP'}
+
+# Operators whose operands can be swapped so a leaf ends up on the right
+COMMUTATIVE = ('+', '*')
+
+INT_OPS = {'+': 'add', '-': 'sub', '*': 'imul'}
+FPU_OPS = {'+': 'fadd', '-': 'fsub', '*': 'fmul', '/': 'fdiv'}
+FPU_INT_OPS = {'+': 'fiadd', '-': 'fisub', '*': 'fimul', '/': 'fidiv'}
+# op st(1), st -> pop; the reversed forms for when operands were swapped
+FPU_POP_OPS = {'+': 'faddp', '-': 'fsubp', '*': 'fmulp', '/': 'fdivp'}
+FPU_POP_REV_OPS = {'+': 'faddp', '-': 'fsubrp', '*': 'fmulp', '/': 'fdivrp'}
+
+INT_REGS = ('eax', 'ebx', 'ecx', 'edx', 'esi', 'edi')
+FPU_DEPTH = 8
+
+INTEGER_TYPES = ('Int', 'DateConverted', 'Bool')
+MAXTEXTSIZE = 50
+
+# Pseudo mnemonic used for labels in the instruction list
+LABEL = 'LABEL'
+
+
+def is_ast(obj: Any) -> bool:
+    return hasattr(obj, 'nodetype') and hasattr(obj, 'children')
+
+
+class AsmGenerator:
+    def __init__(self, sem: Any = None, naive: bool = False):
+        self.sem = sem
+        self.naive = naive
+        self.reset()
+
+    def reset(self) -> None:
+        # code: list of (mnemonic, operands tuple); labels use LABEL
+        self.code = []
+        self.labels = 0
+        self.spills = 0
+        self.arrays = {}       # data name -> (dtype, length) for equalExpressions
+        self.params = []       # pending PARAM operands (naive lowering)
+        self.strings = {}      # literal text -> data name
+        self.constants = {}    # data name -> (dtype, literal text)
+        self.variables = {}    # data name -> dtype
+        self.temps = {}        # temporary name (as in the AST/IR) -> dtype
+        self.need_cache = {}
+
+    # -- helpers ------------------------------------------------------------
+
+    def emit(self, op: str, *args: str) -> None:
+        self.code.append((op, args))
+
+    def label(self, name: str) -> None:
+        self.code.append((LABEL, (name,)))
+
+    def new_label(self) -> str:
+        self.labels += 1
+        return f'ET_{self.labels}'
+
+    def new_spill(self, dtype: str) -> str:
+        self.spills += 1
+        name = f'__spill{self.spills}'
+        self.variables[name] = dtype
+        return name
+
+    def is_variable(self, name: str) -> bool:
+        if self.sem is None:
+            return name[:1].isalpha() and name not in ('true', 'false')
+        entry = self.sem.symbols.get(name)
+        return bool(entry and entry.get('tipo')) and not name.startswith('_')
+
+    def is_temp(self, obj: Any) -> bool:
+        return isinstance(obj, str) and obj.startswith('_t')
+
+    def dtype_of(self, obj: Any) -> Optional[str]:
+        if is_ast(obj):
+            return obj.dtype
+        if self.is_temp(obj):
+            return self.temps.get(obj)
+        entry = self.sem.symbols.get(obj) if self.sem is not None else None
+        return entry.get('tipo') if entry else None
+
+    def is_leaf(self, obj: Any) -> bool:
+        return not is_ast(obj) or not obj.children
+
+    def leaf_name(self, obj: Any) -> str:
+        return obj.nodetype if is_ast(obj) else obj
+
+    # -- data names ---------------------------------------------------------
+
+    def var_name(self, name: str, dtype: Optional[str] = None) -> str:
+        if self.is_temp(name):
+            asm = '__' + name[1:]
+        else:
+            asm = '_' + name
+        if dtype is not None:
+            self.variables.setdefault(asm, dtype)
+        return asm
+
+    def const_name(self, text: str, dtype: str) -> str:
+        # Memory copy of a numeric literal (for fld/fild and naive lowering)
+        safe = text.replace('-', 'neg').replace('.', '_').replace('+', '')
+        name = f'__c_{safe}' if dtype != 'Float' else f'__cf_{safe}'
+        self.constants.setdefault(name, (dtype, text))
+        return name
+
+    def string_name(self, text: str) -> str:
+        name = self.strings.get(text)
+        if name is None:
+            name = f'__s{len(self.strings) + 1}'
+            self.strings[text] = name
+        return name
+
+    def int_value(self, leaf: Any) -> Optional[str]:
+        # Immediate value of an integer literal leaf, None for anything else
+        name = self.leaf_name(leaf)
+        if name == 'true':
+            return '1'
+        if name == 'false':
+            return '0'
+        if is_ast(leaf) and leaf.nodetype == 'ConvDate':
+            dia, mes, anio = map(int, leaf.value.split('-'))
+            return str(anio * 10000 + mes * 100 + dia)
+        if self.is_temp(name) or self.is_variable(name):
+            return None
+        if self.dtype_of(leaf) in INTEGER_TYPES:
+            try:
+                return str(int(name))
+            except ValueError:
+                return None
+        return None
+
+    def memory(self, leaf: Any) -> str:
+        # Memory operand holding the value of a leaf
+        name = self.leaf_name(leaf)
+        dtype = self.dtype_of(leaf)
+        if self.is_temp(name) or self.is_variable(name):
+            return self.var_name(name, dtype)
+        value = self.int_value(leaf)
+        if value is not None:
+            return self.const_name(value, 'Int')
+        return self.const_name(name, dtype or 'Float')
+
+    def int_operand(self, leaf: Any) -> str:
+        # Immediate when possible, memory operand otherwise
+        value = self.int_value(leaf)
+        if value is not None:
+            return value
+        return self.memory(leaf)
+
+    def is_float(self, obj: Any) -> bool:
+        return self.dtype_of(obj) == 'Float'
+
+    # -- program ------------------------------------------------------------
+
+    def generate(self, ast: Any, ir: Any = None) -> List[tuple]:
+        # Returns the instruction list of the code segment; render() turns
+        # it (plus the data segment) into the final program text.
+        self.reset()
+        # Declared variables first, in symbol table order
+        if self.sem is not None:
+            for name, entry in self.sem.symbols.items():
+                tipo = entry.get('tipo')
+                if tipo and not name.startswith('_'):
+                    self.variables['_' + name] = tipo
+        if self.naive:
+            if ir is None:
+                raise Exception('La generación naive requiere el código intermedio (cuádruplas)')
+            self.lower_quadruples(ir)
+        else:
+            self.statement(ast)
+        return self.code
+
+    def data_segment(self) -> List[str]:
+        lines = []
+        for name, dtype in self.variables.items():
+            if dtype == 'String':
+                lines.append(f'    {name:<24}db  MAXTEXTSIZE dup (?),\'$\'')
+            else:
+                lines.append(f'    {name:<24}dd  ?')
+        for name, (dtype, length) in self.arrays.items():
+            size = 'dw' if dtype == 'String' else 'dd'
+            lines.append(f'    {name:<24}{size}  {length} dup (?)')
+        for name, (dtype, text) in self.constants.items():
+            value = text if dtype != 'Float' or any(c in text for c in '.eE') else text + '.0'
+            lines.append(f'    {name:<24}dd  {value}')
+        for text, name in self.strings.items():
+            pad = MAXTEXTSIZE - len(text)
+            escaped = text.replace('"', '""')
+            lines.append(f'    {name:<24}db  "{escaped}",\'$\', {pad} dup (?)')
+        return lines
+
+    def render(self, code: Optional[List[tuple]] = None) -> str:
+        code = self.code if code is None else code
+        out = [
+            'include macros.asm',
+            'include number.asm',
+            '',
+            '.MODEL  SMALL',
+            '.386',
+            '.387',
+            '.STACK 200h',
+            '',
+            f'MAXTEXTSIZE equ {MAXTEXTSIZE}',
+            '',
+            '.DATA',
+            '',
+        ]
+        out.extend(self.data_segment())
+        out += [
+            '',
+            '.CODE',
+            '',
+            'START:',
+            '    mov AX,@DATA',
+            '    mov DS,AX',
+            '    mov ES,AX',
+            '    finit',
+        ]
+        out.extend(format_instruction(op, args) for op, args in code)
+        out += [
+            '    mov ax, 4C00h',
+            '    int 21h',
+            'END START',
+        ]
+        return '\n'.join(out) + '\n'
+
+    # -- statements ---------------------------------------------------------
+
+    def statement(self, node: Any) -> None:
+        # Work list of statements still to lower and of callables that
+        # close a block (jumps, labels) once its body is emitted, so deeply
+        # nested blocks do not recurse
+        work = [node]
+        while work:
+            item = work.pop()
+            if callable(item):
+                item()
+            else:
+                work.extend(reversed(self.statement_step(item)))
+
+    def statement_step(self, node: Any) -> list:
+        # Emit the code of `node` up to its first nested statement. Returns
+        # what follows, in order: nested statements and closing callables.
+        if isinstance(node, list):
+            return node
+        kind = node.nodetype
+        if kind in ('Program', 'Block'):
+            return list(node.children)
+        if kind == ':=':
+            self.assignment(node)
+        elif kind == 'WRITE':
+            self.emit('displayString', self.string_name(str(node.children[1])))
+            self.emit('newLine', '1')
+        elif kind == 'READ':
+            self.read(node.children[1])
+        elif kind == 'IF':
+            cond, rest = node.children[0], node.children[1:]
+            if len(rest) == 1 and getattr(rest[0], 'nodetype', None) == 'Body':
+                then_node, else_node = rest[0].children
+                else_label, end_label = self.new_label(), self.new_label()
+                self.condition(cond, False, else_label)
+
+                def to_else():
+                    self.emit('JMP', end_label)
+                    self.label(else_label)
+
+                return [then_node, to_else, else_node, lambda: self.label(end_label)]
+            end_label = self.new_label()
+            self.condition(cond, False, end_label)
+            return list(rest) + [lambda: self.label(end_label)]
+        elif kind == 'While':
+            cond, body = node.children
+            start, end = self.new_label(), self.new_label()
+            self.label(start)
+            self.condition(cond, False, end)
+
+            def loop():
+                self.emit('JMP', start)
+                self.label(end)
+
+            return [body, loop]
+        else:
+            raise Exception(f"Error de generación de código (línea {node.lineno}): sentencia desconocida '{kind}'")
+        return []
+
+    def read(self, name: str) -> None:
+        dtype = self.dtype_of(name)
+        target = self.var_name(name, dtype)
+        if dtype == 'String':
+            self.emit('getString', target)
+        elif dtype == 'Float':
+            self.emit('GetFloat', target)
+        else:
+            self.emit('GetInteger', target)
+
+    def assignment(self, node: Any) -> None:
+        target, rhs = node.children
+        if getattr(rhs, 'nodetype', None) == 'EqualExpressions':
+            self.equal_expressions(rhs.children, self.var_name(target, 'Bool'))
+            return
+        dtype = node.dtype or self.dtype_of(rhs)
+        if self.is_temp(target):
+            self.temps[target] = dtype
+        self.store(rhs, self.var_name(target, dtype), dtype)
+
+    def store(self, rhs: Any, dest: str, dtype: Optional[str]) -> None:
+        # Evaluate `rhs` into the memory operand `dest` of type `dtype`
+        if dtype == 'String':
+            self.string_source(rhs)
+            self.emit('lea', 'di', dest)
+            self.emit('STRCPY')
+        elif dtype == 'Float' or self.is_float(rhs):
+            self.fpu_expression(rhs, 0)
+            self.emit('fstp', dest)
+        else:
+            if self.is_leaf(rhs) and self.int_value(rhs) is not None:
+                self.emit('mov', f'dword ptr {dest}', self.int_value(rhs))
+                return
+            self.int_expression(rhs, INT_REGS)
+            self.emit('mov', dest, 'eax')
+
+    def string_address(self, leaf: Any) -> str:
+        name = self.leaf_name(leaf)
+        if self.is_variable(name):
+            return self.var_name(name, 'String')
+        return self.string_name(name)
+
+    # -- equalExpressions ---------------------------------------------------
+
+    def new_array(self, dtype: str, length: int) -> str:
+        name = f'__eq{len(self.arrays) + 1}'
+        self.arrays[name] = (dtype, length)
+        return name
+
+    def equal_expressions(self, values: tuple, target: str) -> None:
+        # Store the N values in one array and search it for a duplicate:
+        # code size is linear in N and the search stops at the first match
+        if len(values) < 2:
+            self.emit('mov', f'dword ptr {target}', '0')
+            return
+        dtype = equal_expressions_type([self.dtype_of(v) for v in values])
+        array = self.new_array(dtype, len(values))
+        width = 2 if dtype == 'String' else 4
+        for i, v in enumerate(values):
+            slot = f'{array}+{i * width}' if i else array
+            if dtype == 'String':
+                self.emit('mov', f'word ptr {slot}', f'OFFSET {self.string_address(v)}')
+            else:
+                self.store(v, slot, dtype)
+        self.duplicate_search(array, target)
+
+    def duplicate_search(self, array: str, target: str) -> None:
+        # for i in 0..N-2: for j in i+1..N-1: if a[i] == a[j]: target := 1
+        dtype, length = self.arrays[array]
+        outer, inner, nxt, end = self.new_label(), self.new_label(), self.new_label(), self.new_label()
+        if dtype == 'String':
+            # STRCMP uses SI/DI/AL/BL: the indexes live in CX/DX
+            i, j, width = 'cx', 'dx', 2
+        else:
+            i, j, width = 'si', 'di', 4
+        self.emit('xor', i, i)
+        self.label(outer)
+        if dtype == 'Float':
+            self.emit('fld', f'{array}[si]')
+        elif dtype != 'String':
+            self.emit('mov', 'eax', f'{array}[si]')
+        if dtype == 'String':
+            self.emit('mov', 'dx', 'cx')
+        else:
+            self.emit('mov', 'di', 'si')
+        self.label(inner)
+        self.emit('add', j, str(width))
+        self.emit('cmp', j, str(length * width))
+        self.emit('JAE', nxt)
+        if dtype == 'String':
+            self.emit('mov', 'bx', 'cx')
+            self.emit('mov', 'si', f'{array}[bx]')
+            self.emit('mov', 'bx', 'dx')
+            self.emit('mov', 'di', f'{array}[bx]')
+            self.emit('STRCMP')
+        elif dtype == 'Float':
+            self.emit('fcom', f'{array}[di]')
+            self.emit('fstsw', 'ax')
+            self.emit('sahf')
+        else:
+            self.emit('cmp', 'eax', f'{array}[di]')
+        self.emit('JNE', inner)
+        if dtype == 'Float':
+            self.emit('fstp', 'st(0)')
+        self.emit('mov', f'dword ptr {target}', '1')
+        self.emit('JMP', end)
+        self.label(nxt)
+        if dtype == 'Float':
+            self.emit('fstp', 'st(0)')
+        self.emit('add', i, str(width))
+        self.emit('cmp', i, str((length - 1) * width))
+        self.emit('JB', outer)
+        self.emit('mov', f'dword ptr {target}', '0')
+        self.label(end)
+
+    def string_source(self, rhs: Any) -> None:
+        self.emit('lea', 'si', self.string_address(rhs))
+
+    # -- integer expressions (general registers) ----------------------------
+
+    def operands(self, node: Any) -> tuple:
+        # Children of a binary node, leaf last when the operator commutes
+        left, right = node.children
+        if node.nodetype in COMMUTATIVE and self.is_leaf(left) and not self.is_leaf(right):
+            return right, left
+        return left, right
+
+    def need(self, node: Any) -> int:
+        # Sethi-Ullman number: registers needed to evaluate `node` when the
+        # right operand of an operator may be an immediate/memory operand
+        key = id(node)
+        cached = self.need_cache.get(key)
+        if cached is not None:
+            return cached
+        if self.is_leaf(node):
+            result = 1
+        else:
+            left, right = self.operands(node)
+            nl = self.need(left)
+            nr = 0 if self.is_leaf(right) else self.need(right)
+            result = nl + 1 if nl == nr else max(nl, nr)
+        self.need_cache[key] = result
+        return result
+
+    def int_expression(self, node: Any, regs: tuple) -> None:
+        # Leave the value of `node` in regs[0]
+        r0 = regs[0]
+        if self.is_leaf(node):
+            self.emit('mov', r0, self.int_operand(node))
+            return
+        op = node.nodetype
+        left, right = self.operands(node)
+        if self.is_leaf(right):
+            self.int_expression(left, regs)
+            self.int_op(op, r0, self.int_operand(right))
+            return
+        nl, nr = self.need(left), self.need(right)
+        if nl >= nr and nr < len(regs):
+            self.int_expression(left, regs)
+            self.int_expression(right, regs[1:])
+            self.int_op(op, r0, regs[1])
+        elif nr > nl and nl < len(regs):
+            self.int_expression(right, regs)
+            self.int_expression(left, regs[1:])
+            if op == '-':
+                self.emit('sub', regs[1], r0)
+                self.emit('mov', r0, regs[1])
+            else:
+                self.int_op(op, r0, regs[1])
+        else:
+            # Not enough registers: park the right operand in memory
+            self.int_expression(right, regs)
+            spill = self.new_spill('Int')
+            self.emit('mov', spill, r0)
+            self.int_expression(left, regs)
+            self.int_op(op, r0, spill)
+
+    def int_op(self, op: str, reg: str, operand: str) -> None:
+        if op == '*' and operand.lstrip('-').isdigit():
+            self.emit('imul', reg, reg, operand)
+        else:
+            self.emit(INT_OPS[op], reg, operand)
+
+    # -- float expressions (x87 stack) --------------------------------------
+
+    def fpu_load(self, leaf: Any) -> None:
+        if self.is_float(leaf):
+            self.emit('fld', self.memory(leaf))
+        else:
+            self.emit('fild', self.memory(leaf))
+
+    def fpu_expression(self, node: Any, depth: int) -> None:
+        # Push the value of `node` on the x87 stack (`depth` slots in use)
+        if self.is_leaf(node):
+            self.fpu_load(node)
+            return
+        op = node.nodetype
+        left, right = self.operands(node)
+        if self.is_leaf(right):
+            self.fpu_expression(left, depth)
+            table = FPU_OPS if self.is_float(right) else FPU_INT_OPS
+            self.emit(table[op], self.memory(right))
+            return
+        nl, nr = self.need(left), self.need(right)
+        free = FPU_DEPTH - depth
+        if max(nl, nr) >= free:
+            # Park the right operand in memory
+            self.fpu_expression(right, depth)
+            spill = self.new_spill('Float')
+            self.emit('fstp', spill)
+            self.fpu_expression(left, depth)
+            self.emit(FPU_OPS[op], spill)
+        elif nl >= nr:
+            self.fpu_expression(left, depth)
+            self.fpu_expression(right, depth + 1)
+            self.emit(FPU_POP_OPS[op], 'st(1)', 'st')
+        else:
+            self.fpu_expression(right, depth)
+            self.fpu_expression(left, depth + 1)
+            self.emit(FPU_POP_REV_OPS[op], 'st(1)', 'st')
+
+    # -- conditions ---------------------------------------------------------
+
+    def condition(self, node: Any, when: bool, target: str) -> None:
+        # Jump to `target` when the condition evaluates to `when`
+        op = node.nodetype
+        if op in diccionarioComparadores and len(node.children) == 2:
+            left, right = node.children
+            branch_op = op if not when else diccionarioComparadoresNot[op]
+            mnemonic = diccionarioComparadores[branch_op]
+            kind = self.compare(left, right)
+            jumps = JUMPS_INT if kind == 'int' else JUMPS_FPU
+            self.emit(jumps[mnemonic], target)
+        elif op in ('and', 'or'):
+            left, right = node.children
+            if (op == 'and') != when:
+                self.condition(left, when, target)
+                self.condition(right, when, target)
+            else:
+                skip = self.new_label()
+                self.condition(left, not when, skip)
+                self.condition(right, when, target)
+                self.label(skip)
+        elif op == 'CondNot':
+            self.condition(node.children[0], not when, target)
+        else:
+            raise Exception(f"Error de generación de código (línea {node.lineno}): condición no soportada '{op}'")
+
+    def compare(self, left: Any, right: Any) -> str:
+        # Emit a comparison of left with right; returns 'int' when the flags
+        # come from an integer cmp (signed jumps), 'fpu' otherwise
+        lt, rt = self.dtype_of(left), self.dtype_of(right)
+        if lt == 'String' or rt == 'String':
+            self.string_source(left)
+            name = self.leaf_name(right)
+            dest = self.var_name(name, 'String') if self.is_variable(name) else self.string_name(name)
+            self.emit('lea', 'di', dest)
+            self.emit('STRCMP')
+            return 'int'
+        if lt in INTEGER_TYPES and rt in INTEGER_TYPES:
+            if self.is_leaf(left) and self.int_value(left) is None and self.is_leaf(right) \
+                    and self.int_value(right) is not None:
+                self.emit('cmp', f'dword ptr {self.memory(left)}', self.int_value(right))
+                return 'int'
+            self.int_expression(left, INT_REGS)
+            if self.is_leaf(right):
+                self.emit('cmp', 'eax', self.int_operand(right))
+            else:
+                self.int_expression(right, INT_REGS[1:])
+                self.emit('cmp', 'eax', 'ebx')
+            return 'int'
+        self.fpu_expression(left, 0)
+        if self.is_leaf(right):
+            self.emit('fcomp' if self.is_float(right) else 'ficomp', self.memory(right))
+        else:
+            self.fpu_expression(right, 1)
+            self.emit('fxch')
+            self.emit('fcompp')
+        self.emit('fstsw', 'ax')
+        self.emit('sahf')
+        return 'fpu'
+
+    # -- naive lowering from quadruples -------------------------------------
+
+    def ir_dtype(self, ir: Any, operand: Any) -> Optional[str]:
+        dtype = ir.dtypes.get(operand)
+        if dtype is None and operand in ('true', 'false'):
+            return 'Bool'
+        return dtype
+
+    def ir_memory(self, ir: Any, operand: Any) -> str:
+        dtype = self.ir_dtype(ir, operand)
+        if operand in ir.constants:
+            if dtype == 'String':
+                return self.string_name(operand[1:-1])
+            if operand == 'true':
+                return self.const_name('1', 'Int')
+            if operand == 'false':
+                return self.const_name('0', 'Int')
+            return self.const_name(operand, 'Float' if dtype == 'Float' else 'Int')
+        if self.is_temp(operand):
+            self.temps[operand] = dtype
+        return self.var_name(operand, dtype)
+
+    def ir_load(self, ir: Any, operand: Any) -> None:
+        if self.ir_dtype(ir, operand) == 'Float':
+            self.emit('fld', self.ir_memory(ir, operand))
+        else:
+            self.emit('fild', self.ir_memory(ir, operand))
+
+    def ir_store(self, ir: Any, operand: Any) -> None:
+        if self.ir_dtype(ir, operand) == 'Float':
+            self.emit('fstp', self.ir_memory(ir, operand))
+        else:
+            self.emit('fistp', self.ir_memory(ir, operand))
+
+    def lower_quadruples(self, ir: Any) -> None:
+        # Memory-to-memory lowering: every quadruple loads its operands from
+        # memory and stores its result back
+        targets = set()
+        for op, _a1, _a2, res in ir:
+            if op in JUMPS_FPU:
+                targets.add(res)
+        compare_kind = 'fpu'
+        for i, (op, a1, a2, res) in enumerate(ir):
+            if i in targets:
+                self.label(f'ET_{i}')
+            if op == ':=':
+                if self.ir_dtype(ir, res) == 'String':
+                    self.emit('lea', 'si', self.ir_memory(ir, a1))
+                    self.emit('lea', 'di', self.ir_memory(ir, res))
+                    self.emit('STRCPY')
+                else:
+                    self.ir_load(ir, a1)
+                    self.ir_store(ir, res)
+            elif op in FPU_OPS:
+                self.ir_load(ir, a1)
+                table = FPU_OPS if self.ir_dtype(ir, a2) == 'Float' else FPU_INT_OPS
+                self.emit(table[op], self.ir_memory(ir, a2))
+                self.ir_store(ir, res)
+            elif op == 'CONVDATE':
+                dia, mes, anio = map(int, a1.split('-'))
+                self.emit('fild', self.const_name(str(anio * 10000 + mes * 100 + dia), 'Int'))
+                self.ir_store(ir, res)
+            elif op == 'CMP':
+                if self.ir_dtype(ir, a1) == 'String':
+                    self.emit('lea', 'si', self.ir_memory(ir, a1))
+                    self.emit('lea', 'di', self.ir_memory(ir, a2))
+                    self.emit('STRCMP')
+                    compare_kind = 'int'
+                else:
+                    self.ir_load(ir, a1)
+                    self.ir_load(ir, a2)
+                    self.emit('fxch')
+                    self.emit('fcompp')
+                    self.emit('fstsw', 'ax')
+                    self.emit('sahf')
+                    compare_kind = 'fpu'
+            elif op in JUMPS_FPU:
+                jumps = JUMPS_INT if compare_kind == 'int' else JUMPS_FPU
+                self.emit(jumps[op], f'ET_{res}')
+            elif op == 'PARAM':
+                self.params.append(a1)
+            elif op == 'ANYEQ':
+                self.ir_equal_expressions(ir, self.params[len(self.params) - a1:], res)
+                del self.params[len(self.params) - a1:]
+            elif op == 'WRITE':
+                self.emit('displayString', self.ir_memory(ir, a1))
+                self.emit('newLine', '1')
+            elif op == 'READ':
+                dtype = self.ir_dtype(ir, res) or self.dtype_of(res)
+                self.read_ir(res, dtype)
+            else:
+                raise Exception(f"Error de generación de código: cuádrupla desconocida '{op}'")
+        if len(ir) in targets:
+            self.label(f'ET_{len(ir)}')
+
+    def ir_equal_expressions(self, ir: Any, values: list, target: Any) -> None:
+        dest = self.ir_memory(ir, target)
+        if len(values) < 2:
+            self.emit('mov', f'dword ptr {dest}', '0')
+            return
+        dtype = equal_expressions_type([self.ir_dtype(ir, v) for v in values])
+        array = self.new_array(dtype, len(values))
+        width = 2 if dtype == 'String' else 4
+        for i, v in enumerate(values):
+            slot = f'{array}+{i * width}' if i else array
+            if dtype == 'String':
+                self.emit('mov', f'word ptr {slot}', f'OFFSET {self.ir_memory(ir, v)}')
+            else:
+                self.ir_load(ir, v)
+                self.emit('fstp' if dtype == 'Float' else 'fistp', slot)
+        self.duplicate_search(array, dest)
+
+    def read_ir(self, name: str, dtype: Optional[str]) -> None:
+        target = self.var_name(name, dtype)
+        if dtype == 'String':
+            self.emit('getString', target)
+        elif dtype == 'Float':
+            self.emit('GetFloat', target)
+        else:
+            self.emit('GetInteger', target)
+
+
+def format_instruction(op: str, args: tuple) -> str:
+    if op == LABEL:
+        return f'{args[0]}:'
+    if not args:
+        return f'    {op}'
+    return f'    {op} {", ".join(args)}'
+
+
+def generar_asm(ast: Any, ctx: Any = None, ir: Any = None, naive: bool = False) -> str:
+    # Convenience wrapper returning the full program text
+    gen = AsmGenerator(ctx.sem if ctx is not None else None, naive=naive)
+    gen.generate(ast, ir)
+    return gen.render()
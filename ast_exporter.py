@@ -1,11 +1,38 @@
 """AST DOT exporter.
 
 Provides ASTDotExporter.to_dot(node) which accepts ASTNode-like objects or
-lists of such objects. The exporter intentionally avoids importing the
-parser's ASTNode class to prevent circular imports; it uses duck-typing
-by checking for a `nodetype` attribute.
+lists of such objects, and ASTDotExporter.write_dot(node, fh) which streams
+the same text straight to a file handle. The exporter intentionally avoids
+importing the parser's ASTNode class to prevent circular imports; it uses
+duck-typing by checking for a `nodetype` attribute.
+
+The tree is walked with an explicit stack of pending tasks instead of
+recursion, so arbitrarily deep or wide trees never hit RecursionError and
+only the pending work (not the DOT text) is kept in memory.
+
+For programs too large for Graphviz to lay out, SummaryDotExporter draws
+at most a budget of nodes (collapsed subtrees become summary nodes, one
+cluster per top-level statement) and SubtreeDotExporter draws only the
+statements selected by index or line range, at full detail. Both have the
+same write_dot/to_dot interface. select(node) returns the part of the tree
+an exporter draws; to_dot applies it, and callers writing to a file call
+it before opening the file, so a failed selection leaves the file as it
+was.
 """
-from typing import Any
+import io
+import math
+from array import array
+from typing import Any, TextIO
+
+# Pending work items on the exporter stack
+_NODE = 0    # (_NODE, node, node_id): emit node label, then its children
+_CHILD = 1   # (_CHILD, parent_id, child): edge parent -> child (+ subtree)
+_GROUP = 2   # (_GROUP, flat, i, chain): connector for flat[i:]
+_EDGES = 3   # (_EDGES, chain): connector edges, emitted once a chain is built
+
+# A chain is (parent_id, array of connector numbers) for one N-ary node; the
+# connector edges are written last, innermost first, so only their numbers
+# are kept meanwhile (4 bytes per connector).
 
 
 class ASTDotExporter:
@@ -16,12 +43,24 @@ class ASTDotExporter:
     """
     def __init__(self):
         # Initialize writer state:
-        # - lines: list of DOT lines being built
+        # - out: file-like object receiving the DOT text
         # - counter: simple integer counter stored in dict for mutability
         # - ids: mapping from object id() -> generated node name
-        self.lines = ['digraph AST {', '  node [shape=box];']
+        # - stack: pending tasks (see the _NODE/_CHILD/_GROUP/_EDGES tags)
+        self.out = None
+        self.first = True
         self.counter = {'i': 0}
         self.ids = {}
+        self.stack = []
+
+    def emit(self, line: str) -> None:
+        # Write one DOT line. Lines are separated (not terminated) by '\n'
+        # so the streamed text is byte-identical to to_dot().
+        if self.first:
+            self.first = False
+            self.out.write(line)
+        else:
+            self.out.write('\n' + line)
 
     def nid(self, obj: Any) -> str:
         # Return a stable DOT node id for a Python object.
@@ -44,16 +83,16 @@ class ASTDotExporter:
 
     def make_leaf(self, label: Any) -> str:
         # Create a DOT node that represents a literal/leaf value (like a
-        # variable name or literal string/number) and append it to lines.
+        # variable name or literal string/number) and emit it.
         lid = self.new_id()
-        self.lines.append(f'  {lid} [label="{self.escape(label)}"];')
+        self.emit(f'  {lid} [label="{self.escape(label)}"];')
         return lid
 
     def make_conn(self) -> str:
         # Create a small connector node (dashed, labeled '·') used to group
         # right-hand items when binary-izing N-ary children. Returns its id.
         cid = self.new_id()
-        self.lines.append(f'  {cid} [label="·", style="dashed"];')
+        self.emit(f'  {cid} [label="·", style="dashed"];')
         return cid
 
     def _is_ast_like(self, obj: Any) -> bool:
@@ -64,19 +103,21 @@ class ASTDotExporter:
 
     def emit_child_edge(self, parent_id: str, child: Any) -> None:
         # Emit an edge from parent to child. If the child is AST-like, create
-        # (or reuse) a node id for it and recurse into its subtree. If it's a
-        # plain value, create a leaf node for the value instead.
+        # a node id for it and schedule its subtree. If it's a plain value,
+        # create a leaf node for the value instead.
         if self._is_ast_like(child):
-            cid = self.nid(child)
-            self.lines.append(f'  {parent_id} -> {cid};')
-            self.walk(child)
+            # Fresh id per occurrence: shared nodes (e.g. the `true` leaf)
+            # are drawn once per place they appear in the tree
+            cid = self.new_id()
+            self.emit(f'  {parent_id} -> {cid};')
+            self.stack.append((_NODE, child, cid))
         else:
             leaf_id = self.make_leaf(child)
-            self.lines.append(f'  {parent_id} -> {leaf_id};')
+            self.emit(f'  {parent_id} -> {leaf_id};')
 
-    def attach_children_binary(self, parent_id: str, children: list) -> None:
-        # Attach children to `parent_id` while converting an N-ary list of
-        # children into a binary-shaped structure suitable for clear DOT
+    def attach_children_binary(self, parent_id: str, children) -> None:
+        # Schedule the children of `parent_id` while converting an N-ary list
+        # of children into a binary-shaped structure suitable for clear DOT
         # visualization. Steps:
         # 1. Flatten any nested lists by one level (productions may return
         #    lists of nodes).
@@ -85,75 +126,337 @@ class ASTDotExporter:
         # 3. For 3+ children, create connector nodes so each parent has a
         #    left child and a right child (which may be another connector),
         #    producing a readable right-branch grouping.
-        flat = []
-        for c in children:
-            if isinstance(c, list):
-                for cc in c:
-                    flat.append(cc)
-            else:
-                flat.append(c)
+        # Tasks are pushed in reverse so they run in source order.
+        if any(isinstance(c, list) for c in children):
+            flat = []
+            for c in children:
+                if isinstance(c, list):
+                    for cc in c:
+                        flat.append(cc)
+                else:
+                    flat.append(c)
+        else:
+            flat = children
 
         if not flat:
             return
 
         if len(flat) == 1:
-            self.emit_child_edge(parent_id, flat[0])
+            self.stack.append((_CHILD, parent_id, flat[0]))
             return
 
         if len(flat) == 2:
-            self.emit_child_edge(parent_id, flat[0])
-            self.emit_child_edge(parent_id, flat[1])
+            self.stack.append((_CHILD, parent_id, flat[1]))
+            self.stack.append((_CHILD, parent_id, flat[0]))
             return
 
-        def build_group_node(remaining: list) -> str:
-            # Build a connector node representing the group of `remaining`
-            conn = self.make_conn()
-            self.emit_child_edge(conn, remaining[0])
-            rest = remaining[1:]
-            if len(rest) == 1:
-                self.emit_child_edge(conn, rest[0])
-            else:
-                next_group = build_group_node(rest)
-                self.lines.append(f'  {conn} -> {next_group};')
-            return conn
-
-        # attach first child directly as the left child
-        self.emit_child_edge(parent_id, flat[0])
-        remaining = flat[1:]
-        if len(remaining) == 1:
-            self.emit_child_edge(parent_id, remaining[0])
+        # first child directly as the left child, the rest under connectors
+        chain = (parent_id, array('L'))
+        self.stack.append((_EDGES, chain))
+        self.stack.append((_GROUP, flat, 1, chain))
+        self.stack.append((_CHILD, parent_id, flat[0]))
+
+    def build_group_node(self, flat, i: int, chain) -> None:
+        # Build a connector node representing the group flat[i:]. The edge
+        # to it from the previous connector (or the parent) is emitted by the
+        # chain's _EDGES task once the whole group is done.
+        conn = self.make_conn()
+        chain[1].append(self.counter['i'])
+        if i + 2 == len(flat):
+            self.stack.append((_CHILD, conn, flat[i + 1]))
         else:
-            group = build_group_node(remaining)
-            self.lines.append(f'  {parent_id} -> {group};')
+            self.stack.append((_GROUP, flat, i + 1, chain))
+        self.stack.append((_CHILD, conn, flat[i]))
 
-    def walk(self, n: Any) -> None:
-        # Emit the DOT node for AST node `n` and recurse on its children.
+    def emit_chain_edges(self, chain) -> None:
+        # parent -> c1 -> c2 ... written innermost first, as the nested
+        # construction of the connectors used to produce them
+        parent_id, conns = chain
+        for k in range(len(conns) - 1, 0, -1):
+            self.emit(f'  n{conns[k - 1]} -> n{conns[k]};')
+        self.emit(f'  {parent_id} -> n{conns[0]};')
+
+    def walk(self, n: Any, this_id: str = None) -> None:
+        # Emit the DOT node for AST node `n` and schedule its children.
         # The label uses `nodetype` and (optionally) `value` on a new line.
-        this_id = self.nid(n)
+        if this_id is None:
+            this_id = self.nid(n)
         nodetype = getattr(n, 'nodetype', None)
         value = getattr(n, 'value', None)
         label = (nodetype if nodetype is not None else str(n)) + (f"\\n{self.escape(value)}" if value is not None else '')
-        self.lines.append(f'  {this_id} [label="{label}"];')
+        self.emit(f'  {this_id} [label="{label}"];')
         self.attach_children_binary(this_id, getattr(n, 'children', []))
 
-    def to_dot(self, node: Any) -> str:
-        # Public API: convert `node` (an AST-like object, a list of nodes, or
-        # a scalar) into the DOT textual representation. Resets internal
-        # counters so calling `to_dot` repeatedly produces fresh ids.
-        self.lines = ['digraph AST {', '  node [shape=box];']
+    def run(self) -> None:
+        # Process pending tasks until the stack is empty
+        stack = self.stack
+        while stack:
+            task = stack.pop()
+            kind = task[0]
+            if kind == _NODE:
+                self.walk(task[1], task[2])
+            elif kind == _CHILD:
+                self.emit_child_edge(task[1], task[2])
+            elif kind == _GROUP:
+                self.build_group_node(task[1], task[2], task[3])
+            else:
+                self.emit_chain_edges(task[1])
+
+    def select(self, node: Any) -> Any:
+        # The part of `node` this exporter draws (all of it). Raises before
+        # anything is written when the selection is invalid.
+        return node
+
+    def write_dot(self, node: Any, out: TextIO) -> None:
+        # Public API: stream the DOT representation of `node` (an AST-like
+        # object, a list of nodes, or a scalar, already passed through
+        # select()) to the file-like `out`.
+        # Resets internal counters so repeated calls produce fresh ids.
+        self.out = out
+        self.first = True
         self.counter = {'i': 0}
         self.ids = {}
+        self.stack = []
 
+        self.emit('digraph AST {')
+        self.emit('  node [shape=box];')
         if self._is_ast_like(node):
             self.walk(node)
         elif isinstance(node, list):
             # create an artificial Program root for top-level lists
             root_id = self.new_id()
-            self.lines.append(f'  {root_id} [label="Program"];')
+            self.emit(f'  {root_id} [label="Program"];')
             self.attach_children_binary(root_id, node)
         else:
             leaf_id = self.make_leaf(str(node))
-            self.lines.append(f'  {leaf_id} [label="{self.escape(str(node))}"];')
+            self.emit(f'  {leaf_id} [label="{self.escape(str(node))}"];')
+        self.run()
+        self.emit('}')
+        self.out = None
+
+    def to_dot(self, node: Any) -> str:
+        # Convert the selected part of `node` into the DOT textual
+        # representation
+        buf = io.StringIO()
+        self.write_dot(self.select(node), buf)
+        return buf.getvalue()
+
+
+def _flat_children(node: Any) -> list:
+    # Children of an AST-like node with nested lists flattened one level,
+    # as attach_children_binary does
+    children = getattr(node, 'children', None) or []
+    if any(isinstance(c, list) for c in children):
+        flat = []
+        for c in children:
+            if isinstance(c, list):
+                flat.extend(c)
+            else:
+                flat.append(c)
+        return flat
+    return children
+
+
+def subtree_stats(root: Any) -> dict:
+    # id(node) -> (items in its subtree, first line, last line) for every
+    # AST-like node under `root` (lines are 0 when no node has one). The
+    # last line of a block statement is its closing brace (`end`). Plain
+    # children count as one item. Computed in postorder with a stack.
+    stats = {}
+    stack = [(root, False)]
+    while stack:
+        node, done = stack.pop()
+        if not done:
+            if id(node) in stats:
+                continue
+            stack.append((node, True))
+            for c in _flat_children(node):
+                if hasattr(c, 'nodetype') and id(c) not in stats:
+                    stack.append((c, False))
+            continue
+        size = 1
+        line = getattr(node, 'lineno', 0) or 0
+        first = line
+        last = max(line, getattr(node, 'end', 0) or 0)
+        for c in _flat_children(node):
+            if hasattr(c, 'nodetype'):
+                n, a, b = stats[id(c)]
+                size += n
+                if a and (not first or a < first):
+                    first = a
+                if b > last:
+                    last = b
+            else:
+                size += 1
+        stats[id(node)] = (size, first, last)
+    return stats
+
+
+class SummaryDotExporter(ASTDotExporter):
+    """Summarized DOT export with a node budget, for very large programs.
+
+    Nodes are expanded breadth-first while the graph stays within `budget`
+    DOT nodes (and above `max_depth`, when given); every subtree left
+    unexpanded is drawn as one grey summary node with its nodetype, the
+    number of nodes it holds and its dtype. Children are drawn directly,
+    without the dashed connectors of ASTDotExporter. Each top-level
+    statement goes into its own cluster labelled with its index and lines;
+    when there are more statements than half the budget, consecutive
+    statements are grouped into summary nodes instead. The output size, and
+    so the Graphviz layout time, is bounded by the budget.
+    """
+    def __init__(self, budget: int = 500, max_depth: int = None):
+        super().__init__()
+        self.budget = max(budget, 8)
+        self.max_depth = max_depth
+
+    def summary_label(self, node: Any, size: int) -> str:
+        dtype = getattr(node, 'dtype', None)
+        label = f'{node.nodetype}\\n{size} nodos'
+        return label + (f'\\n{self.escape(dtype)}' if dtype is not None else '')
+
+    def node_label(self, node: Any) -> str:
+        value = getattr(node, 'value', None)
+        return node.nodetype + (f"\\n{self.escape(value)}" if value is not None else '')
+
+    def plan(self, statements: list, stats: dict) -> set:
+        # ids of the nodes to expand: breadth-first over every statement at
+        # once, so all of them get their upper levels before any goes deeper
+        expanded = set()
+        drawn = 1 + len(statements)
+        queue = [(s, 1) for s in statements if hasattr(s, 'nodetype')]
+        i = 0
+        while i < len(queue):
+            node, depth = queue[i]
+            i += 1
+            if self.max_depth is not None and depth >= self.max_depth:
+                continue
+            children = _flat_children(node)
+            if drawn + len(children) > self.budget:
+                continue
+            drawn += len(children)
+            expanded.add(id(node))
+            queue.extend((c, depth + 1) for c in children if hasattr(c, 'nodetype') and c.children)
+        return expanded
+
+    def emit_subtree(self, node: Any, node_id: str, stats: dict, expanded: set, indent: str) -> None:
+        # Node statements and edges of `node`: expanded nodes with their
+        # children, the rest as summary nodes
+        stack = [(node, node_id)]
+        while stack:
+            n, nid = stack.pop()
+            if id(n) in expanded:
+                self.emit(f'{indent}{nid} [label="{self.node_label(n)}"];')
+                pending = []
+                for c in _flat_children(n):
+                    cid = self.new_id()
+                    self.emit(f'{indent}{nid} -> {cid};')
+                    if hasattr(c, 'nodetype'):
+                        pending.append((c, cid))
+                    else:
+                        self.emit(f'{indent}{cid} [label="{self.escape(c)}"];')
+                stack.extend(reversed(pending))
+            elif n.children:
+                label = self.summary_label(n, stats[id(n)][0])
+                self.emit(f'{indent}{nid} [label="{label}", style="filled", fillcolor="lightgrey"];')
+            else:
+                self.emit(f'{indent}{nid} [label="{self.node_label(n)}"];')
+
+    def write_dot(self, node: Any, out: TextIO) -> None:
+        self.out = out
+        self.first = True
+        self.counter = {'i': 0}
+        self.ids = {}
+        self.stack = []
+
+        if isinstance(node, list):
+            root_label, statements = 'Program', node
+        elif hasattr(node, 'nodetype'):
+            root_label, statements = self.node_label(node), _flat_children(node)
+        else:
+            super().write_dot(node, out)
+            return
+
+        self.emit('digraph AST {')
+        self.emit('  node [shape=box];')
+        root_id = self.new_id()
+        self.emit(f'  {root_id} [label="{root_label}"];')
+        stats = {}
+        for s in statements:
+            if hasattr(s, 'nodetype'):
+                stats.update(subtree_stats(s))
+
+        per_group = math.ceil(len(statements) / (self.budget // 2)) if len(statements) > self.budget // 2 else 1
+        if per_group > 1:
+            self.emit_groups(root_id, statements, stats, per_group)
+        else:
+            expanded = self.plan(statements, stats)
+            for k, s in enumerate(statements):
+                self.emit_statement(root_id, k, s, stats, expanded)
+        self.emit('}')
+        self.out = None
+
+    def emit_statement(self, root_id: str, k: int, statement: Any, stats: dict, expanded: set) -> None:
+        sid = self.new_id()
+        if hasattr(statement, 'nodetype'):
+            _, first, last = stats[id(statement)]
+            lines = f', líneas {first}-{last}' if first else ''
+            self.emit(f'  subgraph cluster_{k} {{')
+            self.emit(f'    label="sentencia {k}{lines}"; style="dashed";')
+            self.emit_subtree(statement, sid, stats, expanded, '    ')
+            self.emit('  }')
+        else:
+            self.emit(f'  {sid} [label="{self.escape(statement)}"];')
+        self.emit(f'  {root_id} -> {sid};')
+
+    def emit_groups(self, root_id: str, statements: list, stats: dict, per_group: int) -> None:
+        # One summary node per `per_group` consecutive statements
+        for start in range(0, len(statements), per_group):
+            group = statements[start:start + per_group]
+            size = 0
+            first = last = 0
+            for s in group:
+                if hasattr(s, 'nodetype'):
+                    n, a, b = stats[id(s)]
+                    size += n
+                    if a and (not first or a < first):
+                        first = a
+                    last = max(last, b)
+                else:
+                    size += 1
+            lines = f'\\nlíneas {first}-{last}' if first else ''
+            gid = self.new_id()
+            self.emit(f'  {gid} [label="sentencias {start}-{start + len(group) - 1}\\n{size} nodos{lines}", '
+                      f'style="filled", fillcolor="lightgrey"];')
+            self.emit(f'  {root_id} -> {gid};')
+
+
+def select_statements(root: Any, index: int = None, lines: tuple = None) -> list:
+    # Top-level statements of `root` to export at full detail: the one at
+    # `index`, or those whose lines intersect `lines` (first, last)
+    statements = _flat_children(root) if hasattr(root, 'nodetype') else list(root)
+    if index is not None:
+        if not 0 <= index < len(statements):
+            raise Exception(f'No existe la sentencia {index} (el programa tiene {len(statements)})')
+        return [statements[index]]
+    first, last = lines
+    selected = []
+    for s in statements:
+        if hasattr(s, 'nodetype'):
+            _, a, b = subtree_stats(s)[id(s)]
+            if a and a <= last and b >= first:
+                selected.append(s)
+    if not selected:
+        raise Exception(f'Ninguna sentencia entre las líneas {first} y {last}')
+    return selected
+
+
+class SubtreeDotExporter(ASTDotExporter):
+    """Full-detail export of selected top-level statements (see select_statements)."""
+    def __init__(self, index: int = None, lines: tuple = None):
+        super().__init__()
+        self.index = index
+        self.lines = lines
 
-        self.lines.append('}')
-        return '\n'.join(self.lines)
+    def select(self, node: Any) -> list:
+        return select_statements(node, self.index, self.lines)
@@ -1,21 +1,58 @@
+import sys
+
+
+def _intern(s):
+    # Interned tags share one string object across the whole tree
+    return sys.intern(s) if type(s) is str else s
+
+
 class ASTNode:
-    def __init__(self, nodetype, value=None, children=None, dtype=None):
-        self.nodetype = nodetype
+    # Slotted: no per-instance __dict__. Children are stored as a tuple and
+    # `lineno` as a plain int (0 when unknown). `end` is the line of the
+    # closing brace of block statements (IF, While) and 0 on other nodes.
+    __slots__ = ('nodetype', 'value', 'children', 'dtype', 'lineno', 'end')
+
+    def __init__(self, nodetype, value=None, children=None, dtype=None, lineno=0, end=0):
+        self.nodetype = _intern(nodetype)
         self.value = value
-        self.children = children or []
-        self.dtype = dtype
+        self.children = tuple(children) if children else ()
+        self.dtype = _intern(dtype)
+        self.lineno = lineno
+        self.end = end
 
-    def to_lines(self, level=0):
-        indent = '  ' * level
-        val = f": {self.value}" if self.value is not None else ""
-        lines = [f"{indent}{self.nodetype}{val}"]
-        for c in self.children:
-            if isinstance(c, ASTNode):
-                lines.extend(c.to_lines(level + 1))
+    def __reduce_ex__(self, protocol):
+        # The shared boolean leaves pickle by reference (as ast_node.TRUE /
+        # FALSE), so a tree loaded from the compilation cache still shares
+        # them
+        if self is TRUE:
+            return 'TRUE'
+        if self is FALSE:
+            return 'FALSE'
+        return super().__reduce_ex__(protocol)
+
+    def iter_lines(self, level=0):
+        # Yield the indented outline of the subtree one line at a time,
+        # using an explicit stack so deep trees do not recurse
+        stack = [(self, level)]
+        while stack:
+            node, lvl = stack.pop()
+            if isinstance(node, ASTNode):
+                val = f": {node.value}" if node.value is not None else ""
+                yield f"{'  ' * lvl}{node.nodetype}{val}"
+                for c in reversed(node.children):
+                    stack.append((c, lvl + 1))
             else:
-                lines.append('  ' * (level + 1) + str(c))
-        return lines
+                yield '  ' * lvl + str(node)
+
+    def to_lines(self, level=0):
+        return list(self.iter_lines(level))
 
     def to_string(self):
-        return '\n'.join(self.to_lines())
+        return '\n'.join(self.iter_lines())
+
 
+# Shared boolean literal leaves. Nodes are never mutated once built, so the
+# same leaf can appear in many places of the tree (the DOT exporter draws
+# each occurrence separately).
+TRUE = ASTNode('true', dtype='Bool')
+FALSE = ASTNode('false', dtype='Bool')
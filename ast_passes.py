@@ -0,0 +1,262 @@
+"""AST counterparts of the IR passes, for the register back end.
+
+The default back end (AsmGenerator without naive) lowers the folded AST,
+not the quadruples, so the passes of ir_passes never reach it.
+compiler.assemble runs these rewrites on the tree it lowers instead, under
+the same names, so the -O levels and --disable-pass select them as well:
+
+    constant-branches  an `if` whose condition is constant becomes the
+                       statements of the branch taken; a `while` whose
+                       condition is constantly false is dropped
+    dead-stores        removes assignments to variables nothing reads (no
+                       expression or condition mentions them), until none
+                       is left
+
+copy-propagation has no counterpart: the register lowering reads operands
+directly and creates no temporary copies. Conditions and expressions have
+no side effects, so an `if` left without statements is dropped as well.
+
+Nodes are never mutated: rewritten statements are rebuilt, untouched ones
+are shared with the input tree. Statements are walked with explicit
+stacks, so deeply nested programs do not recurse.
+"""
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Iterable, Optional
+
+from ast_node import ASTNode
+from constant_folding import ConstantFolder
+from ir_passes import PassManager
+
+# Comparison operator -> its value on two constants
+COMPARE = {
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+    '==': lambda a, b: a == b,
+    '<>': lambda a, b: a != b,
+}
+
+_FOLDER = ConstantFolder()
+
+
+def is_ast(obj: Any) -> bool:
+    return hasattr(obj, 'nodetype') and hasattr(obj, 'children')
+
+
+def is_if_else(node: Any) -> bool:
+    rest = node.children[1:]
+    return len(rest) == 1 and getattr(rest[0], 'nodetype', None) == 'Body'
+
+
+def statement_children(node: Any) -> tuple:
+    # Nested statements of a statement (the branches of an if/else, the
+    # body of a while); conditions and expressions are left out
+    kind = node.nodetype
+    if kind in ('Program', 'Block'):
+        return node.children
+    if kind == 'IF':
+        return node.children[1].children if is_if_else(node) else node.children[1:]
+    if kind == 'While':
+        return node.children[1:]
+    return ()
+
+
+def contents(node: Any) -> list:
+    # Statements of a branch or loop body
+    if getattr(node, 'nodetype', None) == 'Block':
+        return list(node.children)
+    return [node]
+
+
+def side(statements: list) -> Any:
+    # A branch or loop body: the statement itself, or a Block of them
+    if len(statements) == 1:
+        return statements[0]
+    return ASTNode('Block', children=statements)
+
+
+def constant_operand(node: Any) -> Any:
+    # Numeric value of a literal leaf, True/False for the boolean leaves,
+    # None for anything else
+    if not is_ast(node) or node.children:
+        return None
+    if node.dtype == 'Bool' and node.nodetype in ('true', 'false'):
+        return node.nodetype == 'true'
+    return _FOLDER.literal(node)
+
+
+def constant_condition(node: Any) -> Optional[bool]:
+    # Value of a condition whose comparisons are all between constants;
+    # None when it depends on run-time values. The grammar nests
+    # conditions at most two levels deep.
+    op = node.nodetype
+    if op in COMPARE and len(node.children) == 2:
+        left, right = (constant_operand(c) for c in node.children)
+        if left is None or right is None:
+            return None
+        return COMPARE[op](left, right)
+    if op in ('and', 'or'):
+        left, right = (constant_condition(c) for c in node.children)
+        absorbing = op == 'or'
+        if left is absorbing or right is absorbing:
+            return absorbing
+        if left is None or right is None:
+            return None
+        return not absorbing
+    if op == 'CondNot':
+        value = constant_condition(node.children[0])
+        return None if value is None else not value
+    return None
+
+
+def rewrite(root: Any, step: Callable[[Any], list]) -> tuple:
+    # Rebuild the statements of `root` bottom-up: step(statement) returns
+    # the list of statements that replace it ([statement] to keep it).
+    # Returns (new root, number of statements replaced). The root itself
+    # (a Program) is always kept.
+    replacements = {}   # id(input statement) -> its replacement list
+    changes = 0
+    stack = [(root, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if not expanded:
+            stack.append((node, True))
+            stack.extend((c, False) for c in reversed(statement_children(node)) if is_ast(c))
+            continue
+        built = rebuild(node, replacements)
+        replaced = [] if built is None else step(built)
+        if replaced != [built]:
+            changes += 1
+        replacements[id(node)] = replaced
+    return replacements[id(root)][0], changes
+
+
+def rebuild(node: Any, replacements: dict) -> Optional[Any]:
+    # `node` over the replacements of its nested statements (the node
+    # itself when none changed). None for an `if` left without statements.
+    def new(child):
+        return replacements.get(id(child), [child]) if is_ast(child) else [child]
+
+    nested = statement_children(node)
+    if all(new(c) == [c] for c in nested):
+        return node
+    kind = node.nodetype
+    if kind in ('Program', 'Block'):
+        return ASTNode(kind, node.value, [s for c in node.children for s in new(c)], node.dtype, node.lineno,
+                       node.end)
+    cond = node.children[0]
+    if kind == 'While':
+        body = [s for s in new(node.children[1]) for s in contents(s)]
+        return ASTNode(kind, node.value, [cond, side(body)], node.dtype, node.lineno, node.end)
+    if is_if_else(node):
+        then_node, else_node = node.children[1].children
+        then_part = [s for s in new(then_node) for s in contents(s)]
+        else_part = [s for s in new(else_node) for s in contents(s)]
+        if not then_part and not else_part:
+            return None
+        body = ASTNode('Body', children=[side(then_part), side(else_part)])
+        return ASTNode(kind, node.value, [cond, body], node.dtype, node.lineno, node.end)
+    statements = [s for c in node.children[1:] for s in new(c)]
+    if not statements:
+        return None
+    return ASTNode(kind, node.value, [cond] + statements, node.dtype, node.lineno, node.end)
+
+
+class AstPass(ABC):
+    name = ''
+
+    @abstractmethod
+    def run(self, root: Any) -> tuple:
+        # (rewritten root, number of changes)
+        ...
+
+
+class ConstantBranches(AstPass):
+    name = 'constant-branches'
+
+    def step(self, node: Any) -> list:
+        kind = node.nodetype
+        if kind not in ('IF', 'While'):
+            return [node]
+        value = constant_condition(node.children[0])
+        if value is None:
+            return [node]
+        if kind == 'While':
+            # `while (true)` loops forever: kept as is
+            return [] if not value else [node]
+        if is_if_else(node):
+            then_node, else_node = node.children[1].children
+            return contents(then_node if value else else_node)
+        return list(node.children[1:]) if value else []
+
+    def run(self, root: Any) -> tuple:
+        return rewrite(root, self.step)
+
+
+class DeadStores(AstPass):
+    name = 'dead-stores'
+
+    def run(self, root: Any) -> tuple:
+        total = 0
+        while True:
+            read = read_names(root)
+
+            def step(node):
+                if node.nodetype == ':=' and node.children[0] not in read:
+                    return []
+                return [node]
+
+            root, changes = rewrite(root, step)
+            total += changes
+            if not changes:
+                return root, total
+
+
+def read_names(root: Any) -> set:
+    # Names of the leaves every expression and condition reads (variable
+    # names among them; the target of an assignment and of a read are
+    # plain children, not leaves)
+    names = set()
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if not is_ast(node):
+            continue
+        if node.children:
+            stack.extend(node.children)
+        else:
+            names.add(node.nodetype)
+    return names
+
+
+PASSES = {p.name: p for p in (ConstantBranches, DeadStores)}
+
+
+class AstPassManager(PassManager):
+    """ir_passes.PassManager over the AST: the passes of a level that have
+    an AST counterpart (see PASSES), with the same rounds, disable() and
+    report(). run() returns the rewritten tree.
+    """
+    def __init__(self, passes: Iterable[str] = (), rounds: int = 1):
+        super().__init__(rounds=rounds)
+        self.passes = [PASSES[name]() for name in passes if name in PASSES]
+
+    def run(self, ast: Any) -> Any:
+        totals = {p.name: {'pass': p.name, 'changes': 0, 'seconds': 0.0, 'enabled': p.name not in self.disabled}
+                  for p in self.passes}
+        for _ in range(self.rounds):
+            changed = 0
+            for p in self.passes:
+                if p.name in self.disabled:
+                    continue
+                start = time.perf_counter()
+                ast, changes = p.run(ast)
+                totals[p.name]['seconds'] += time.perf_counter() - start
+                totals[p.name]['changes'] += changes
+                changed += changes
+            if not changed:
+                break
+        self.stats = list(totals.values())
+        return ast
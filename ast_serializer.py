@@ -0,0 +1,299 @@
+"""Serialization of ASTNode trees: compact binary and JSON.
+
+Both formats store the tree as a preorder list of items, so saving and
+loading walk it with an explicit stack and trees of any depth work. An
+item is a node (nodetype, value, dtype, lineno, end line and number of
+children) or a plain child (the 'write'/'read' tags, variable names on the
+left of an assignment). The shared TRUE/FALSE leaves of ast_node are
+marked as such and come back as the same objects.
+
+Binary layout (to_bytes/from_bytes), after the MAGIC header:
+
+    strings   every distinct string once (nodetypes, dtypes, values),
+              as an array of UTF-8 lengths plus the joined bytes
+    items     parallel typed arrays: kind, nodetype, value tag, value
+              reference, dtype, lineno, end and child count per item
+    ints, floats  numeric values referenced by the value tags
+
+Each array is written as typecode, length and raw little-endian bytes,
+with the smallest unsigned typecode that fits its largest index, so
+loading is one frombytes() per array plus one object per node (the node
+slots are filled directly; strings are interned once in the table).
+
+The JSON format (to_json/from_json) has the same items as objects for
+other tools: {"nodetype", "value", "dtype", "lineno", "end", "children"} per node
+(children is a count; the children follow in preorder), {"child": value}
+per plain child and {"shared": "TRUE"/"FALSE"} for the shared leaves.
+"""
+import gc
+import json
+import struct
+import sys
+from array import array
+from pathlib import Path
+
+from ast_node import FALSE, TRUE, ASTNode
+
+MAGIC = b'LYCAST\x02'
+JSON_FORMAT = 'lyc-ast'
+JSON_VERSION = 2
+
+# Item kinds
+_NODE = 0
+_CHILD = 1
+_TRUE = 2
+_FALSE = 3
+
+# Value tags (value of a node or a plain child)
+_NONE = 0
+_STR = 1
+_INT = 2
+_FLOAT = 3
+_BOOL = 4
+
+_ARRAYS = ('kind', 'nodetype', 'tag', 'ref', 'dtype', 'lineno', 'end', 'count', 'ints', 'floats')
+_TYPECODES = {'kind': 'B', 'nodetype': 'I', 'tag': 'B', 'ref': 'I', 'dtype': 'I', 'lineno': 'I', 'end': 'I',
+              'count': 'I', 'ints': 'q', 'floats': 'd'}
+
+
+def to_bytes(root) -> bytes:
+    strings = {}
+    arrays = {name: array(code) for name, code in _TYPECODES.items()}
+    kind, nodetype, tag, ref = arrays['kind'], arrays['nodetype'], arrays['tag'], arrays['ref']
+    dtype, lineno, end, count = arrays['dtype'], arrays['lineno'], arrays['end'], arrays['count']
+    ints, floats = arrays['ints'], arrays['floats']
+
+    def intern(s):
+        i = strings.get(s)
+        if i is None:
+            i = strings[s] = len(strings)
+        return i
+
+    def scalar(v):
+        # (tag, ref) of a value
+        if v is None:
+            return _NONE, 0
+        if type(v) is str:
+            return _STR, intern(v)
+        if type(v) is bool:
+            return _BOOL, int(v)
+        if type(v) is int:
+            ints.append(v)
+            return _INT, len(ints) - 1
+        if type(v) is float:
+            floats.append(v)
+            return _FLOAT, len(floats) - 1
+        raise Exception(f'Valor no serializable en el AST: {v!r}')
+
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node is TRUE or node is FALSE:
+            kind.append(_TRUE if node is TRUE else _FALSE)
+            t, r, nt, dt, ln, e, n = _NONE, 0, 0, 0, 0, 0, 0
+        elif isinstance(node, ASTNode):
+            kind.append(_NODE)
+            t, r = scalar(node.value)
+            nt = intern(node.nodetype)
+            dt = 0 if node.dtype is None else intern(node.dtype) + 1
+            ln = node.lineno or 0
+            e = node.end or 0
+            n = len(node.children)
+            stack.extend(reversed(node.children))
+        else:
+            kind.append(_CHILD)
+            t, r = scalar(node)
+            nt, dt, ln, e, n = 0, 0, 0, 0, 0
+        nodetype.append(nt)
+        tag.append(t)
+        ref.append(r)
+        dtype.append(dt)
+        lineno.append(ln)
+        end.append(e)
+        count.append(n)
+
+    encoded = [s.encode('utf-8') for s in strings]
+    blob = b''.join(encoded)
+    parts = [MAGIC, _pack_array(array('I', map(len, encoded))), struct.pack('<Q', len(blob)), blob]
+    parts.extend(_pack_array(_narrow(arrays[name])) for name in _ARRAYS)
+    return b''.join(parts)
+
+
+def _narrow(a: array) -> array:
+    # Smallest unsigned typecode that holds every item of an index array
+    if a.typecode not in 'BHI' or not a:
+        return a
+    top = max(a)
+    code = 'B' if top < 1 << 8 else 'H' if top < 1 << 16 else 'I'
+    return a if code == a.typecode else array(code, a)
+
+
+def from_bytes(data: bytes):
+    if not data.startswith(MAGIC):
+        raise Exception('Archivo de AST inválido (encabezado desconocido)')
+    view = memoryview(data)
+    pos = len(MAGIC)
+    lengths, pos = _unpack_array(view, pos)
+    (size,) = struct.unpack_from('<Q', view, pos)
+    pos += 8
+    blob = bytes(view[pos:pos + size])
+    pos += size
+    strings = []
+    start = 0
+    for n in lengths:
+        strings.append(sys.intern(blob[start:start + n].decode('utf-8')))
+        start += n
+    arrays = {}
+    for name in _ARRAYS:
+        arrays[name], pos = _unpack_array(view, pos)
+    return _build(strings, arrays)
+
+
+def _pack_array(a: array) -> bytes:
+    # typecode, item count and little-endian items
+    if sys.byteorder != 'little':
+        a = array(a.typecode, a)
+        a.byteswap()
+    return a.typecode.encode('ascii') + struct.pack('<Q', len(a)) + a.tobytes()
+
+
+def _unpack_array(view, pos: int):
+    typecode = chr(view[pos])
+    (n,) = struct.unpack_from('<Q', view, pos + 1)
+    pos += 9
+    a = array(typecode)
+    end = pos + n * a.itemsize
+    a.frombytes(view[pos:end])
+    if sys.byteorder != 'little':
+        a.byteswap()
+    return a, end
+
+
+def _build(strings: list, arrays: dict):
+    # Rebuild the tree from the preorder items, last item first: the
+    # children of a node are then the top `count` entries of the stack.
+    # The tree is acyclic, so the cycle collector is paused while it grows
+    # (it would otherwise walk the new nodes again and again).
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _build_items(strings, arrays)
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _build_items(strings: list, arrays: dict):
+    ints, floats = arrays['ints'], arrays['floats']
+    dtypes = [None] + strings
+    new = ASTNode.__new__
+    stack = []
+    push, pop = stack.append, stack.pop
+    items = zip(reversed(arrays['kind']), reversed(arrays['nodetype']), reversed(arrays['tag']),
+                reversed(arrays['ref']), reversed(arrays['dtype']), reversed(arrays['lineno']),
+                reversed(arrays['end']), reversed(arrays['count']))
+    for k, nt, t, r, dt, ln, e, n in items:
+        if k == _TRUE:
+            push(TRUE)
+            continue
+        if k == _FALSE:
+            push(FALSE)
+            continue
+        if t == _NONE:
+            value = None
+        elif t == _STR:
+            value = strings[r]
+        elif t == _INT:
+            value = ints[r]
+        elif t == _FLOAT:
+            value = floats[r]
+        else:
+            value = bool(r)
+        if k == _CHILD:
+            push(value)
+            continue
+        node = new(ASTNode)
+        node.nodetype = strings[nt]
+        node.value = value
+        node.dtype = dtypes[dt]
+        node.lineno = ln
+        node.end = e
+        if n == 0:
+            node.children = ()
+        elif n == 1:
+            node.children = (pop(),)
+        elif n == 2:
+            node.children = (pop(), pop())
+        else:
+            node.children = tuple([pop() for _ in range(n)])
+        push(node)
+    if len(stack) != 1:
+        raise Exception('Archivo de AST inválido (estructura incompleta)')
+    return stack[0]
+
+
+def to_json(root, indent=None) -> str:
+    items = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node is TRUE:
+            items.append({'shared': 'TRUE'})
+        elif node is FALSE:
+            items.append({'shared': 'FALSE'})
+        elif isinstance(node, ASTNode):
+            items.append({'nodetype': node.nodetype, 'value': node.value, 'dtype': node.dtype,
+                          'lineno': node.lineno or 0, 'end': node.end or 0, 'children': len(node.children)})
+            stack.extend(reversed(node.children))
+        else:
+            items.append({'child': node})
+    return json.dumps({'format': JSON_FORMAT, 'version': JSON_VERSION, 'items': items}, indent=indent,
+                      ensure_ascii=False)
+
+
+def from_json(text: str):
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _from_json(text)
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _from_json(text: str):
+    doc = json.loads(text)
+    if doc.get('format') != JSON_FORMAT or doc.get('version') != JSON_VERSION:
+        raise Exception('Archivo de AST inválido (formato JSON desconocido)')
+    stack = []
+    intern = sys.intern
+    for item in reversed(doc['items']):
+        if 'shared' in item:
+            stack.append(TRUE if item['shared'] == 'TRUE' else FALSE)
+        elif 'child' in item:
+            stack.append(item['child'])
+        else:
+            n = item['children']
+            children = [stack.pop() for _ in range(n)]
+            value = item['value']
+            stack.append(ASTNode(item['nodetype'], intern(value) if type(value) is str else value, children,
+                                 item['dtype'], item['lineno'], item['end']))
+    if len(stack) != 1:
+        raise Exception('Archivo de AST inválido (estructura incompleta)')
+    return stack[0]
+
+
+def save_ast(root, path) -> None:
+    # JSON for a .json path, binary otherwise
+    path = Path(path)
+    if path.suffix == '.json':
+        path.write_text(to_json(root), encoding='utf-8')
+    else:
+        path.write_bytes(to_bytes(root))
+
+
+def load_ast(path):
+    path = Path(path)
+    if path.suffix == '.json':
+        return from_json(path.read_text(encoding='utf-8'))
+    return from_bytes(path.read_bytes())
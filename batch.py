@@ -0,0 +1,190 @@
+"""Batch compilation of many LyC sources across a process pool.
+
+compile_batch(inputs, out_dir) expands files/globs, compiles every source in
+a worker process and writes its artifacts into `out_dir`:
+
+    <nombre>.dot                  AST in Graphviz DOT
+    <nombre>.tabla_simbolos.txt   symbol table report
+    <nombre>.ir.txt               quadruple listing
+    <nombre>.asm                  TASM program (see asm_generator)
+
+Each file yields a result dict with its status, diagnostics, token count and
+latency; format_summary() turns the results into a throughput summary. With
+`use_cache` every worker looks its source up in the compilation cache (see
+compile_cache) and the result records whether it was a hit or a miss.
+With `render_png` the parent renders every DOT through a bounded
+render_queue.RenderQueue as results arrive (<nombre>.png or <nombre>.svg).
+"""
+import glob
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, List
+
+from compile_cache import DEFAULT_MAX_BYTES, CompileCache
+from compiler import CompileOptions, compile_source
+from render_queue import RenderQueue
+from trace_sink import TRACE, Trace
+
+
+def expand_inputs(patterns: Iterable[str]) -> List[Path]:
+    # Expand globs (recursive `**` allowed), keep plain paths as given and
+    # drop duplicates while preserving order
+    seen = set()
+    paths = []
+    for pat in patterns:
+        matches = sorted(glob.glob(pat, recursive=True)) if glob.has_magic(pat) else [pat]
+        for m in matches:
+            p = Path(m)
+            if p.is_dir():
+                continue
+            key = p.resolve()
+            if key not in seen:
+                seen.add(key)
+                paths.append(p)
+    return paths
+
+
+def artifact_names(paths: List[Path]) -> List[str]:
+    # Output base name per input: the file stem, suffixed with -2, -3...
+    # when two inputs share a stem
+    used = {}
+    names = []
+    for p in paths:
+        stem = p.stem
+        n = used.get(stem, 0) + 1
+        used[stem] = n
+        names.append(stem if n == 1 else f'{stem}-{n}')
+    return names
+
+
+def _init_worker():
+    # Workers compile silently; the parent prints the summary
+    TRACE.configure('off', count=False)
+
+
+def compile_file(path, out_dir, name=None, render_png=False, opt_level=0, cache=None, bulk_lexer=False,
+                 dot_exporter=None) -> dict:
+    # Compile a single source and write its artifacts. Never raises: errors
+    # are reported in the result's `diagnostics`.
+    path = Path(path)
+    out_dir = Path(out_dir)
+    name = name or path.stem
+    result = {
+        'input': str(path),
+        'status': 'ok',
+        'diagnostics': [],
+        'tokens': 0,
+        'seconds': 0.0,
+        'outputs': [],
+        'cache': None,
+        'render': None,
+    }
+    start = time.perf_counter()
+    try:
+        # compile_source gives every file a fresh compilation context
+        code = path.read_text(encoding='utf-8')
+        dot_path = out_dir / f'{name}.dot'
+        ir_path = out_dir / f'{name}.ir.txt'
+        asm_path = out_dir / f'{name}.asm'
+        compiled = compile_source(code, CompileOptions(dot_path=dot_path, render_png=render_png, ir_path=ir_path,
+                                                       asm_path=asm_path, opt_level=opt_level, cache=cache,
+                                                       bulk_lexer=bulk_lexer, wait_render=True,
+                                                       dot_exporter=dot_exporter))
+        result['tokens'] = compiled.token_count
+        if cache is not None:
+            result['cache'] = 'hit' if compiled.cached else 'miss'
+        table_path = out_dir / f'{name}.tabla_simbolos.txt'
+        compiled.symbols.write_report(table_path)
+        result['outputs'] = [str(dot_path), str(table_path), str(ir_path), str(asm_path)]
+    except Exception as e:
+        result['status'] = 'error'
+        result['diagnostics'].append(str(e))
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def _compile_file_cached(path, out_dir, name, render_png, opt_level, cache_dir, cache_max_bytes,
+                         bulk_lexer, dot_exporter) -> dict:
+    # Worker entry point with a cache of its own over the shared directory
+    cache = CompileCache(cache_dir, cache_max_bytes)
+    return compile_file(path, out_dir, name, render_png, opt_level, cache, bulk_lexer, dot_exporter)
+
+
+def compile_batch(inputs: Iterable[str], out_dir, jobs=None, render_png=False, opt_level=0, cache_dir=None,
+                  cache_max_bytes=DEFAULT_MAX_BYTES, use_cache=False, bulk_lexer=False, render_format='png',
+                  render_jobs=2, dot_exporter=None) -> dict:
+    # Compile every input in parallel. Returns {'results': [...], 'seconds': wall}
+    # with results in input order. With use_cache, sources already compiled
+    # with the same options are served from the cache in `cache_dir`. With
+    # render_png the DOT of each compiled file is rendered (png or svg) by a
+    # bounded queue of `render_jobs` renders in this process while the
+    # workers go on compiling; unchanged DOTs are not rendered again.
+    # `dot_exporter` (picklable, see ast_exporter) replaces the full DOT.
+    paths = expand_inputs(inputs)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    names = artifact_names(paths)
+    jobs = jobs or os.cpu_count() or 1
+    renders = RenderQueue(workers=render_jobs, max_pending=4 * render_jobs, cache_dir=cache_dir) if render_png else None
+
+    start = time.perf_counter()
+    results = []
+    pending = []
+    if paths:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(paths)), initializer=_init_worker) as pool:
+            if use_cache:
+                futures = [pool.submit(_compile_file_cached, p, out_dir, n, False, opt_level, cache_dir,
+                                       cache_max_bytes, bulk_lexer, dot_exporter) for p, n in zip(paths, names)]
+            else:
+                futures = [pool.submit(compile_file, p, out_dir, n, False, opt_level, None, bulk_lexer, dot_exporter)
+                           for p, n in zip(paths, names)]
+            for f in futures:
+                result = f.result()
+                results.append(result)
+                if renders is not None and result['status'] == 'ok':
+                    pending.append((result, renders.submit(result['outputs'][0], render_format, Trace())))
+    if renders is not None:
+        renders.shutdown()
+        for result, future in pending:
+            result['render'] = future.result()['status'] if future is not None else None
+    return {'results': results, 'seconds': time.perf_counter() - start}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    # Nearest-rank percentile
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(k, len(ordered)) - 1]
+
+
+def format_summary(batch: dict) -> str:
+    results = batch['results']
+    wall = batch['seconds'] or 1e-9
+    ok = sum(1 for r in results if r['status'] == 'ok')
+    total_tokens = sum(r['tokens'] for r in results)
+    latencies = [r['seconds'] for r in results]
+    lines = []
+    for r in results:
+        cached = ', cache' if r.get('cache') == 'hit' else ''
+        lines.append(f"{r['status'].upper():<6}{r['input']}  ({r['seconds'] * 1000:.1f} ms{cached})")
+        for d in r['diagnostics']:
+            lines.append(f'      {d}')
+    lines.append('-' * 65)
+    lines.append(f'{len(results)} archivo(s): {ok} ok, {len(results) - ok} con errores en {wall:.3f} s')
+    lines.append(f'{len(results) / wall:.1f} archivos/s, {total_tokens / wall:.0f} tokens/s')
+    lines.append(f'latencia por archivo: p50 {percentile(latencies, 50) * 1000:.1f} ms, '
+                 f'p95 {percentile(latencies, 95) * 1000:.1f} ms')
+    hits = sum(1 for r in results if r.get('cache') == 'hit')
+    misses = sum(1 for r in results if r.get('cache') == 'miss')
+    if hits or misses:
+        lines.append(f'cache de compilación: {hits} acierto(s), {misses} fallo(s)')
+    renders = [r['render'] for r in results if r.get('render')]
+    if renders:
+        lines.append(f"render: {renders.count('rendered')} generado(s), {renders.count('skipped')} sin cambios, "
+                     f"{renders.count('error')} con error")
+    return '\n'.join(lines)
@@ -0,0 +1,79 @@
+"""Memory footprint of the AST for generated programs.
+
+For each size the program is compiled in a fresh subprocess so the peak
+RSS of one size does not leak into the next. Reported per size:
+
+    nodes        ASTNode instances in the tree
+    bytes/node   traced allocations kept alive by the AST / nodes
+    peak RSS     maximum resident set size of the subprocess
+
+Usage: python benchmarks/bench_ast_memory.py [--nodes 10000 100000 1000000]
+"""
+import argparse
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Nodes produced by each statement of workloads.arithmetic_program
+NODES_PER_STATEMENT = 10
+
+
+def count_nodes(root) -> int:
+    n = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if hasattr(node, 'nodetype'):
+            n += 1
+            stack.extend(node.children)
+    return n
+
+
+def measure(target_nodes: int) -> dict:
+    from compiler import compile_source
+    from workloads import arithmetic_program
+
+    code = arithmetic_program(max(1, target_nodes // NODES_PER_STATEMENT))
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    result = compile_source(code)
+    ast = result.ast
+    del result
+    gc.collect()
+    kept = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    nodes = count_nodes(ast)
+    # ru_maxrss is in KiB on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return {'nodes': nodes, 'bytes_per_node': kept / nodes, 'peak_rss': peak_rss}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--nodes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    ap.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure(args.child)))
+        return
+
+    print(f"{'nodes':>10}  {'bytes/node':>10}  {'peak RSS (MiB)':>14}")
+    for n in args.nodes:
+        out = subprocess.run([sys.executable, __file__, '--child', str(n)],
+                             check=True, capture_output=True, text=True).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        print(f"{r['nodes']:>10}  {r['bytes_per_node']:>10.1f}  {r['peak_rss'] / 2**20:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
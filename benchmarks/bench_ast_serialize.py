@@ -0,0 +1,83 @@
+"""Saving and reloading the AST vs. parsing the source again.
+
+For each program size: time of parsing the source (lexer, parser and
+semantic actions, as compiler.parse without folding), size and time of
+the DOT export, and size, save time and load time of the binary and JSON
+formats of ast_serializer. Every reloaded tree
+is compared with the original (nodetype, value, dtype, lineno, children
+and the shared TRUE/FALSE leaves).
+
+Usage: python benchmarks/bench_ast_serialize.py [--statements 1000 10000 100000]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ast_exporter import ASTDotExporter  # noqa: E402
+from ast_node import FALSE, TRUE, ASTNode  # noqa: E402
+from ast_serializer import from_bytes, from_json, to_bytes, to_json  # noqa: E402
+from compiler import CompileOptions, parse  # noqa: E402
+from semantic_context import CompilationContext  # noqa: E402
+from trace_sink import Trace  # noqa: E402
+from workloads import arithmetic_program  # noqa: E402
+
+
+def same_tree(a, b) -> bool:
+    stack = [(a, b)]
+    while stack:
+        x, y = stack.pop()
+        if isinstance(x, ASTNode):
+            if not isinstance(y, ASTNode):
+                return False
+            if (x.nodetype, x.value, x.dtype, x.lineno, len(x.children)) != \
+                    (y.nodetype, y.value, y.dtype, y.lineno, len(y.children)):
+                return False
+            if (x is TRUE) != (y is TRUE) or (x is FALSE) != (y is FALSE):
+                return False
+            stack.extend(zip(x.children, y.children))
+        elif type(x) is not type(y) or x != y:
+            return False
+    return True
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - start
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--statements', type=int, nargs='+', default=[1000, 10000, 100000])
+    args = ap.parse_args(argv)
+
+    header = (f"{'sentencias':>10}{'formato':>9}{'KiB':>11}{'guardar ms':>12}{'cargar ms':>11}"
+              f"{'vs parseo':>11}")
+    print(header)
+    print('-' * len(header))
+    for n in args.statements:
+        text = arithmetic_program(n)
+        (ast, _, _), parse_s = timed(parse, text, CompileOptions(fold=False), CompilationContext(trace=Trace()))
+        print(f"{n:>10}{'fuente':>9}{len(text.encode('utf-8')) / 1024:>11.1f}{'':>12}{parse_s * 1000:>11.1f}"
+              f"{'1.0x':>11}")
+        dot, dot_s = timed(ASTDotExporter().to_dot, ast)
+        print(f"{'':>10}{'dot':>9}{len(dot.encode('utf-8')) / 1024:>11.1f}{dot_s * 1000:>12.1f}{'-':>11}{'-':>11}")
+        for name, save, load in (('binario', to_bytes, from_bytes), ('json', to_json, from_json)):
+            data, save_s = timed(save, ast)
+            back, load_s = timed(load, data)
+            if not same_tree(ast, back):
+                print(f'  {name}: el AST recargado es distinto del original')
+                return 1
+            size = len(data) if isinstance(data, bytes) else len(data.encode('utf-8'))
+            print(f"{'':>10}{name:>9}{size / 1024:>11.1f}{save_s * 1000:>12.1f}{load_s * 1000:>11.1f}"
+                  f"{parse_s / load_s:>10.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""Peak memory and speed of lexing a file in chunks vs. reading it whole.
+
+Before measuring, every test program is written to a temporary file and
+lexed by ChunkedLexer with several chunk sizes (down to one byte, so
+tokens, strings, multi-byte characters and `#+ ... +#` comments cross
+chunk boundaries, and comments close past the cut of the buffer where
+they opened); the script fails if the tokens, line numbers,
+positions or error messages differ from the PLY lexer over the whole text.
+
+The measurement writes an arithmetic program with `--statements`
+statements and pulls all its tokens: once with Path.read_text() and the
+PLY lexer, once through ChunkedLexer. Peak memory is measured with
+tracemalloc (the mmap'd pages of the file are not Python allocations).
+
+Usage: python benchmarks/bench_chunked.py [--statements 100000] [--chunk-kb 256]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_lexer import EDGE_CASES, ply_tokens  # noqa: E402
+from chunked_lexer import ChunkedLexer  # noqa: E402
+from lexer import lexer as base_lexer  # noqa: E402
+from workloads import arithmetic_program, init_program, nested_program  # noqa: E402
+
+CHUNK_CASES = [
+    '#+ un comentario\nque cruza\n\nvarios bloques +#\nx := 1\n#+ otro +# y := 2 #+\n+#',
+    '#+' + '\n' * 50 + '+#z := 3',
+    'x := 1 #++# y := 2 #+#+# z := 3',
+    's := "ñandú €"\nt := "日本"\n',
+    'x := 12345\n' * 20 + '#+ sin cerrar\n' + 'y := 1\n' * 20,
+    'x := 1\n' * 30 + 'z := @',
+    'a := ' + ' + '.join(['1'] * 400),
+    # comment closed after the cut of the buffer where it opened, then a
+    # `+#` inside a string that must not be taken as its end
+    'init {\n c : String\n}\n#+ nota\n fin +# c := "a"\nwrite("uso +# aqui")\n',
+    '#+ a\nb +# x := 1\n#+ c\n +# s := "+#"\n#+\n\n+#"#+"',
+]
+CHUNK_SIZES = (1, 2, 3, 7, 9, 12, 20, 64, 4096)
+
+
+def chunked_tokens(path, chunk_size: int):
+    lexer = ChunkedLexer(chunk_size)
+    lexer.input(path)
+    out = []
+    try:
+        for tok in iter(lexer.token, None):
+            out.append((tok.type, tok.value, tok.lineno, tok.lexpos))
+    except Exception as e:
+        out.append(('error', str(e)))
+    return out
+
+
+def differential(programs, tmp: Path) -> int:
+    failures = 0
+    path = tmp / 'programa.txt'
+    for name, text in programs:
+        path.write_text(text, encoding='utf-8')
+        expected = ply_tokens(text)
+        for size in CHUNK_SIZES:
+            got = chunked_tokens(path, size)
+            if got != expected:
+                failures += 1
+                for i, (a, b) in enumerate(zip(expected, got)):
+                    if a != b:
+                        break
+                else:
+                    i = min(len(expected), len(got))
+                print(f'DISTINTO {name} (bloques de {size} bytes): token {i}: '
+                      f'PLY {expected[i:i + 1]} / chunked {got[i:i + 1]}')
+                break
+    return failures
+
+
+def measure(run) -> tuple:
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = run()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, elapsed, peak
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--statements', type=int, default=100000)
+    ap.add_argument('--chunk-kb', type=int, default=256)
+    args = ap.parse_args(argv)
+
+    programs = [(f'borde {i}', text) for i, text in enumerate(EDGE_CASES + CHUNK_CASES)]
+    programs += [
+        ('aritmetica', arithmetic_program(300)),
+        ('if anidados', nested_program(50)),
+        ('init', init_program(300)),
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        failures = differential(programs, tmp)
+        print(f'comparacion con PLY: {len(programs) - failures}/{len(programs)} programas identicos')
+        if failures:
+            return 1
+
+        path = tmp / 'grande.txt'
+        path.write_text(arithmetic_program(args.statements), encoding='utf-8')
+        mb = path.stat().st_size / (1024 * 1024)
+
+        def whole():
+            lexer = base_lexer.clone()
+            lexer.input(path.read_text(encoding='utf-8'))
+            lexer.lineno = 1
+            return sum(1 for _ in iter(lexer.token, None))
+
+        def chunked():
+            lexer = ChunkedLexer(args.chunk_kb * 1024)
+            lexer.input(path)
+            return sum(1 for _ in iter(lexer.token, None))
+
+        print(f'{args.statements} sentencias, {mb:.1f} MiB')
+        print(f"{'lectura':<10}{'tokens':>10}{'seg':>10}{'pico MiB':>12}")
+        for name, run in (('completa', whole), ('bloques', chunked)):
+            count, elapsed, peak = measure(run)
+            print(f'{name:<10}{count:>10}{elapsed:>10.3f}{peak / (1024 * 1024):>12.2f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""Register lowering vs. naive memory-to-memory lowering of the TASM back end.
+
+TASM/DOS cannot run here, so both programs are measured statically: for
+every workload the script reports instructions, memory operands and the
+cycles estimated with the 386/387 timings below (typical values from the
+Intel 80386/80387 reference tables; conditional jumps counted as taken).
+Macro calls (displayString, STRCPY, GetInteger, ...) are emitted the same
+way by both lowerings and are left out of the cycle estimate. Each
+lowering is also measured after the peephole optimizer (+mirilla).
+
+Usage: python benchmarks/bench_codegen.py [--statements 1000]
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from asm_generator import LABEL, AsmGenerator  # noqa: E402
+from compiler import compile_source  # noqa: E402
+from peephole import PeepholeOptimizer  # noqa: E402
+from workloads import arithmetic_program, equal_expressions_program, nested_program  # noqa: E402
+
+REGISTERS = frozenset(('eax', 'ebx', 'ecx', 'edx', 'esi', 'edi', 'ax', 'si', 'di', 'st', 'st(1)'))
+
+# (register/immediate form, form with a memory operand)
+CYCLES = {
+    'mov': (2, 4), 'add': (2, 6), 'sub': (2, 6), 'cmp': (2, 5), 'imul': (22, 25), 'lea': (2, 2),
+    'JMP': (7, 7), 'JE': (7, 7), 'JNE': (7, 7), 'JL': (7, 7), 'JLE': (7, 7), 'JG': (7, 7),
+    'JGE': (7, 7), 'JB': (7, 7), 'JBE': (7, 7), 'JA': (7, 7), 'JAE': (7, 7),
+    'fld': (22, 20), 'fild': (45, 45), 'fstp': (44, 44), 'fistp': (82, 82),
+    'fadd': (27, 28), 'fsub': (29, 28), 'fmul': (46, 31), 'fdiv': (91, 89),
+    'fiadd': (65, 65), 'fisub': (65, 65), 'fimul': (72, 72), 'fidiv': (120, 120),
+    'faddp': (27, 27), 'fsubp': (29, 29), 'fsubrp': (29, 29), 'fmulp': (46, 46),
+    'fdivp': (91, 91), 'fdivrp': (91, 91), 'fcomp': (30, 30), 'ficomp': (60, 60),
+    'fcompp': (26, 26), 'fxch': (18, 18), 'fstsw': (13, 13), 'sahf': (3, 3),
+    'fst': (44, 44), 'fcom': (24, 24), 'xor': (2, 6),
+}
+
+
+def is_memory(arg: str) -> bool:
+    arg = arg.replace('dword ptr ', '')
+    return arg not in REGISTERS and not arg.lstrip('-').isdigit() and not arg.startswith('ET_')
+
+
+def measure(code) -> dict:
+    instructions = memory = cycles = 0
+    for op, args in code:
+        if op == LABEL:
+            continue
+        instructions += 1
+        mem = any(is_memory(a) for a in args)
+        memory += mem
+        cost = CYCLES.get(op)
+        if cost is not None:
+            cycles += cost[1] if mem else cost[0]
+    return {'instructions': instructions, 'memory': memory, 'cycles': cycles}
+
+
+def lower(code: str, naive: bool, peephole: bool = False) -> dict:
+    result = compile_source(code)
+    gen = AsmGenerator(result.sem, naive=naive)
+    asm = gen.generate(result.ast, result.ir)
+    if peephole:
+        asm = PeepholeOptimizer().run(asm)
+    return measure(asm)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--statements', type=int, default=1000)
+    args = ap.parse_args(argv)
+    n = args.statements
+
+    workloads = [
+        (f'aritmetica ({n} sentencias)', arithmetic_program(n)),
+        ('if anidados (50)', nested_program(50, 'if')),
+        ('while anidados (50)', nested_program(50, 'while')),
+        ('equalExpressions (50)', equal_expressions_program(50)),
+    ]
+    sample = os.path.join(ROOT, 'resources', 'prueba.txt')
+    if os.path.exists(sample):
+        with open(sample, encoding='utf-8') as fh:
+            workloads.append(('resources/prueba.txt', fh.read()))
+
+    header = f"{'workload':<30}{'modo':>18}{'instr':>10}{'mem':>10}{'ciclos':>12}{'speedup':>10}"
+    print(header)
+    print('-' * len(header))
+    for name, code in workloads:
+        naive = lower(code, True)
+        modes = (
+            ('naive', naive),
+            ('naive+mirilla', lower(code, True, True)),
+            ('registros', lower(code, False)),
+            ('registros+mirilla', lower(code, False, True)),
+        )
+        for mode, m in modes:
+            speedup = f"{naive['cycles'] / m['cycles']:.2f}x" if m['cycles'] else '-'
+            print(f"{name:<30}{mode:>18}{m['instructions']:>10}{m['memory']:>10}{m['cycles']:>12}{speedup:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Throughput and memory of the DOT export on large programs.
+
+Compiles generated programs (many flat statements and deeply nested
+blocks), then streams the AST as DOT to a temporary file and reports
+nodes/s, MB/s and the traced memory peak of the export itself.
+
+Usage: python benchmarks/bench_dot_export.py [--statements 20000] [--depth 5000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ast_exporter import ASTDotExporter  # noqa: E402
+from compiler import compile_source  # noqa: E402
+from workloads import arithmetic_program, nested_program  # noqa: E402
+
+
+def count_nodes(root) -> int:
+    n = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if hasattr(node, 'nodetype'):
+            n += 1
+            stack.extend(node.children)
+    return n
+
+
+def export(ast, path: str) -> None:
+    with open(path, 'w', encoding='utf-8') as fh:
+        ASTDotExporter().write_dot(ast, fh)
+
+
+def bench(name: str, code: str) -> None:
+    ast = compile_source(code).ast
+    nodes = count_nodes(ast)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'ast.dot')
+        # Timed run first, then a traced run for the memory peak
+        start = time.perf_counter()
+        export(ast, path)
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(path)
+        tracemalloc.start()
+        export(ast, path)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    print(f'{name:<22}{nodes:>10}{nodes / elapsed:>14.0f}{size / elapsed / 2**20:>10.1f}'
+          f'{peak / 2**20:>14.2f}{size / 2**20:>12.1f}')
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--statements', type=int, default=20_000)
+    ap.add_argument('--depth', type=int, default=5_000)
+    args = ap.parse_args(argv)
+
+    print(f"{'programa':<22}{'nodos':>10}{'nodos/s':>14}{'MB/s':>10}{'pico (MiB)':>14}{'DOT (MiB)':>12}")
+    bench(f'{args.statements} sentencias', arithmetic_program(args.statements))
+    bench(f'if anidado x{args.depth}', nested_program(args.depth, 'if'))
+    bench(f'while anidado x{args.depth}', nested_program(args.depth, 'while'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Size of the full vs. the summarized DOT export as programs grow.
+
+Graphviz layout time grows with the nodes and edges of the graph, so the
+script reports, for the full ASTDotExporter and for SummaryDotExporter
+with `--budget`, the DOT nodes, edges and bytes and the export time. The
+summarized graph must stay within the budget at every size; when `dot` is
+installed the layout time of both graphs is measured too (skipped for full
+graphs above `--max-layout-nodes`).
+
+Usage: python benchmarks/bench_dot_summary.py [--statements 100 1000 10000 100000] [--budget 500]
+"""
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ast_exporter import ASTDotExporter, SummaryDotExporter  # noqa: E402
+from compiler import CompileOptions, parse  # noqa: E402
+from semantic_context import CompilationContext  # noqa: E402
+from trace_sink import Trace  # noqa: E402
+from workloads import arithmetic_program, nested_program  # noqa: E402
+
+NODE = re.compile(r'^\s+n\d+ \[', re.M)
+EDGE = re.compile(r'^\s+n\d+ -> ', re.M)
+
+
+def layout(dot_text: str):
+    dot = shutil.which('dot')
+    if dot is None:
+        return None
+    start = time.perf_counter()
+    subprocess.run([dot, '-Tsvg', '-o', os.devnull], input=dot_text.encode('utf-8'), check=True)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--statements', type=int, nargs='+', default=[100, 1000, 10000, 100000])
+    ap.add_argument('--budget', type=int, default=500)
+    ap.add_argument('--max-layout-nodes', type=int, default=20000)
+    args = ap.parse_args(argv)
+
+    header = f"{'programa':<22}{'export':<9}{'nodos':>9}{'aristas':>9}{'KiB':>10}{'export ms':>11}{'layout s':>10}"
+    print(header)
+    print('-' * len(header))
+    programs = [(f'{n} sentencias', arithmetic_program(n)) for n in args.statements]
+    programs.append(('1000 if anidados', nested_program(1000)))
+    for name, text in programs:
+        ast = parse(text, CompileOptions(fold=False), CompilationContext(trace=Trace()))[0]
+        for kind, exporter in (('completo', ASTDotExporter()), ('resumen', SummaryDotExporter(args.budget))):
+            start = time.perf_counter()
+            dot = exporter.to_dot(ast)
+            elapsed = time.perf_counter() - start
+            nodes = len(NODE.findall(dot))
+            if kind == 'resumen' and nodes > args.budget:
+                print(f'{name}: el resumen tiene {nodes} nodos (presupuesto {args.budget})')
+                return 1
+            seconds = layout(dot) if kind == 'resumen' or nodes <= args.max_layout_nodes else None
+            shown = f'{seconds:>10.2f}' if seconds is not None else f"{'-':>10}"
+            print(f'{name:<22}{kind:<9}{nodes:>9}{len(EDGE.findall(dot)):>9}{len(dot.encode("utf-8")) / 1024:>10.1f}'
+                  f'{elapsed * 1000:>11.1f}{shown}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
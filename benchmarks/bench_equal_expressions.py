@@ -0,0 +1,63 @@
+"""Size of the equalExpressions lowering.
+
+Compiles `e := equalExpressions(...)` with N arguments and reports the AST
+size, the quadruples and the TASM instructions generated. A linear
+lowering shows up as a constant per-argument column. Lists of literals are
+decided by constant folding and reduce to a single store.
+
+Usage: python benchmarks/bench_equal_expressions.py [--sizes 10 100 1000]
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from asm_generator import LABEL, AsmGenerator  # noqa: E402
+from compiler import compile_source  # noqa: E402
+from workloads import equal_expressions_program  # noqa: E402
+
+
+def count_nodes(ast) -> int:
+    # Nodes plus plain leaves (names, temporaries), without recursion
+    count = 0
+    stack = [ast]
+    while stack:
+        node = stack.pop()
+        count += 1
+        if isinstance(node, list):
+            stack.extend(node)
+        else:
+            stack.extend(getattr(node, 'children', ()))
+    return count
+
+
+def measure(code: str) -> dict:
+    result = compile_source(code)
+    asm = AsmGenerator(result.sem).generate(result.ast)
+    return {
+        'nodes': count_nodes(result.ast),
+        'quads': len(result.ir),
+        'asm': sum(1 for op, _ in asm if op != LABEL),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    args = ap.parse_args(argv)
+
+    header = f"{'argumentos':<22}{'N':>6}{'nodos':>9}{'cuadruplas':>12}{'asm':>8}{'asm/N':>8}"
+    print(header)
+    print('-' * len(header))
+    for constant in (False, True):
+        kind = 'literales' if constant else 'variables y literales'
+        for n in args.sizes:
+            m = measure(equal_expressions_program(n, constant))
+            print(f"{kind:<22}{n:>6}{m['nodes']:>9}{m['quads']:>12}{m['asm']:>8}{m['asm'] / n:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Edit latency of the incremental front end vs. a full re-lex/re-parse.
+
+Builds an arithmetic program with `--lines` statements, applies a few
+single edits in the middle of it through IncrementalParser.edit() and
+reports, for each one, the milliseconds of the edit, the milliseconds of
+program() (building the whole AST afterwards) and how many units were
+re-lexed, parsed and re-checked. The AST after every edit is compared with
+the one of a full parse of the same text.
+
+Usage: python benchmarks/bench_incremental.py [--lines 100000]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from compiler import compile_source  # noqa: E402
+from incremental import IncrementalParser  # noqa: E402
+from workloads import arithmetic_program  # noqa: E402
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--lines', type=int, default=100000)
+    ap.add_argument('--no-check', action='store_true', help='no comparar con un parseo completo')
+    args = ap.parse_args(argv)
+
+    text = arithmetic_program(args.lines)
+    start = time.perf_counter()
+    inc = IncrementalParser(text)
+    print(f'{args.lines} sentencias: carga inicial {(time.perf_counter() - start) * 1000:.1f} ms')
+
+    middle = text.index('\n', len(text) // 2) + 1
+    digit = text.index('* ', middle) + 2
+    decl = text.index(': Int')
+    names = text.index(' : Float')
+    edits = [
+        ('cambiar un digito', digit, digit + 1, '7'),
+        ('insertar un salto de linea', middle, middle, '\n'),
+        ('abrir y cerrar un comentario', middle, middle, '#+ x := 1 +#'),
+        ('nueva sentencia', middle, middle, 'f := 1.5\n'),
+        ('declarar una variable nueva', names, names, ', y'),
+        ('cambiar un tipo en init', decl + 2, decl + 5, 'Float'),
+    ]
+    header = f"{'edicion':<30}{'edit ms':>10}{'ast ms':>10}{'unidades':>10}{'parseadas':>11}{'rechequeos':>12}"
+    print(header)
+    print('-' * len(header))
+    for name, s, e, rep in edits:
+        stats = inc.edit(s, e, rep)
+        start = time.perf_counter()
+        ast = inc.program()
+        build = time.perf_counter() - start
+        print(f"{name:<30}{stats['seconds'] * 1000:>10.2f}{build * 1000:>10.2f}{stats['units']:>10}"
+              f"{stats['parsed']:>11}{stats['rechecked']:>12}")
+        if not args.no_check:
+            full = compile_source(inc.text, {'fold': False}).ast
+            if full.to_string() != ast.to_string():
+                print('  AST distinto del parseo completo')
+                return 1
+
+    start = time.perf_counter()
+    compile_source(inc.text, {'fold': False})
+    print(f'parseo completo: {(time.perf_counter() - start) * 1000:.1f} ms')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""Tokens per second of the PLY lexer vs. the bulk tokenizer.
+
+Before timing, both lexers tokenize a set of programs (the workloads,
+resources/prueba.txt and small edge cases: comments spanning lines,
+negative numbers, reserved words, every kind of lexical error) and the
+script fails if their token types, values, line numbers, positions or
+error messages differ in any of them.
+
+Usage: python benchmarks/bench_lexer.py [--statements 100000] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bulk_lexer import BulkLexer  # noqa: E402
+from lexer import lexer as base_lexer  # noqa: E402
+from workloads import arithmetic_program, equal_expressions_program, init_program, nested_program  # noqa: E402
+
+EDGE_CASES = [
+    '',
+    'x:=-5-3 -x',
+    'a:=1.5 b:=.5 c:=3. d:=10-10-2020',
+    '#+ comentario\nde varias\nlineas +#\nwrite("hola")\n\n\tread(x)',
+    'if (a <= b and not c) { x := 1 } else { x := 2 }',
+    'init { a, b : Int\n c : DateConverted }\nb := convDate(01-02-2023)',
+    's := "' + 'x' * 50 + '"',
+    'x := 1\ny := 40000\nz := @',
+    'x := 1\nz := @\ny := 40000',
+    'f := 1' + '0' * 40 + '.0',
+    'd := convDate(32-01-2020)',
+    's := "' + 'x' * 51 + '"',
+    'x := 1 #+ sin cerrar',
+    'x := "sin cerrar',
+    'x := . + "',
+    'x := \u0663\u0664 + 1',
+]
+
+
+def ply_tokens(text: str):
+    lexer = base_lexer.clone()
+    lexer.input(text)
+    lexer.lineno = 1
+    out = []
+    try:
+        for tok in iter(lexer.token, None):
+            out.append((tok.type, tok.value, tok.lineno, tok.lexpos))
+    except Exception as e:
+        out.append(('error', str(e)))
+    return out
+
+
+def bulk_tokens(text: str):
+    lexer = BulkLexer()
+    lexer.input(text)
+    out = []
+    try:
+        for tok in iter(lexer.token, None):
+            out.append((tok.type, tok.value, tok.lineno, tok.lexpos))
+    except Exception as e:
+        out.append(('error', str(e)))
+    return out
+
+
+def differential(programs) -> int:
+    failures = 0
+    for name, text in programs:
+        expected, got = ply_tokens(text), bulk_tokens(text)
+        if expected != got:
+            failures += 1
+            for i, (a, b) in enumerate(zip(expected, got)):
+                if a != b:
+                    break
+            else:
+                i = min(len(expected), len(got))
+            print(f'DISTINTO {name}: token {i}: PLY {expected[i:i + 1]} / bulk {got[i:i + 1]}')
+    return failures
+
+
+def pull(lexer, text: str) -> int:
+    # Tokens handed out, pulled one at a time as the parser does
+    lexer.input(text)
+    lexer.lineno = 1
+    count = 0
+    for _ in iter(lexer.token, None):
+        count += 1
+    return count
+
+
+def rate(make, text: str, repeat: int) -> tuple:
+    best = None
+    for _ in range(repeat):
+        lexer = make()
+        start = time.perf_counter()
+        count = pull(lexer, text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return count, best
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--statements', type=int, default=100000)
+    ap.add_argument('--repeat', type=int, default=3)
+    args = ap.parse_args(argv)
+
+    programs = [(f'borde {i}', text) for i, text in enumerate(EDGE_CASES)]
+    programs += [
+        ('aritmetica', arithmetic_program(2000)),
+        ('if anidados', nested_program(200)),
+        ('init', init_program(2000)),
+        ('equalExpressions', equal_expressions_program(500)),
+    ]
+    sample = os.path.join(ROOT, 'resources', 'prueba.txt')
+    if os.path.exists(sample):
+        with open(sample, encoding='utf-8') as fh:
+            programs.append(('resources/prueba.txt', fh.read()))
+    failures = differential(programs)
+    print(f'comparacion con PLY: {len(programs) - failures}/{len(programs)} programas identicos')
+    if failures:
+        return 1
+
+    text = arithmetic_program(args.statements)
+    count, ply_s = rate(base_lexer.clone, text, args.repeat)
+    _, bulk_s = rate(BulkLexer, text, args.repeat)
+    print(f'{count} tokens ({args.statements} sentencias)')
+    print(f"{'lexer':<8}{'seg':>10}{'tokens/s':>14}")
+    print(f"{'PLY':<8}{ply_s:>10.3f}{count / ply_s:>14.0f}")
+    print(f"{'bulk':<8}{bulk_s:>10.3f}{count / bulk_s:>14.0f}  ({ply_s / bulk_s:.2f}x)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
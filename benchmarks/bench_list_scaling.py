@@ -0,0 +1,70 @@
+"""Scaling of the list-building productions of the grammar.
+
+Parses programs with growing statement counts, `init` blocks and variable
+lists, and reports the parse time per element together with the maximum
+depth reached by the PLY symbol stack. Linear construction shows up as a
+flat time/element column and a constant stack depth.
+
+Usage: python benchmarks/bench_list_scaling.py [--max 100000]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from lexer import lexer as base_lexer, token_stream  # noqa: E402
+from parser import new_parser  # noqa: E402
+from semantic_context import CompilationContext  # noqa: E402
+from workloads import arithmetic_program, equal_expressions_program, init_program  # noqa: E402
+
+
+def parse_with_depth(code: str):
+    # Parse `code` and return (seconds, max symbol stack depth). The depth is
+    # sampled from a token tap, i.e. every time the parser pulls a token.
+    parser = new_parser(CompilationContext())
+    depth = {'max': 0}
+
+    def sample(_tok):
+        n = len(getattr(parser, 'symstack', ()))
+        if n > depth['max']:
+            depth['max'] = n
+
+    tokens = token_stream(code, taps=[sample], lexer=base_lexer.clone())
+    start = time.perf_counter()
+    parser.parse(lexer=tokens)
+    return time.perf_counter() - start, depth['max']
+
+
+def sizes(maximum: int):
+    n = 1000
+    while n <= maximum:
+        yield n
+        n *= 10
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--max', type=int, default=100_000)
+    ap.add_argument('--max-equal', type=int, default=1_000,
+                    help='limite para la cantidad de argumentos de equalExpressions')
+    args = ap.parse_args(argv)
+
+    cases = [
+        ('sentencias', arithmetic_program, args.max),
+        ('init (10 por linea)', lambda n: init_program(n, 10), args.max),
+        ('init (1 linea)', lambda n: init_program(n, n), args.max),
+        ('equalExpressions', equal_expressions_program, args.max_equal),
+    ]
+    print(f"{'caso':<22}{'n':>9}{'segundos':>11}{'us/elemento':>13}{'pila max':>10}")
+    for name, gen, maximum in cases:
+        for n in sizes(maximum):
+            seconds, depth = parse_with_depth(gen(n))
+            print(f'{name:<22}{n:>9}{seconds:>11.3f}{seconds / n * 1e6:>13.2f}{depth:>10}')
+
+
+if __name__ == '__main__':
+    main()
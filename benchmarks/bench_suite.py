@@ -0,0 +1,243 @@
+"""Per-stage timings and memory of the compiler on generated workloads.
+
+Every workload is a program from workloads.py scaled by `--scale`: many
+statements, a large `init` block, deeply nested `if` and `while`, a long
+`equalExpressions` list, many `convDate` calls and long strings. Each one
+goes through the stages of the front end separately:
+
+  lex      PLY lexer, all tokens pulled into a list
+  symbols  symbol table filled from those tokens
+  parse    parser and semantic actions (tokens replayed from the list)
+  dot      AST written as DOT to a temporary file
+
+For every stage the script reports the best time of `--repeat` runs and
+the traced memory peak of one more run (tracemalloc slows the code down,
+so it is never on during the timed runs).
+
+The results are saved as JSON (`--output`). With `--baseline` they are
+compared with a previous results file: a stage regresses when its time or
+its memory peak grows more than `--threshold` (a fraction, 0.25 = 25%)
+and by more than `--min-seconds` / `--min-kb` (so noise on stages of a few
+milliseconds is not reported); the script then exits with status 1.
+`--save-baseline` copies the results to the baseline path. Timings depend
+on the machine, so no baseline is committed: run `--save-baseline` first
+on the machine that compares. Without a baseline file the script says so
+and compares nothing.
+
+Usage: python benchmarks/bench_suite.py [--scale 1] [--repeat 3] [--output results.json]
+           [--baseline benchmarks/baseline.json] [--threshold 0.25] [--save-baseline]
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ast_exporter import ASTDotExporter  # noqa: E402
+from lexer import lexer as base_lexer  # noqa: E402
+from parser import new_parser  # noqa: E402
+from semantic_context import CompilationContext  # noqa: E402
+from symbol_table import SymbolTable  # noqa: E402
+from trace_sink import Trace  # noqa: E402
+from workloads import (arithmetic_program, conv_date_program, equal_expressions_program, init_program,  # noqa: E402
+                       nested_program, strings_program)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# name -> program generator for a given scale
+WORKLOADS = {
+    'sentencias': lambda scale: arithmetic_program(20000 * scale),
+    'init': lambda scale: init_program(20000 * scale),
+    'if anidados': lambda scale: nested_program(500 * scale),
+    'while anidados': lambda scale: nested_program(500 * scale, 'while'),
+    'equalExpressions': lambda scale: equal_expressions_program(2000 * scale),
+    'convDate': lambda scale: conv_date_program(10000 * scale),
+    'cadenas': lambda scale: strings_program(10000 * scale),
+}
+STAGES = ('lex', 'symbols', 'parse', 'dot')
+
+
+class Replay:
+    # Lexer stand-in that hands out already lexed tokens to the parser
+    def __init__(self, tokens):
+        self.tokens = iter(tokens)
+        self.lineno = 1
+
+    def token(self):
+        tok = next(self.tokens, None)
+        if tok is not None:
+            self.lineno = tok.lineno
+        return tok
+
+
+def lex(text: str) -> list:
+    lexer = base_lexer.clone()
+    lexer.input(text)
+    lexer.lineno = 1
+    return list(iter(lexer.token, None))
+
+
+def symbols(tokens: list) -> SymbolTable:
+    table = SymbolTable()
+    for tok in tokens:
+        table.add_token(tok)
+    return table
+
+
+def parse(tokens: list, table: SymbolTable):
+    ctx = CompilationContext(trace=Trace())
+    ast = new_parser(ctx).parse(lexer=Replay(tokens))
+    ctx.sem.load_from_symbols(table)
+    return ast
+
+
+def dot(ast, path: str) -> None:
+    with open(path, 'w', encoding='utf-8') as fh:
+        ASTDotExporter().write_dot(ast, fh)
+
+
+def measure(run, repeat: int) -> dict:
+    # Best time of `repeat` runs, then the memory peak of one traced run
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    gc.collect()
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'seconds': best, 'peak_bytes': peak}
+
+
+def bench(text: str, repeat: int, dot_path: str) -> dict:
+    tokens = lex(text)
+    table = symbols(tokens)
+    ast = parse(tokens, table)
+    result = {
+        'bytes': len(text.encode('utf-8')),
+        'lines': text.count('\n'),
+        'tokens': len(tokens),
+        'stages': {
+            'lex': measure(lambda: lex(text), repeat),
+            'symbols': measure(lambda: symbols(tokens), repeat),
+            'parse': measure(lambda: parse(tokens, table), repeat),
+            'dot': measure(lambda: dot(ast, dot_path), repeat),
+        },
+    }
+    return result
+
+
+def run_suite(names, scale: int, repeat: int) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        dot_path = os.path.join(tmp, 'ast.dot')
+        for name in names:
+            results[name] = bench(WORKLOADS[name](scale), repeat, dot_path)
+    return {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'scale': scale,
+            'repeat': repeat,
+        },
+        'workloads': results,
+    }
+
+
+def format_results(results: dict) -> str:
+    header = f"{'carga':<18}{'etapa':<9}{'seg':>10}{'pico MiB':>10}{'tokens/s':>12}"
+    lines = [header, '-' * len(header)]
+    for name, result in results['workloads'].items():
+        for stage in STAGES:
+            s = result['stages'][stage]
+            rate = result['tokens'] / s['seconds'] if s['seconds'] else 0.0
+            lines.append(f"{name:<18}{stage:<9}{s['seconds']:>10.4f}{s['peak_bytes'] / 2**20:>10.2f}{rate:>12.0f}")
+    return '\n'.join(lines)
+
+
+def compare(results: dict, baseline: dict, threshold: float, min_seconds: float, min_bytes: int) -> list:
+    # (workload, stage, metric, before, after) of every regression
+    regressions = []
+    for name, result in results['workloads'].items():
+        before = baseline.get('workloads', {}).get(name)
+        if before is None:
+            continue
+        for stage, after in result['stages'].items():
+            old = before['stages'].get(stage)
+            if old is None:
+                continue
+            for metric, floor in (('seconds', min_seconds), ('peak_bytes', min_bytes)):
+                a, b = old[metric], after[metric]
+                if b > a * (1 + threshold) and b - a > floor:
+                    regressions.append((name, stage, metric, a, b))
+    return regressions
+
+
+def format_regressions(regressions: list, threshold: float) -> str:
+    if not regressions:
+        return f'sin regresiones (umbral {threshold:.0%})'
+    lines = [f'{len(regressions)} regresion(es) (umbral {threshold:.0%}):']
+    for name, stage, metric, a, b in regressions:
+        if metric == 'seconds':
+            values = f'{a:.4f} s -> {b:.4f} s'
+        else:
+            values = f'{a / 2**20:.2f} MiB -> {b / 2**20:.2f} MiB'
+        lines.append(f'  {name} / {stage}: {values} (+{(b / a - 1) if a else 0:.0%})')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--scale', type=int, default=1, help='multiplicador del tamano de cada carga')
+    ap.add_argument('--repeat', type=int, default=3)
+    ap.add_argument('--workload', action='append', choices=list(WORKLOADS), default=None,
+                    help='cargas a medir (se puede repetir; default: todas)')
+    ap.add_argument('--output', default=None, help='guardar los resultados en este JSON')
+    ap.add_argument('--baseline', default=DEFAULT_BASELINE, help='resultados de referencia (default: %(default)s)')
+    ap.add_argument('--threshold', type=float, default=0.25, help='crecimiento tolerado (default: %(default)s)')
+    ap.add_argument('--min-seconds', type=float, default=0.01, help='diferencia minima de tiempo a reportar')
+    ap.add_argument('--min-kb', type=float, default=64, help='diferencia minima de memoria a reportar')
+    ap.add_argument('--save-baseline', action='store_true', help='guardar los resultados como referencia')
+    args = ap.parse_args(argv)
+
+    results = run_suite(args.workload or list(WORKLOADS), args.scale, args.repeat)
+    print(format_results(results))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump(results, fh, indent=2)
+
+    status = 0
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as fh:
+            json.dump(results, fh, indent=2)
+        print(f'referencia guardada en {args.baseline}')
+    elif not os.path.exists(args.baseline):
+        print(f'sin referencia en {args.baseline}: no se comparo nada (guardarla primero con --save-baseline)')
+    else:
+        with open(args.baseline, encoding='utf-8') as fh:
+            baseline = json.load(fh)
+        if baseline.get('meta', {}).get('scale') != args.scale:
+            print(f'la referencia {args.baseline} usa otra escala; no se compara')
+        else:
+            regressions = compare(results, baseline, args.threshold, args.min_seconds, args.min_kb * 1024)
+            print(format_regressions(regressions, args.threshold))
+            status = 1 if regressions else 0
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""Symbol table size and fill time as programs grow.
+
+The lexer registers every variable and literal occurrence in SymbolTable.
+For each program size the script reports the occurrences seen, the
+entries kept (one per distinct name or (type, value) literal), the time to
+fill the table from the tokens, the time of
+SemanticContext.load_from_symbols and the memory of the table
+(tracemalloc). The use counts are checked against an independent count of
+the tokens.
+
+Usage: python benchmarks/bench_symbols.py [--statements 1000 10000 100000]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from lexer import lexer as base_lexer  # noqa: E402
+from semantic_context import SemanticContext  # noqa: E402
+from symbol_table import CONSTANT_TYPES, SymbolTable  # noqa: E402
+from workloads import arithmetic_program, strings_program  # noqa: E402
+
+
+def tokenize(text: str) -> list:
+    lexer = base_lexer.clone()
+    lexer.input(text)
+    lexer.lineno = 1
+    return list(iter(lexer.token, None))
+
+
+def fill(tokens: list) -> SymbolTable:
+    table = SymbolTable()
+    for tok in tokens:
+        table.add_token(tok)
+    return table
+
+
+def expected_uses(tokens: list) -> Counter:
+    uses = Counter()
+    for tok in tokens:
+        if tok.type == 'VARIABLE':
+            uses[tok.value] += 1
+        elif tok.type in CONSTANT_TYPES:
+            uses[(CONSTANT_TYPES[tok.type], tok.value)] += 1
+    return uses
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--statements', type=int, nargs='+', default=[1000, 10000, 100000])
+    args = ap.parse_args(argv)
+
+    header = (f"{'programa':<24}{'apariciones':>12}{'entradas':>10}{'llenado ms':>12}{'carga ms':>10}"
+              f"{'KiB':>9}")
+    print(header)
+    print('-' * len(header))
+    programs = [(f'{n} aritméticas', arithmetic_program(n)) for n in args.statements]
+    programs.append((f'{args.statements[-1]} cadenas', strings_program(args.statements[-1])))
+    for name, text in programs:
+        tokens = tokenize(text)
+        start = time.perf_counter()
+        table = fill(tokens)
+        fill_s = time.perf_counter() - start
+        start = time.perf_counter()
+        SemanticContext().load_from_symbols(table)
+        load_s = time.perf_counter() - start
+
+        uses = {key: e['usos'] for key, e in table.symbols.items()}
+        uses.update((key, e['usos']) for key, e in table.constants.items())
+        if uses != expected_uses(tokens):
+            print(f'{name}: los usos de la tabla no coinciden con los tokens')
+            return 1
+
+        tracemalloc.start()
+        kept = fill(tokens)
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del kept
+        print(f'{name:<24}{table.occurrences():>12}{len(table):>10}{fill_s * 1000:>12.1f}{load_s * 1000:>10.2f}'
+              f'{size / 1024:>9.1f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
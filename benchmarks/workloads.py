@@ -0,0 +1,78 @@
+"""Synthetic LyC programs used by the benchmarks.
+
+Every generator returns the program text; sizes are counted in statements
+(or list elements) so the resulting AST grows linearly with them.
+"""
+
+
+def declarations(names, tipo):
+    return f"    {', '.join(names)} : {tipo}\n"
+
+
+def arithmetic_program(statements: int) -> str:
+    # `statements` assignments of the form  x := a + b * 3 - (c / 2)
+    # (each one is 9 AST nodes plus the assignment)
+    lines = ['init {\n', declarations(['a', 'b', 'c', 'x'], 'Int'), declarations(['f'], 'Float'), '}\n']
+    for i in range(statements):
+        if i % 2:
+            lines.append(f'f := a + b * {i % 100} - (c / 2)\n')
+        else:
+            lines.append(f'x := a + b * {i % 100} - (c * 2)\n')
+    return ''.join(lines)
+
+
+def nested_program(depth: int, kind: str = 'if') -> str:
+    # `depth` nested if/while blocks around a single assignment
+    lines = ['init {\n', declarations(['a', 'b'], 'Int'), '}\n']
+    for i in range(depth):
+        if kind == 'while':
+            lines.append(f'while (a < {i % 1000}) {{\n')
+        else:
+            lines.append(f'if (a > {i % 1000}) {{\n')
+    lines.append('b := a + 1\n')
+    lines.append('}\n' * depth)
+    return ''.join(lines)
+
+
+def init_program(variables: int, per_line: int = 10) -> str:
+    # Long `init` block: `variables` Int variables declared `per_line` at a
+    # time, followed by a single use so the program is valid
+    lines = ['init {\n']
+    for start in range(0, variables, per_line):
+        names = [f'v{i}' for i in range(start, min(start + per_line, variables))]
+        lines.append(declarations(names, 'Int'))
+    lines.append('}\n')
+    lines.append('v0 := 1\n')
+    return ''.join(lines)
+
+
+def equal_expressions_program(elements: int, constant: bool = False) -> str:
+    # One equalExpressions(...) call with `elements` arguments; with
+    # `constant` every argument is a distinct literal
+    if constant:
+        args = ', '.join(str(i % 30000) for i in range(elements))
+    else:
+        args = ', '.join(f'a + {i}' if i % 2 else str(i % 30000) for i in range(elements))
+    return ('init {\n' + declarations(['a'], 'Int') + declarations(['e'], 'Bool') + '}\n'
+            f'e := equalExpressions({args})\n')
+
+
+def conv_date_program(calls: int) -> str:
+    # `calls` assignments d := convDate(dd-mm-yyyy) with varying dates
+    lines = ['init {\n', declarations(['d'], 'DateConverted'), '}\n']
+    for i in range(calls):
+        lines.append(f'd := convDate({i % 28 + 1:02d}-{i % 12 + 1:02d}-{1900 + i % 200})\n')
+    return ''.join(lines)
+
+
+def strings_program(statements: int, length: int = 50) -> str:
+    # `statements` string assignments and writes with literals of up to
+    # `length` characters (the lexer's maximum is 50)
+    lines = ['init {\n', declarations(['s'], 'String'), '}\n']
+    for i in range(statements):
+        text = (f'cadena {i} ' * length)[:length]
+        if i % 2:
+            lines.append(f'write("{text}")\n')
+        else:
+            lines.append(f's := "{text}"\n')
+    return ''.join(lines)
@@ -0,0 +1,199 @@
+"""Bulk tokenizer producing the same tokens as the PLY lexer of lexer.py.
+
+PLY matches one token at a time: ignored characters, newlines and
+comments are separate matches of its master regex, and identifiers,
+numbers, dates and strings go through a Python rule function. BulkLexer
+runs one precompiled pattern over the whole buffer with findall(); every
+match is a (blanks in front, token text) pair, so there is one match per
+token and positions and line numbers are running sums. The token kind
+comes from one dict lookup on the text (operators and reserved words) or
+on its first character (identifiers and numbers), and the range checks
+(16-bit Int, 32-bit Float, dates, 50-character strings) run once over all
+the collected values of each kind.
+
+Errors keep PLY's order and timing: the first invalid character or
+out-of-range value is found after the scan, the token list is cut there
+and the exception is raised when a consumer pulls the token that PLY
+would have failed on, so a syntax error earlier in the program still wins.
+BulkLexer has the input()/token()/lineno interface TokenStream expects.
+"""
+import gc
+import re
+from typing import List, Optional
+
+from ply.lex import LexToken
+
+from lexer import reserved
+
+MAX_STRING = 50
+
+# The rules of lexer.py in PLY's order (function rules as defined, then the
+# string rules by decreasing pattern length, so `:=` is tried before `:`),
+# preceded by the blanks and newlines PLY skips (`t_ignore`, `t_newline`)
+# and followed by a catch-all for invalid characters (`t_error`).
+# benchmarks/bench_lexer.py checks that the tokens match PLY's.
+RULES = r'''
+    (?P<VARIABLE>[a-zA-Z]\w*)
+  | (?P<N_FLOAT>\d+\.\d*|\.\d+)
+  | (?P<DATE>\d{2}-\d{2}-\d{4})
+  | (?P<N_ENTERO>-?\d+)
+  | (?P<CADENA>"[^"\n]*")
+  | (?P<COMENTARIO>\#\+.*?\+\#)
+  | (?P<COMPARADOR>==|<>|<=|>=|<|>)
+  | (?P<MAS>\+) | (?P<MULTIPLICACION>\*) | (?P<A_PARENTESIS>\() | (?P<C_PARENTESIS>\))
+  | (?P<A_LLAVE>\{) | (?P<C_LLAVE>\}) | (?P<ASIGNACION>:=)
+  | (?P<MENOS>-) | (?P<DIVISION>/) | (?P<ASIGNACION_TIPO>:) | (?P<SEPARADOR_VARIABLES>,)
+  | (?P<error>[^ \t\n])
+'''
+FLAGS = re.DOTALL | re.VERBOSE
+
+# Scanner: (blanks, token text) pairs. Named groups would make findall()
+# return one slot per rule, so they are dropped here.
+MASTER = re.compile(r'([ \t\n]*)(' + re.sub(r'\(\?P<\w+>', '(?:', RULES) + ')', FLAGS)
+
+# Kind of any token text (slow path for first characters not in FIRST)
+CLASSIFY = re.compile(RULES, FLAGS)
+
+# Token text -> kind for operators and reserved words
+EXACT = {'==': 'COMPARADOR', '<>': 'COMPARADOR', '<=': 'COMPARADOR', '>=': 'COMPARADOR', '<': 'COMPARADOR',
+         '>': 'COMPARADOR', '+': 'MAS', '*': 'MULTIPLICACION', '(': 'A_PARENTESIS', ')': 'C_PARENTESIS',
+         '{': 'A_LLAVE', '}': 'C_LLAVE', ':=': 'ASIGNACION', '-': 'MENOS', '/': 'DIVISION',
+         ':': 'ASIGNACION_TIPO', ',': 'SEPARADOR_VARIABLES'}
+EXACT.update(reserved)
+
+# First character -> kind for the rest (NUMBER: N_FLOAT, DATE or N_ENTERO)
+FIRST = dict.fromkeys('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ', 'VARIABLE')
+FIRST.update(dict.fromkeys('0123456789.-', 'NUMBER'))
+FIRST['"'] = 'CADENA'
+
+
+def scan(text: str) -> tuple:
+    # Tokenize `text`. Returns (tokens, error, lineno): the tokens before
+    # the first lexical error, that error as an Exception (None if the text
+    # is valid) and the line count at the end of the scan. The token list
+    # is acyclic, so the cycle collector is paused while it grows (it would
+    # otherwise walk the whole list again and again).
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _scan(text)
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _scan(text: str) -> tuple:
+    tokens = []
+    append = tokens.append
+    ints, floats, dates, strings = [], [], [], []
+    error_at = None
+    lineno = 1
+    pos = 0
+    new = LexToken
+    exact = EXACT.get
+    first = FIRST.get
+    for blank, value in MASTER.findall(text):
+        if blank:
+            pos += len(blank)
+            if '\n' in blank:
+                lineno += blank.count('\n')
+        start = pos
+        pos += len(value)
+        kind = exact(value)
+        if kind is None:
+            kind = first(value[0])
+            if kind is None or len(value) == 1 and value in '."':
+                # comments, invalid characters, non-ASCII digits
+                kind = CLASSIFY.fullmatch(value).lastgroup
+                if kind == 'COMENTARIO':
+                    continue
+                if kind == 'error':
+                    error_at = (start, Exception(f"Caracter invalido '{value}' en la linea: {lineno}"))
+                    break
+            if kind == 'NUMBER' or kind in ('N_FLOAT', 'DATE', 'N_ENTERO'):
+                if '.' in value:
+                    kind = 'N_FLOAT'
+                    value = float(value)
+                    floats.append(len(tokens))
+                elif len(value) == 10 and value[2] == '-':
+                    kind = 'DATE'
+                    dates.append(len(tokens))
+                else:
+                    kind = 'N_ENTERO'
+                    value = int(value)
+                    ints.append(len(tokens))
+            elif kind == 'CADENA':
+                value = value[1:-1]
+                strings.append(len(tokens))
+        tok = new()
+        tok.type = kind
+        tok.value = value
+        tok.lineno = lineno
+        tok.lexpos = start
+        append(tok)
+    else:
+        # blanks after the last token
+        lineno += text.count('\n', pos)
+
+    first_bad = check_ranges(tokens, ints, floats, dates, strings)
+    if first_bad is not None and (error_at is None or tokens[first_bad[0]].lexpos < error_at[0]):
+        return tokens[:first_bad[0]], first_bad[1], lineno
+    if error_at is not None:
+        return tokens, error_at[1], lineno
+    return tokens, None, lineno
+
+
+def check_ranges(tokens: List[LexToken], ints: list, floats: list, dates: list,
+                 strings: list) -> Optional[tuple]:
+    # (index, Exception) of the first token whose value is out of range, with
+    # PLY's messages; each kind is checked in bulk and only searched when its
+    # minimum or maximum is out of range
+    found = []
+    values = [tokens[i].value for i in ints]
+    if values and (min(values) < -32768 or max(values) > 32767):
+        i = next(i for i in ints if not -32768 <= tokens[i].value <= 32767)
+        found.append((i, f"Entero fuera de rango (16 bits signed) '{tokens[i].value}' en la linea: {tokens[i].lineno}"))
+    values = [tokens[i].value for i in floats]
+    if values and (min(values) < -3.4e38 or max(values) > 3.4e38):
+        i = next(i for i in floats if not -3.4e38 <= tokens[i].value <= 3.4e38)
+        found.append((i, f"Float fuera de rango (32 bits) '{tokens[i].value}' en la linea: {tokens[i].lineno}"))
+    if strings and max(len(tokens[i].value) for i in strings) > MAX_STRING:
+        i = next(i for i in strings if len(tokens[i].value) > MAX_STRING)
+        found.append((i, f"Cadena demasiado larga (max {MAX_STRING}) '{tokens[i].value}' en la linea: {tokens[i].lineno}"))
+    for i in dates:
+        dia, mes, anio = map(int, tokens[i].value.split('-'))
+        if not (1 <= dia <= 31 and 1 <= mes <= 12 and 1000 <= anio <= 9999):
+            found.append((i, f"Fecha inválida '{tokens[i].value}' en la linea: {tokens[i].lineno}"))
+            break
+    if not found:
+        return None
+    i, message = min(found)
+    return i, Exception(message)
+
+
+class BulkLexer:
+    def __init__(self):
+        self.tokens = []
+        self.pos = 0
+        self.error = None
+        self.lineno = 1
+        self.end_lineno = 1
+
+    def clone(self) -> 'BulkLexer':
+        return BulkLexer()
+
+    def input(self, text: str) -> None:
+        self.tokens, self.error, self.end_lineno = scan(text)
+        self.pos = 0
+        self.lineno = 1
+
+    def token(self) -> Optional[LexToken]:
+        if self.pos < len(self.tokens):
+            tok = self.tokens[self.pos]
+            self.pos += 1
+            self.lineno = tok.lineno
+            return tok
+        if self.error is not None:
+            raise self.error
+        self.lineno = self.end_lineno
+        return None
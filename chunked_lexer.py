@@ -0,0 +1,125 @@
+"""Streaming lexer over a memory-mapped source file.
+
+ChunkedLexer maps the file with mmap, decodes it `chunk_size` bytes at a
+time and runs the PLY lexer of lexer.py over one buffer at a time, so
+neither the whole text nor the whole token list is ever in memory: tokens
+are produced as the parser pulls them.
+
+Buffers are cut right after their last newline. No token of the language
+spans a newline except `#+ ... +#` comments, so every other token lies
+entirely inside one buffer. A comment still open at the end of a buffer
+shows up as PLY's invalid-character error on its `#`; the text from there
+on is carried into the next buffer (and searched for `+#`, from where the
+lexing of the previous buffer stopped, while the comment stays open), unless it is the last buffer, where the error is the
+real one. The lexer's `lineno` carries over from buffer to buffer and
+token positions are character offsets into the whole file, so tokens,
+line numbers and error messages are the same as lexing the whole text.
+
+ChunkedLexer has the input()/token()/lineno interface TokenStream
+expects; input() takes the path of the source file.
+"""
+import codecs
+import mmap
+import os
+from typing import Optional
+
+from ply.lex import LexToken
+
+from lexer import lexer as base_lexer
+
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+
+class ChunkedLexer:
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE, encoding: str = 'utf-8'):
+        self.chunk_size = chunk_size
+        self.encoding = encoding
+        self.lexer = base_lexer.clone()
+        self.tokens = iter(())
+
+    def clone(self) -> 'ChunkedLexer':
+        return ChunkedLexer(self.chunk_size, self.encoding)
+
+    @property
+    def lineno(self) -> int:
+        return self.lexer.lineno
+
+    @lineno.setter
+    def lineno(self, value: int) -> None:
+        self.lexer.lineno = value
+
+    def input(self, path) -> None:
+        self.tokens = self.generate(path)
+        self.lexer.lineno = 1
+
+    def token(self) -> Optional[LexToken]:
+        return next(self.tokens, None)
+
+    def generate(self, path):
+        with open(path, 'rb') as fh:
+            size = os.fstat(fh.fileno()).st_size
+            if size == 0:
+                yield from self.lex('', 0, True)
+                return
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                yield from self.chunks(view, size)
+
+    def chunks(self, view, size: int):
+        decoder = codecs.getincrementaldecoder(self.encoding)()
+        base = 0            # characters of the file before `carry`
+        carry = ''
+        in_comment = False  # `carry` starts with an unterminated comment
+        scanned = 0         # characters of `carry` known to hold no `+#`
+        offset = 0
+        while offset < size:
+            data = view[offset:offset + self.chunk_size]
+            offset += len(data)
+            final = offset >= size
+            text = carry + decoder.decode(data, final)
+            if final:
+                cut = len(text)
+            else:
+                cut = text.rfind('\n') + 1
+                if in_comment:
+                    close = text.find('+#', max(scanned - 1, 2))
+                    if close < 0:
+                        carry = text
+                        scanned = len(text)
+                        continue
+                    cut = max(cut, close + 2)
+                if cut == 0:
+                    # a single line longer than the chunk
+                    carry = text
+                    scanned = len(text)
+                    continue
+            buffer = text[:cut]
+            start = yield from self.lex(buffer, base, final)
+            in_comment = start is not None
+            if in_comment:
+                # Only the lexed part, up to the cut, was searched for the
+                # end of the comment; the text after the cut was not
+                carry = text[start:]
+                scanned = cut - start
+                base += start
+            else:
+                carry = text[cut:]
+                base += cut
+
+    def lex(self, buffer: str, base: int, final: bool):
+        # Yield the tokens of `buffer` (positions shifted by `base`). Returns
+        # where an unterminated comment starts, or None if the whole buffer
+        # was lexed.
+        lexer = self.lexer
+        lexer.input(buffer)
+        while True:
+            try:
+                tok = lexer.token()
+            except Exception as e:
+                start = lexer.lexpos
+                if not final and buffer.startswith('#+', start) and str(e).startswith("Caracter invalido '#'"):
+                    return start
+                raise
+            if tok is None:
+                return None
+            tok.lexpos += base
+            yield tok
@@ -0,0 +1,188 @@
+"""Content-addressed cache of whole compilations.
+
+An entry is keyed by the hash of the source text, the compiler version and
+the options that change the generated code, and stores everything a
+compilation produces: the AST, the lexer's symbol table, the semantic
+symbols, the quadruples and the DOT, IR and asm texts. A hit skips lexing,
+parsing and code generation and only writes the requested outputs.
+
+The compiler version is COMPILER_VERSION plus a hash of the modules of the
+pipeline, so editing the compiler invalidates every entry without having
+to bump anything by hand.
+
+Entries are pickles in `<cache dir>/compilations` (the directory of the
+LALR table cache, see parser_cache.resolve_cache_dir). The two ASTs of an
+entry are stored with ast_serializer, which walks them with an explicit
+stack: pickle itself recurses once per tree level and fails on deeply
+nested programs. Reading an entry
+refreshes its modification time, and after every store the least recently
+used entries are removed until the directory fits in `max_bytes`.
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Any, Optional
+
+from ast_serializer import from_bytes, to_bytes
+from parser_cache import resolve_cache_dir
+
+COMPILER_VERSION = '1'
+
+# Modules whose code shapes the cached artifacts
+PIPELINE_MODULES = (
+    'lexer', 'parser', 'ast_node', 'ast_exporter', 'helpers', 'semantic_context', 'symbol_table',
+    'constant_folding', 'quadruples', 'ir_passes', 'asm_generator', 'peephole', 'compiler', 'bulk_lexer',
+    'compile_cache', 'ast_serializer', 'ast_passes',
+)
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+_ROOT = Path(__file__).resolve().parent
+_fingerprint = {}
+
+
+def compiler_fingerprint() -> str:
+    # Hash of COMPILER_VERSION and the pipeline sources (computed once)
+    if 'value' not in _fingerprint:
+        h = hashlib.sha256(COMPILER_VERSION.encode('utf-8'))
+        for name in PIPELINE_MODULES:
+            path = _ROOT / f'{name}.py'
+            h.update(name.encode('utf-8'))
+            if path.exists():
+                h.update(path.read_bytes())
+        _fingerprint['value'] = h.hexdigest()
+    return _fingerprint['value']
+
+
+class CacheEntry:
+    def __init__(self, ast, sem, symbols, token_count, ir, dot, asm, pass_stats, peephole_stats, parsed):
+        # ast: the folded tree the back end lowered; parsed: the tree as
+        # parsed, which `dot` shows
+        self.ast = ast
+        self.parsed = parsed
+        self.sem = sem
+        self.symbols = symbols
+        self.token_count = token_count
+        self.ir = ir
+        self.dot = dot
+        self.asm = asm
+        self.pass_stats = pass_stats
+        self.peephole_stats = peephole_stats
+
+    def __getstate__(self):
+        # Trees as ast_serializer bytes (None for `parsed` when nothing was
+        # folded and both trees are the same object)
+        state = dict(self.__dict__)
+        state['ast'] = to_bytes(self.ast)
+        state['parsed'] = None if self.parsed is self.ast else to_bytes(self.parsed)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.ast = from_bytes(state['ast'])
+        self.parsed = self.ast if state['parsed'] is None else from_bytes(state['parsed'])
+
+
+class CompileCache:
+    def __init__(self, cache_dir=None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.dir = resolve_cache_dir(cache_dir) / 'compilations'
+        self.max_bytes = max_bytes
+        # Counters of this process (dict for mutability, as CACHE_STATS)
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+    def key(self, text: str, options: Any) -> str:
+        h = hashlib.sha256(compiler_fingerprint().encode('utf-8'))
+        h.update(repr(options.fingerprint()).encode('utf-8'))
+        h.update(text.encode('utf-8'))
+        return h.hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.dir / f'{key}.pickle'
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        path = self.path(key)
+        try:
+            with path.open('rb') as fh:
+                entry = pickle.load(fh)
+            # Most recently used first when evicting
+            os.utime(path)
+        except FileNotFoundError:
+            self.stats['misses'] += 1
+            return None
+        except Exception:
+            # Truncated or stale entry: drop it and compile again
+            path.unlink(missing_ok=True)
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        return entry
+
+    def put(self, key: str, entry: CacheEntry) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file and rename, so concurrent readers (batch
+        # workers) never see a partial entry
+        fd, tmp = tempfile.mkstemp(dir=self.dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                pickle.dump(entry, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.path(key))
+        except Exception:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        self.stats['stores'] += 1
+        self.evict()
+
+    def entries(self) -> list:
+        # (mtime, size, path) of every entry, oldest first
+        if not self.dir.exists():
+            return []
+        found = []
+        for path in self.dir.glob('*.pickle'):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            found.append((st.st_mtime, st.st_size, path))
+        found.sort()
+        return found
+
+    def evict(self) -> int:
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        self.stats['evictions'] += removed
+        return removed
+
+    def clear(self) -> int:
+        removed = 0
+        for _, _, path in self.entries():
+            path.unlink(missing_ok=True)
+            removed += 1
+        return removed
+
+    def info(self) -> dict:
+        entries = self.entries()
+        return {
+            'dir': str(self.dir),
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+        }
+
+    def report(self) -> str:
+        info = self.info()
+        s = self.stats
+        lookups = s['hits'] + s['misses']
+        rate = f"{100.0 * s['hits'] / lookups:.1f}%" if lookups else '-'
+        return (f"Cache de compilación: {info['dir']}\n"
+                f"  entradas: {info['entries']}, {info['bytes'] / 1024:.1f} KiB de {info['max_bytes'] / 1024:.0f} KiB\n"
+                f"  aciertos: {s['hits']}, fallos: {s['misses']} ({rate}), guardadas: {s['stores']}, "
+                f"desalojadas: {s['evictions']}")
@@ -0,0 +1,244 @@
+"""Reentrant library entry point of the LyC compiler.
+
+compile_source(text, options) compiles one program with its own
+CompilationContext: symbols, declarations and temporaries never leak
+between calls, and calls can run concurrently from a thread pool. The LALR
+tables and the master lexer are built once per process and shared.
+
+With `options.cache` (a compile_cache.CompileCache) a program already
+compiled with the same options is not compiled again: its outputs are
+written from the cache entry.
+
+The stages are the module functions parse, fold_constants,
+intermediate_code and assemble, which lyc-compiler.py also runs in single
+mode. The DOT and the saved AST always show the tree as parsed, before
+constant folding, in every mode.
+"""
+from pathlib import Path
+
+from asm_generator import AsmGenerator
+from ast_exporter import ASTDotExporter
+from ast_passes import AstPassManager
+from ast_serializer import save_ast
+from bulk_lexer import BulkLexer
+from compile_cache import CacheEntry
+from constant_folding import plegar_constantes
+from ir_passes import PassManager
+from peephole import PeepholeOptimizer
+from profiler import NULL_PROFILER
+from lexer import lexer as base_lexer, token_stream
+from parser import exportar_dot, new_parser, renderizar_png
+from quadruples import generar_cuadruplas
+from semantic_context import CompilationContext
+from symbol_table import SymbolTable
+from trace_sink import Trace
+
+
+class CompileOptions:
+    def __init__(self, dot_path=None, render_png=False, trace=None, cache_dir=None, ir_path=None,
+                 asm_path=None, naive_asm=False, fold=True, opt_level=0, disabled_passes=(), cache=None,
+                 bulk_lexer=False, render_format='png', wait_render=False, ast_path=None,
+                 dot_exporter=None):
+        # dot_path: where to write the AST in DOT (None: do not write)
+        # dot_exporter: exporter for dot_path (None: full ASTDotExporter)
+        # ir_path: where to write the quadruple listing (None: do not write)
+        # ast_path: where to save the AST (ast_serializer; .json: JSON, else binary)
+        # asm_path: where to write the TASM program (None: do not generate)
+        # naive_asm: lower the quadruples memory-to-memory instead
+        # fold: fold constant arithmetic (convDate, literal operations)
+        # opt_level: optimization level (see ir_passes.OPT_LEVELS). The passes
+        #            change the quadruples (IR listing, naive_asm program) and,
+        #            through their ast_passes counterparts, the AST the default
+        #            TASM output is lowered from; from -O1 on the TASM output
+        #            also goes through the peephole optimizer
+        # disabled_passes: names of IR passes to skip at that level
+        # render_png: also render the DOT with Graphviz when available, in
+        #             the background (render_queue.RENDERS) unless wait_render
+        # render_format: 'png' or 'svg'
+        # trace: Trace for this compilation (None: disabled trace)
+        # cache_dir: LALR table cache directory (see parser_cache)
+        # cache: CompileCache of whole compilations (None: always compile)
+        # bulk_lexer: tokenize with bulk_lexer.BulkLexer (same tokens as PLY)
+        self.dot_path = dot_path
+        self.dot_exporter = dot_exporter
+        self.render_png = render_png
+        self.render_format = render_format
+        self.wait_render = wait_render
+        self.trace = trace
+        self.cache_dir = cache_dir
+        self.ir_path = ir_path
+        self.ast_path = ast_path
+        self.asm_path = asm_path
+        self.naive_asm = naive_asm
+        self.fold = fold
+        self.opt_level = opt_level
+        self.disabled_passes = tuple(disabled_passes)
+        self.cache = cache
+        self.bulk_lexer = bulk_lexer
+
+    def fingerprint(self) -> tuple:
+        # The options that change the generated artifacts (cache key)
+        return (self.fold, self.opt_level, tuple(sorted(self.disabled_passes)), self.naive_asm)
+
+    @classmethod
+    def coerce(cls, options):
+        # Accept a CompileOptions, a dict of keyword arguments or None
+        if options is None:
+            return cls()
+        if isinstance(options, dict):
+            return cls(**options)
+        return options
+
+
+class CompileResult:
+    def __init__(self, ast, context, symbols, token_count, ir=None, asm=None, pass_stats=None,
+                 peephole_stats=None, cached=False, parsed=None):
+        # ast: the tree the back end lowered (folded with options.fold);
+        # parsed: the tree as parsed, shown by the DOT and the saved AST
+        self.ast = ast
+        self.parsed = parsed if parsed is not None else ast
+        self.ir = ir
+        self.asm = asm
+        # one {'pass', 'changes', 'seconds', 'enabled'} dict per IR pass
+        self.pass_stats = pass_stats or []
+        # peephole rule name -> times it fired
+        self.peephole_stats = peephole_stats or {}
+        self.context = context
+        self.symbols = symbols
+        self.token_count = token_count
+        # True when the outputs came from the compilation cache
+        self.cached = cached
+
+    @property
+    def sem(self):
+        return self.context.sem
+
+
+def compile_source(text: str, options=None) -> CompileResult:
+    # Compile `text` in an isolated context. Lexical, syntax and semantic
+    # errors raise Exception, as ejecutar_parser does.
+    options = CompileOptions.coerce(options)
+    if options.cache is not None:
+        return compile_cached(text, options)
+    ctx = CompilationContext(trace=options.trace or Trace())
+    parsed, symbols, token_count = parse(text, options, ctx)
+    ast = fold_constants(parsed, options, ctx)
+    ir, passes = intermediate_code(ast, options, ctx)
+
+    if options.dot_path is not None:
+        exportar_dot(parsed, Path(options.dot_path), options.render_png, ctx.trace, options.render_format,
+                     options.wait_render, options.dot_exporter)
+    if options.ast_path is not None:
+        save_ast(parsed, options.ast_path)
+    if options.ir_path is not None:
+        Path(options.ir_path).write_text(ir.listing() + '\n', encoding='utf-8')
+    asm = None
+    peephole = None
+    if options.asm_path is not None:
+        asm, peephole = assemble(ast, ir, options, ctx)
+        Path(options.asm_path).write_text(asm, encoding='utf-8')
+    return CompileResult(ast, ctx, symbols, token_count, ir, asm, passes.stats, peephole and peephole.fired,
+                         parsed=parsed)
+
+
+def parse(text: str, options: CompileOptions, ctx: CompilationContext):
+    # The tree as parsed (not folded), the lexer's symbol table and the
+    # number of tokens
+    symbols = SymbolTable()
+    taps = [symbols.add_token]
+    if ctx.trace.tokens:
+        taps.append(ctx.trace.token)
+    lexer = BulkLexer() if options.bulk_lexer else base_lexer.clone()
+    tokens = token_stream(text, taps=taps, lexer=lexer)
+
+    parser = new_parser(ctx, cache_dir=options.cache_dir)
+    ast = parser.parse(lexer=tokens)
+    ctx.sem.load_from_symbols(symbols)
+    return ast, symbols, tokens.count
+
+
+def fold_constants(ast, options: CompileOptions, ctx: CompilationContext, profiler=NULL_PROFILER):
+    # `ast` with its constant subtrees folded (unchanged without options.fold)
+    if not options.fold:
+        return ast
+    with profiler.phase('plegado de constantes'), profiler.count_nodes():
+        return plegar_constantes(ast, ctx.trace, ctx.sem)
+
+
+def intermediate_code(ast, options: CompileOptions, ctx: CompilationContext, profiler=NULL_PROFILER):
+    # Quadruples (optimized at options.opt_level) and the PassManager that
+    # ran, with its stats. The quadruples continue the temporaries
+    # numbering of the parser.
+    with profiler.phase('cuádruplas'):
+        ir = generar_cuadruplas(ast, ctx)
+    passes = PassManager.for_level(options.opt_level, options.disabled_passes)
+    with profiler.phase('optimización IR'):
+        ir = passes.run(ir)
+    if passes.passes:
+        ctx.trace.info(passes.report())
+    return ir, passes
+
+
+def assemble(ast, ir, options: CompileOptions, ctx: CompilationContext, profiler=NULL_PROFILER):
+    # TASM text of the program and the PeepholeOptimizer that ran (None
+    # below -O1). The register back end lowers the AST, so it first gets
+    # the AST counterparts of the IR passes of options.opt_level.
+    if not options.naive_asm:
+        passes = AstPassManager.for_level(options.opt_level, options.disabled_passes)
+        with profiler.phase('optimización AST'):
+            ast = passes.run(ast)
+        if passes.passes:
+            ctx.trace.info(passes.report())
+    with profiler.phase('assembler'):
+        gen = AsmGenerator(ctx.sem, naive=options.naive_asm)
+        code = gen.generate(ast, ir)
+    peephole = None
+    if options.opt_level >= 1:
+        peephole = PeepholeOptimizer()
+        with profiler.phase('mirilla'):
+            code = peephole.run(code)
+        ctx.trace.info(peephole.report())
+    return gen.render(code), peephole
+
+
+def compile_cached(text: str, options: CompileOptions) -> CompileResult:
+    # Look the program up in options.cache; on a miss compile every artifact
+    # (the entry must serve any later set of output paths) and store it
+    cache = options.cache
+    trace = options.trace or Trace()
+    key = cache.key(text, options)
+    entry = cache.get(key)
+    cached = entry is not None
+    if cached:
+        if trace.verbose:
+            trace.info(f'Compilación tomada de la cache ({key[:12]})')
+        ctx = CompilationContext(sem=entry.sem, trace=trace)
+    else:
+        ctx = CompilationContext(trace=trace)
+        parsed, symbols, token_count = parse(text, options, ctx)
+        ast = fold_constants(parsed, options, ctx)
+        ir, passes = intermediate_code(ast, options, ctx)
+        asm, peephole = assemble(ast, ir, options, ctx)
+        entry = CacheEntry(ast, ctx.sem, symbols, token_count, ir, ASTDotExporter().to_dot(parsed), asm,
+                           passes.stats, peephole and peephole.fired, parsed)
+        cache.put(key, entry)
+
+    if options.dot_path is not None:
+        dot_path = Path(options.dot_path)
+        if options.dot_exporter is not None:
+            tree = options.dot_exporter.select(entry.parsed)
+            with dot_path.open('w', encoding='utf-8') as fh:
+                options.dot_exporter.write_dot(tree, fh)
+        else:
+            dot_path.write_text(entry.dot, encoding='utf-8')
+        if options.render_png:
+            renderizar_png(dot_path, trace, options.render_format, options.wait_render)
+    if options.ast_path is not None:
+        save_ast(entry.parsed, options.ast_path)
+    if options.ir_path is not None:
+        Path(options.ir_path).write_text(entry.ir.listing() + '\n', encoding='utf-8')
+    if options.asm_path is not None:
+        Path(options.asm_path).write_text(entry.asm, encoding='utf-8')
+    return CompileResult(entry.ast, ctx, entry.symbols, entry.token_count, entry.ir,
+                         entry.asm if options.asm_path is not None else None,
+                         entry.pass_stats, entry.peephole_stats, cached=cached, parsed=entry.parsed)
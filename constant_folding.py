@@ -0,0 +1,166 @@
+"""Constant folding over the typed AST.
+
+ConstantFolder evaluates at compile time every arithmetic subtree whose
+operands are all literals and replaces it by a single literal leaf of the
+same dtype. Values follow the storage of their type:
+
+    Int             16-bit signed (the range t_N_ENTERO enforces)
+    DateConverted   32-bit signed (yyyymmdd does not fit in an Int)
+    Float           32-bit IEEE (the range t_N_FLOAT enforces)
+
+A folded value outside the range of its type, or a constant division by
+zero, is a semantic error reported with the line of the operator.
+
+`convDate(dd-mm-yyyy)` reaches the folder as (anio*10000)+((mes*100)+dia)
+and becomes one DateConverted literal; `1+2` inside equalExpressions
+becomes `3`. equalExpressions is decided here (one hash lookup per
+argument) when two literal arguments are equal, or when every argument is
+a literal, and becomes `true`/`false`. Nodes are never mutated: folded
+subtrees are rebuilt and untouched subtrees are shared with the input tree.
+"""
+from typing import Any, Optional
+
+from ast_node import ASTNode, FALSE, TRUE
+
+TYPE_RANGES = {
+    'Int': (-32768, 32767),
+    'DateConverted': (-2 ** 31, 2 ** 31 - 1),
+    'Float': (-3.4e38, 3.4e38),
+}
+
+FOLDABLE = ('+', '-', '*', '/')
+
+
+def format_float(value: float) -> str:
+    # Literal text for a folded Float, always with a decimal point so the
+    # back end declares it as a real (`dd 0.5`, `dd 1.0E+20`)
+    text = repr(float(value))
+    if 'e' in text:
+        mantissa, exponent = text.split('e')
+        if '.' not in mantissa:
+            mantissa += '.0'
+        return f'{mantissa}E{exponent}'
+    return text
+
+
+class ConstantFolder:
+    def __init__(self, sem=None):
+        # sem: SemanticContext, tells String literals from String variables
+        # folded: operator nodes replaced by a literal
+        self.sem = sem
+        self.folded = 0
+
+    def literal(self, node: Any) -> Optional[Any]:
+        # Python value of a numeric literal leaf; None for anything else
+        # (variable names start with a letter, so they never parse)
+        if not hasattr(node, 'nodetype') or node.children or node.dtype not in TYPE_RANGES:
+            return None
+        try:
+            if node.dtype == 'Float':
+                return float(node.nodetype)
+            return int(node.nodetype)
+        except ValueError:
+            return None
+
+    def equality_key(self, node: Any) -> Optional[Any]:
+        # Value used to compare an equalExpressions argument at compile time;
+        # None when it is not a literal. Int 1 and Float 1.0 compare equal.
+        value = self.literal(node)
+        if value is not None:
+            return value
+        if not hasattr(node, 'nodetype') or node.children:
+            return None
+        if node.nodetype in ('true', 'false') and node.dtype == 'Bool':
+            return node.nodetype
+        if node.dtype == 'String' and self.sem is not None:
+            entry = self.sem.symbols.get(node.nodetype)
+            if not (entry and entry.get('tipo')):
+                return ('String', node.nodetype)
+        return None
+
+    def any_equal(self, children: tuple) -> Optional[Any]:
+        # TRUE when two literal arguments are equal, FALSE when all of them
+        # are distinct literals, None when it depends on run-time values
+        seen = set()
+        constant = True
+        for c in children:
+            key = self.equality_key(c)
+            if key is None:
+                constant = False
+            elif key in seen:
+                return TRUE
+            else:
+                seen.add(key)
+        return FALSE if constant else None
+
+    def evaluate(self, node: Any, left: Any, right: Any) -> Any:
+        op = node.nodetype
+        if node.dtype == 'Float' or op == '/':
+            left, right = float(left), float(right)
+        if op == '+':
+            value = left + right
+        elif op == '-':
+            value = left - right
+        elif op == '*':
+            value = left * right
+        else:
+            if right == 0:
+                raise Exception(f"Error semántico (línea {node.lineno}): división por cero en expresión constante")
+            value = left / right
+        lo, hi = TYPE_RANGES[node.dtype]
+        if not (lo <= value <= hi):
+            raise Exception(
+                f"Error semántico (línea {node.lineno}): el valor constante {value} desborda el tipo "
+                f"{node.dtype} (rango {lo}..{hi})")
+        return value
+
+    def fold(self, node: Any) -> Any:
+        # Return `node` with its constant arithmetic subtrees folded. The
+        # walk is postorder with an explicit stack, so deeply nested blocks
+        # do not recurse: folded children are collected on `done` and
+        # taken back when their parent is visited the second time.
+        done = []
+        stack = [(node, False)]
+        while stack:
+            item, ready = stack.pop()
+            if ready:
+                n = len(item) if isinstance(item, list) else len(item.children)
+                children = done[len(done) - n:]
+                del done[len(done) - n:]
+                done.append(children if isinstance(item, list) else self.combine(item, tuple(children)))
+            elif isinstance(item, list):
+                stack.append((item, True))
+                stack.extend((c, False) for c in reversed(item))
+            elif hasattr(item, 'nodetype') and item.children:
+                stack.append((item, True))
+                stack.extend((c, False) for c in reversed(item.children))
+            else:
+                done.append(item)
+        return done[0]
+
+    def combine(self, node: Any, children: tuple) -> Any:
+        # `node` over its already folded `children`
+        if node.nodetype in FOLDABLE and len(children) == 2 and node.dtype in TYPE_RANGES:
+            left, right = self.literal(children[0]), self.literal(children[1])
+            if left is not None and right is not None:
+                value = self.evaluate(node, left, right)
+                self.folded += 1
+                text = format_float(value) if node.dtype == 'Float' else str(int(value))
+                return ASTNode(text, dtype=node.dtype, lineno=node.lineno)
+        if node.nodetype == 'EqualExpressions':
+            result = self.any_equal(children)
+            if result is not None:
+                self.folded += 1
+                return result
+        if all(a is b for a, b in zip(children, node.children)):
+            return node
+        return ASTNode(node.nodetype, node.value, children, node.dtype, node.lineno, node.end)
+
+
+def plegar_constantes(ast: Any, trace: Any = None, sem: Any = None) -> Any:
+    # Convenience wrapper: fold `ast` and report the count on a verbose trace
+    folder = ConstantFolder(sem)
+    folded = folder.fold(ast)
+    if trace is not None:
+        trace.info(f'Constantes plegadas: {folder.folded}')
+    return folded
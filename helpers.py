@@ -8,14 +8,46 @@ def collect_var_names(lista):
     return names
 
 
+# Branch mnemonic taken when the comparison is FALSE (CMP a, b; BLT ... for
+# `a >= b` jumps when a < b), used when lowering conditions
+diccionarioComparadores = {
+    ">=":   "BLT",
+    ">":   "BLE",
+    "<=":   "BGT",
+    "<":   "BGE",
+    "<>":   "BEQ",
+    "==":   "BNE"
+}
+
+diccionarioComparadoresNot = {
+    ">=":   "<",
+    ">":   "<=",
+    "<=":   ">",
+    "<":   ">=",
+    "<>":   "==",
+    "==":   "<>"
+}
+
+
 _temp_counter = {'i': 0}
 
 
-def new_temp():
-    _temp_counter['i'] += 1
-    name = f"_t{_temp_counter['i']}"
+def new_temp(counter=None):
+    # `counter` lets each compilation keep its own numbering; the module
+    # level counter is used when none is given
+    if counter is None:
+        counter = _temp_counter
+    counter['i'] += 1
+    name = f"_t{counter['i']}"
     return name
 
+
+def reset_temps(counter=None):
+    if counter is None:
+        counter = _temp_counter
+    counter['i'] = 0
+
+
 def is_numeric(t):
     return t in ('Int', 'Float', 'DateConverted')  # DateConverted behaves numeric
 
@@ -33,3 +65,13 @@ def ensure_assign_compatible(lhs_t: str, rhs_t: str, lineno: int, lhs_name: str)
     if lhs_t != rhs_t:
         raise Exception(
             f"Error semántico (línea {lineno}): incompatibilidad de tipos al asignar a '{lhs_name}': {lhs_t} := {rhs_t}")
+
+
+def equal_expressions_type(types):
+    # Storage type of the values compared by equalExpressions (p_equal_expressions
+    # already checked they are all the same type or all numeric)
+    if 'String' in types:
+        return 'String'
+    if 'Float' in types:
+        return 'Float'
+    return 'Int'
@@ -0,0 +1,398 @@
+"""Incremental lexing and parsing for editor/watch workflows.
+
+IncrementalParser keeps the token stream of a program split into units,
+one per top-level statement (the `init` block is a unit of its own), and
+applies edits without going over the whole file again:
+
+- Re-lexing restarts one unit before the one that contains the edit (the
+  edit may turn the first token of its unit into the continuation of the
+  previous statement, and an edit at the first character of a unit may
+  extend the previous token) and stops as soon as a new unit starts where
+  an old unit started after the edit. From there on the text is the same and lexing
+  only depends on the text ahead, so the old tokens are kept. A `#+ ... +#`
+  comment opened or closed by the edit simply keeps the scan going until
+  the streams agree again.
+- Only the new units are parsed again, with the compilation context of
+  the program. Parsing the `init` block refreshes the declarations; the
+  units that mention a variable whose declaration changed are checked
+  again, the rest keep their AST.
+
+Tokens of a unit are stored relative to the unit's first character and
+line, so an edit only shifts two integer lists (unit starts and first
+lines). The AST nodes belong to their unit; when an edit adds or removes
+lines, program() rebuilds the nodes of the units below it with the new
+line numbers (nodes are never mutated, so an AST returned before the edit
+keeps its lines).
+Loading a file (and any edit that leaves most units to parse) parses the
+whole token stream at once, which also reports the same first error as a
+full parse.
+"""
+import gc
+import time
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional
+
+import ply.lex as lex
+
+from ast_node import ASTNode
+from lexer import lexer as base_lexer
+from parser import new_parser
+from semantic_context import CompilationContext
+from symbol_table import SymbolTable
+
+# Tokens that start a top-level statement (VARIABLE only when followed by :=)
+STARTERS = frozenset(('INIT', 'WHILE', 'IF', 'WRITE', 'READ'))
+OPEN = frozenset(('A_LLAVE', 'A_PARENTESIS'))
+CLOSE = frozenset(('C_LLAVE', 'C_PARENTESIS'))
+
+
+def starts_unit(tok: Any, nxt: Any) -> bool:
+    if tok.type in STARTERS:
+        return True
+    return tok.type == 'VARIABLE' and nxt is not None and nxt.type == 'ASIGNACION'
+
+
+def diff_range(old: str, new: str) -> tuple:
+    # (start, end, replacement) turning `old` into `new`: the common prefix
+    # and suffix are found by bisection over slice comparisons
+    n = min(len(old), len(new))
+    lo, hi = 0, n
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if old[:mid] == new[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    prefix = lo
+    lo, hi = 0, n - prefix
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if old[len(old) - mid:] == new[len(new) - mid:]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return prefix, len(old) - lo, new[prefix:len(new) - lo]
+
+
+_BUILD = object()  # reline() task: build the node below it from the results
+
+
+def reline(nodes: Iterable[Any], shift: int) -> tuple:
+    # Copies of `nodes` with every known line number moved by `shift`.
+    # Nodes are never mutated once built: a node with a line (or above
+    # one) is rebuilt, subtrees without lines (such as the shared
+    # TRUE/FALSE leaves) are reused. Postorder with an explicit stack; the
+    # built children are the top entries of `results`.
+    new = ASTNode.__new__
+    results = []
+    tasks = list(reversed(tuple(nodes)))
+    push, pop = tasks.append, tasks.pop
+    while tasks:
+        task = pop()
+        if task is _BUILD:
+            node = pop()
+            n = len(node.children)
+            children = tuple(results[-n:])
+            del results[-n:]
+        elif type(task) is ASTNode:
+            if task.children:
+                push(task)
+                push(_BUILD)
+                tasks.extend(reversed(task.children))
+                continue
+            node, children = task, ()
+        else:
+            results.append(task)
+            continue
+        if not (node.lineno or node.end) and children == node.children:
+            results.append(node)
+            continue
+        copy = new(ASTNode)
+        copy.nodetype = node.nodetype
+        copy.value = node.value
+        copy.children = children
+        copy.dtype = node.dtype
+        copy.lineno = node.lineno and node.lineno + shift
+        copy.end = node.end and node.end + shift
+        results.append(copy)
+    return tuple(results)
+
+
+class Unit:
+    __slots__ = ('tokens', 'kind', 'names', 'nodes', 'parsed_line')
+
+    def __init__(self, kind: str):
+        # tokens: LexTokens with lexpos/lineno relative to the unit start
+        # names: variables the unit mentions (semantic re-checks)
+        # nodes: AST nodes of the unit, None until parsed
+        self.tokens = []
+        self.kind = kind
+        self.names = set()
+        self.nodes = None
+        self.parsed_line = 0
+
+
+class UnitTokens:
+    # Token source for parser.parse(): the tokens of some units with
+    # absolute positions again
+    def __init__(self, parts: Iterable[tuple]):
+        self.parts = iter(parts)
+        self.current = iter(())
+        self.start = self.line = 0
+
+    def token(self):
+        while True:
+            for rel in self.current:
+                tok = lex.LexToken()
+                tok.type = rel.type
+                tok.value = rel.value
+                tok.lineno = rel.lineno + self.line
+                tok.lexpos = rel.lexpos + self.start
+                return tok
+            part = next(self.parts, None)
+            if part is None:
+                return None
+            unit, self.start, self.line = part
+            self.current = iter(unit.tokens)
+
+
+class IncrementalParser:
+    def __init__(self, text: str = '', ctx: Optional[CompilationContext] = None, cache_dir=None):
+        self.ctx = ctx or CompilationContext()
+        self.parser = new_parser(self.ctx, cache_dir=cache_dir)
+        self.lexer = base_lexer.clone()
+        # Declarations the clean units were checked against
+        self.decls: Dict[str, str] = {}
+        # last: what the last edit touched (see edit())
+        self.last = {}
+        self.reset(text)
+
+    def reset(self, text: str) -> None:
+        # Forget everything and process `text` from scratch
+        self.text = text
+        self.units: List[Unit] = []
+        self.starts: List[int] = []
+        self.lines: List[int] = []
+        self.dirty = set()
+        self.ctx.sem.reset()
+        self.decls = {}
+        self.valid = False
+        start = time.perf_counter()
+        units, starts, lines, _stop, _line = self.scan(0, 1, None)
+        self.splice(0, 0, units, starts, lines, 0, 0)
+        self.valid = True
+        self.last = {'units': len(units), 'parsed': 0, 'rechecked': 0}
+        self.parse_dirty()
+        self.last['seconds'] = time.perf_counter() - start
+
+    def update(self, text: str) -> dict:
+        # Apply the new contents of the whole file as a single edit
+        start, end, replacement = diff_range(self.text, text)
+        return self.edit(start, end, replacement)
+
+    def edit(self, start: int, end: int, replacement: str) -> dict:
+        # Replace text[start:end] by `replacement`. Returns self.last:
+        # units re-lexed, units parsed and units re-checked, and seconds.
+        t0 = time.perf_counter()
+        text = self.text[:start] + replacement + self.text[end:]
+        if not self.valid:
+            # A previous edit failed to lex: start over
+            self.reset(text)
+            return self.last
+        delta = len(replacement) - (end - start)
+        self.text = text
+
+        # Unit to restart from (the first one starts at offset 0)
+        u = max(bisect_left(self.starts, start) - 2, 0)
+        offset, line = (self.starts[u], self.lines[u]) if u else (0, 1)
+        edit_end = start + len(replacement)
+        old_starts = self.starts
+
+        def resync(pos):
+            # Index of the old unit that starts at `pos` (past the edit)
+            if pos < edit_end:
+                return None
+            j = bisect_left(old_starts, pos - delta, u + 1)
+            if j < len(old_starts) and old_starts[j] == pos - delta:
+                return j
+            return None
+
+        self.valid = False
+        units, starts, lines, stop, stop_line = self.scan(offset, line, resync)
+        self.valid = True
+        if stop is None:
+            stop = len(self.units)
+            line_shift = 0
+        else:
+            line_shift = stop_line - self.lines[stop]
+        self.splice(u, stop, units, starts, lines, delta, line_shift)
+        self.last = {'units': len(units), 'parsed': 0, 'rechecked': 0}
+        self.parse_dirty()
+        self.last['seconds'] = time.perf_counter() - t0
+        return self.last
+
+    def scan(self, offset: int, line: int, resync) -> tuple:
+        # Lex self.text from `offset` (a token start on line `line`) and
+        # split the tokens into units, until resync(pos) names the old unit
+        # that starts where a new unit would. Returns (units, starts, lines,
+        # index of that old unit or None at end of text, its new line).
+        lexer = self.lexer
+        lexer.input(self.text)
+        lexer.lexpos = offset
+        lexer.lineno = line
+        units, starts, lines = [], [], []
+        current = None
+        depth = 0
+        tok = lexer.token()
+        while tok is not None:
+            nxt = lexer.token()
+            if current is None or (depth == 0 and starts_unit(tok, nxt)):
+                if current is not None and resync is not None:
+                    j = resync(tok.lexpos)
+                    if j is not None:
+                        return units, starts, lines, j, tok.lineno
+                current = Unit('init' if tok.type == 'INIT' else 'sentencia')
+                units.append(current)
+                first = offset == 0 and len(units) == 1
+                starts.append(0 if first else tok.lexpos)
+                lines.append(1 if first else tok.lineno)
+                base, base_line = starts[-1], lines[-1]
+            if tok.type in OPEN:
+                depth += 1
+            elif tok.type in CLOSE and depth:
+                depth -= 1
+            if tok.type == 'VARIABLE':
+                current.names.add(tok.value)
+            tok.lexpos -= base
+            tok.lineno -= base_line
+            current.tokens.append(tok)
+            tok = nxt
+        return units, starts, lines, None, lexer.lineno
+
+    def splice(self, u: int, stop: int, units: list, starts: list, lines: list, delta: int,
+               line_shift: int) -> None:
+        # Replace units[u:stop] by the new units and shift the ones after
+        for old in self.units[u:stop]:
+            self.dirty.discard(old)
+        tail_starts = [s + delta for s in self.starts[stop:]] if delta else self.starts[stop:]
+        tail_lines = [n + line_shift for n in self.lines[stop:]] if line_shift else self.lines[stop:]
+        self.units[u:stop] = units
+        self.starts[u:] = starts + tail_starts
+        self.lines[u:] = lines + tail_lines
+        self.dirty.update(units)
+        self.span = (u, u + len(units))
+
+    def declarations(self) -> Dict[str, str]:
+        sem = self.ctx.sem
+        return {name: sem.symbols[name]['tipo'] for name in sem.declared}
+
+    def parse_dirty(self) -> None:
+        # Parse the dirty units; the init block first, since the other units
+        # are checked against its declarations
+        units = self.units
+        has_init = bool(units) and units[0].kind == 'init'
+        if has_init and units[0] in self.dirty:
+            self.parse_init()
+        elif not has_init and self.decls:
+            # The init block is gone: every declaration changed
+            self.ctx.sem.reset()
+            self.recheck(set(self.decls))
+            self.decls = {}
+        if len(self.dirty) * 4 > len(units):
+            # Most of the program is dirty: one parse is cheaper
+            self.parse_all()
+            return
+        # The units of the last splice first, then any other dirty unit
+        # (re-checks, or units whose parse failed before)
+        for i in range(*self.span):
+            if units[i] in self.dirty:
+                self.parse_unit(i, units[i])
+        if self.dirty:
+            for i, unit in enumerate(units):
+                if unit in self.dirty:
+                    self.parse_unit(i, unit)
+
+    def parse_all(self) -> None:
+        # One parse of the whole token stream, split back into the units
+        units = self.units
+        self.ctx.sem.reset()
+        ast = self.parser.parse(lexer=UnitTokens(zip(units, self.starts, self.lines)))
+        children = iter(ast.children)
+        for unit, line in zip(units, self.lines):
+            unit.nodes = () if unit.kind == 'init' else (next(children),)
+            unit.parsed_line = line
+        self.dirty.clear()
+        self.decls = self.declarations()
+        self.last['parsed'] += len(units)
+
+    def parse_init(self) -> None:
+        units = self.units
+        self.ctx.sem.reset()
+        parts = [(units[0], self.starts[0], self.lines[0])]
+        if len(units) > 1:
+            parts.append((units[1], self.starts[1], self.lines[1]))
+        ast = self.parser.parse(lexer=UnitTokens(parts))
+        units[0].nodes = ()
+        units[0].parsed_line = self.lines[0]
+        self.dirty.discard(units[0])
+        if len(units) > 1:
+            units[1].nodes = ast.children
+            units[1].parsed_line = self.lines[1]
+            self.dirty.discard(units[1])
+        self.last['parsed'] += len(parts)
+        decls = self.declarations()
+        changed = {n for n in set(decls) | set(self.decls) if decls.get(n) != self.decls.get(n)}
+        self.decls = decls
+        if changed:
+            self.recheck(changed)
+
+    def recheck(self, names: set) -> None:
+        # Units that mention a variable whose declaration changed
+        for unit in self.units:
+            if unit.kind != 'init' and unit not in self.dirty and not unit.names.isdisjoint(names):
+                self.dirty.add(unit)
+                self.last['rechecked'] += 1
+
+    def parse_unit(self, i: int, unit: Unit) -> None:
+        if unit.kind == 'init':
+            # `init` after a statement is a syntax error, as in a full parse
+            tok = unit.tokens[0]
+            raise Exception(f"Error en la linea {tok.lineno + self.lines[i]} at {tok.value}")
+        ast = self.parser.parse(lexer=UnitTokens([(unit, self.starts[i], self.lines[i])]))
+        unit.nodes = ast.children
+        unit.parsed_line = self.lines[i]
+        self.dirty.discard(unit)
+        self.last['parsed'] += 1
+
+    def program(self) -> ASTNode:
+        # AST of the whole program, as parser.parse would build it
+        if self.dirty:
+            self.parse_dirty()
+        children = []
+        # The relined copies are acyclic: the cycle collector is paused
+        # while they are built (as in ast_serializer)
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for unit, line in zip(self.units, self.lines):
+                if unit.parsed_line != line:
+                    unit.nodes = reline(unit.nodes, line - unit.parsed_line)
+                    unit.parsed_line = line
+                children.extend(unit.nodes)
+        finally:
+            if enabled:
+                gc.enable()
+        return ASTNode('Program', children=children)
+
+    def tokens(self):
+        # (type, value, lineno, lexpos) of every token, in order
+        for unit, start, line in zip(self.units, self.starts, self.lines):
+            for tok in unit.tokens:
+                yield tok.type, tok.value, tok.lineno + line, tok.lexpos + start
+
+    def symbols(self) -> SymbolTable:
+        # Symbol table of the lexer for the current text
+        table = SymbolTable()
+        for kind, value, lineno, _ in self.tokens():
+            table.add_lexeme(kind, value, lineno)
+        return table
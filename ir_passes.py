@@ -0,0 +1,339 @@
+"""Optimization passes over the quadruple IR.
+
+A PassManager runs an ordered list of passes over a Quadruples program and
+records, for every pass, how many quadruples it changed and how long it
+took. Passes work on the decoded program (a list of (op, a1, a2, res)
+tuples, branch targets as indices); a deleted quadruple is set to None and
+compact() drops it and renumbers the branch targets.
+
+    copy-propagation   uses of `_t := x` read x instead (per basic block),
+                       and `_t := a op b; v := _t` becomes `v := a op b`
+    dead-stores        removes assignments to temporaries nobody reads
+    constant-branches  resolves CMP of two constants, drops unreachable code
+                       and branches to the next quadruple
+
+Optimization levels pick the passes: -O0 none, -O1 copy propagation and
+dead stores, -O2 all three repeated until nothing changes.
+
+The passes rewrite the quadruples: they show in the IR listing and in the
+program of the naive back end (AsmGenerator with naive=True), which lowers
+the quadruples. The default register back end lowers the folded AST
+instead; ast_passes has the AST counterparts of these passes, which
+compiler.assemble runs on that tree at the same level.
+"""
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional
+
+from quadruples import ARITHMETIC, BRANCHES, Quadruples
+
+Code = List[Optional[tuple]]
+
+# Quadruples whose `res` is a value written by the quadruple
+DEFINES = frozenset(ARITHMETIC) | {':=', 'CONVDATE'}
+
+# Branch mnemonic -> condition under which it is taken
+TAKEN = {
+    'BLT': lambda a, b: a < b,
+    'BLE': lambda a, b: a <= b,
+    'BGT': lambda a, b: a > b,
+    'BGE': lambda a, b: a >= b,
+    'BEQ': lambda a, b: a == b,
+    'BNE': lambda a, b: a != b,
+}
+
+
+def is_temp(operand: Any) -> bool:
+    return isinstance(operand, str) and operand.startswith('_t')
+
+
+def leaders(code: Code) -> set:
+    # First quadruple of every basic block
+    result = {0}
+    for i, q in enumerate(code):
+        if q is not None and q[0] in BRANCHES:
+            result.add(q[3])
+            result.add(i + 1)
+    return result
+
+
+def count_uses(code: Code) -> Dict[Any, int]:
+    uses = {}
+    for q in code:
+        if q is None:
+            continue
+        op, a1, a2, _res = q
+        for a in (a1, a2):
+            if is_temp(a):
+                uses[a] = uses.get(a, 0) + 1
+    return uses
+
+
+def compact(code: Code) -> Code:
+    # Drop deleted quadruples; a branch to a deleted quadruple goes to the
+    # next one that survives (or to the end of the program)
+    new_index = []
+    n = 0
+    for q in code:
+        new_index.append(n)
+        if q is not None:
+            n += 1
+    new_index.append(n)
+    out = []
+    for q in code:
+        if q is None:
+            continue
+        if q[0] in BRANCHES:
+            q = (q[0], q[1], q[2], new_index[q[3]])
+        out.append(q)
+    return out
+
+
+def constant_value(ir: Quadruples, operand: Any) -> Any:
+    # Python value of a constant operand (None if it is not a constant)
+    if operand not in ir.constants:
+        return None
+    if operand in ('true', 'false'):
+        return operand == 'true'
+    if isinstance(operand, str) and operand.startswith('"'):
+        return operand
+    try:
+        return int(operand)
+    except ValueError:
+        return float(operand)
+
+
+class Pass(ABC):
+    name = ''
+
+    @abstractmethod
+    def run(self, code: Code, ir: Quadruples) -> int:
+        # Rewrite `code` in place, return the number of changes
+        ...
+
+
+class CopyPropagation(Pass):
+    name = 'copy-propagation'
+
+    def run(self, code: Code, ir: Quadruples) -> int:
+        changes = 0
+        starts = leaders(code)
+        copies = {}    # temporary -> operand it is a copy of
+        readers = {}   # operand -> temporaries that copy it
+        for i, q in enumerate(code):
+            if q is None:
+                continue
+            if i in starts:
+                copies.clear()
+                readers.clear()
+            op, a1, a2, res = q
+            if op in BRANCHES:
+                continue
+            if a1 in copies:
+                a1 = copies[a1]
+                changes += 1
+            if a2 in copies:
+                a2 = copies[a2]
+                changes += 1
+            if res is not None and op not in ('CMP', 'WRITE', 'PARAM'):
+                # `res` changes: forget copies of it and its own copy
+                for t in readers.pop(res, ()):
+                    copies.pop(t, None)
+                copies.pop(res, None)
+                if op == ':=' and is_temp(res) and a1 != res:
+                    copies[res] = a1
+                    readers.setdefault(a1, []).append(res)
+            code[i] = (op, a1, a2, res)
+
+        # v := _t right after the quadruple that computes _t (its only use):
+        # compute into v directly
+        uses = count_uses(code)
+        prev = None
+        for i, q in enumerate(code):
+            if q is None:
+                continue
+            op, a1, a2, res = q
+            if op == ':=' and is_temp(a1) and uses.get(a1) == 1 and i not in starts and prev is not None:
+                p_op, p1, p2, p_res = code[prev]
+                if p_res == a1 and p_op in DEFINES:
+                    code[prev] = (p_op, p1, p2, res)
+                    code[i] = None
+                    changes += 1
+                    continue
+            prev = i
+        return changes
+
+
+class DeadStores(Pass):
+    name = 'dead-stores'
+
+    def run(self, code: Code, ir: Quadruples) -> int:
+        changes = 0
+        uses = count_uses(code)
+        defs = {}
+        for i, q in enumerate(code):
+            if q is not None and q[0] in DEFINES and is_temp(q[3]):
+                defs[q[3]] = i
+        work = [t for t in defs if not uses.get(t)]
+        while work:
+            t = work.pop()
+            i = defs.pop(t, None)
+            if i is None or code[i] is None:
+                continue
+            _op, a1, a2, _res = code[i]
+            code[i] = None
+            changes += 1
+            # Its operands lose one use each; they may be dead now
+            for a in (a1, a2):
+                if is_temp(a):
+                    uses[a] -= 1
+                    if uses[a] == 0 and a in defs:
+                        work.append(a)
+        return changes
+
+
+class ConstantBranches(Pass):
+    name = 'constant-branches'
+
+    def run(self, code: Code, ir: Quadruples) -> int:
+        changes = 0
+        for i, q in enumerate(code):
+            if q is None or q[0] != 'CMP' or i + 1 >= len(code):
+                continue
+            branch = code[i + 1]
+            if branch is None or branch[0] not in TAKEN:
+                continue
+            left, right = constant_value(ir, q[1]), constant_value(ir, q[2])
+            if left is None or right is None:
+                continue
+            try:
+                taken = TAKEN[branch[0]](left, right)
+            except TypeError:
+                continue
+            code[i] = None
+            code[i + 1] = ('BI', None, None, branch[3]) if taken else None
+            changes += 1
+        changes += self.remove_unreachable(code)
+        return changes
+
+    def remove_unreachable(self, code: Code) -> int:
+        # Delete what cannot be reached from the first quadruple, then the
+        # branches to the quadruple that follows them anyway
+        n = len(code)
+        seen = [False] * (n + 1)
+        stack = [0]
+        while stack:
+            i = stack.pop()
+            # skip deleted quadruples: they fall through to the next one
+            while i < n and code[i] is None and not seen[i]:
+                seen[i] = True
+                i += 1
+            if i >= n or seen[i]:
+                continue
+            seen[i] = True
+            op, _a1, _a2, res = code[i]
+            if op in BRANCHES:
+                stack.append(res)
+            if op != 'BI':
+                stack.append(i + 1)
+        changes = 0
+        for i in range(n):
+            if code[i] is not None and not seen[i]:
+                code[i] = None
+                changes += 1
+        for i in range(n):
+            q = code[i]
+            if q is not None and q[0] == 'BI':
+                nxt = i + 1
+                while nxt < n and code[nxt] is None:
+                    nxt += 1
+                if q[3] == nxt or (nxt == n and q[3] >= n):
+                    code[i] = None
+                    changes += 1
+        return changes
+
+
+PASSES = {p.name: p for p in (CopyPropagation, DeadStores, ConstantBranches)}
+
+OPT_LEVELS = {
+    0: (),
+    1: ('copy-propagation', 'dead-stores'),
+    2: ('copy-propagation', 'constant-branches', 'dead-stores'),
+}
+
+
+class PassManager:
+    """Run passes in order over a Quadruples program.
+
+    `rounds` repeats the whole sequence until a round changes nothing (at
+    most that many times). Passes can be switched off by name with
+    disable(); stats keeps one entry per pass with the total changes and
+    seconds over all rounds.
+    """
+    def __init__(self, passes: Iterable[str] = (), rounds: int = 1):
+        self.passes = [PASSES[name]() for name in passes]
+        self.rounds = rounds
+        self.disabled = set()
+        self.stats = []
+
+    @classmethod
+    def for_level(cls, level: int, disabled: Iterable[str] = ()) -> 'PassManager':
+        if level not in OPT_LEVELS:
+            raise Exception(f'Nivel de optimización desconocido: -O{level}')
+        manager = cls(OPT_LEVELS[level], rounds=10 if level >= 2 else 1)
+        for name in disabled:
+            manager.disable(name)
+        return manager
+
+    def disable(self, name: str) -> None:
+        if name not in PASSES:
+            raise Exception(f"Pasada de optimización desconocida '{name}' (opciones: {', '.join(PASSES)})")
+        self.disabled.add(name)
+
+    def enable(self, name: str) -> None:
+        self.disabled.discard(name)
+
+    def run(self, ir: Quadruples) -> Quadruples:
+        totals = {p.name: {'pass': p.name, 'changes': 0, 'seconds': 0.0, 'enabled': p.name not in self.disabled}
+                  for p in self.passes}
+        code = list(ir)
+        for _ in range(self.rounds):
+            changed = 0
+            for p in self.passes:
+                if p.name in self.disabled:
+                    continue
+                start = time.perf_counter()
+                changes = p.run(code, ir)
+                code = compact(code)
+                totals[p.name]['seconds'] += time.perf_counter() - start
+                totals[p.name]['changes'] += changes
+                changed += changes
+            if not changed:
+                break
+        self.stats = list(totals.values())
+        return self.rebuild(ir, code)
+
+    def rebuild(self, ir: Quadruples, code: Code) -> Quadruples:
+        out = Quadruples()
+        out.dtypes = dict(ir.dtypes)
+        out.constants = set(ir.constants)
+        for op, a1, a2, res in code:
+            out.emit(op, a1, a2, res)
+        return out
+
+    def report(self) -> str:
+        lines = [f"{'pasada':<20}{'cambios':>9}{'ms':>10}"]
+        for s in self.stats:
+            changes = s['changes'] if s['enabled'] else 'off'
+            lines.append(f"{s['pass']:<20}{changes:>9}{s['seconds'] * 1000:>10.3f}")
+        return '\n'.join(lines)
+
+
+def optimizar(ir: Quadruples, level: int = 1, disabled: Iterable[str] = (), trace: Any = None) -> Quadruples:
+    # Convenience wrapper: run the passes of `level`, report them on a
+    # verbose trace and return the optimized program
+    manager = PassManager.for_level(level, disabled)
+    result = manager.run(ir)
+    if trace is not None and manager.passes:
+        trace.info(manager.report())
+    return result
@@ -1,6 +1,8 @@
 import ply.lex as lex
-from pathlib import Path
 import re
+from symbol_table import SymbolTable
+from token_stream import TokenStream
+from trace_sink import TRACE
 
 reserved = {
     'while': 'WHILE',
@@ -118,34 +120,24 @@ def t_error(t):
 lexer = lex.lex(reflags=re.DOTALL)
 
 
-def ejecutar_lexer(code):
-    lexer.input(code)
-    tabla_simbolos = []
-    while True:
-        token = lexer.token()
-        if not token:
-            break
-        print(f'TOKEN: {token.type} LEXEMA: {token.value}')
-        # Guardar variables (solo nombre)
-        if token.type == 'VARIABLE':
-            tabla_simbolos.append({'nombre': token.value, 'tipo': '', 'valor': ''})
-        # Guardar constantes (nombre, tipo, valor)
-        elif token.type in ('N_ENTERO', 'N_FLOAT', 'CADENA', 'DATE', 'DATE_CONVERTED'):
-            tipo = {
-                'N_ENTERO': 'Int',
-                'N_FLOAT': 'Float',
-                'CADENA': 'String',
-                'DATE': 'Date',
-                'DATE_CONVERTED': 'DateConverted',
-                'BOOLEAN': 'Bool'
-            }[token.type]
-            nombre_constante = f"_{token.value}"
-            tabla_simbolos.append({'nombre': nombre_constante, 'tipo': tipo, 'valor': token.value})
-
-    # Escribir la tabla de símbolos en un archivo
-    output_path = Path('./resources/tabla_simbolos.txt')
-    with output_path.open('w', encoding='utf-8') as f:
-        f.write(f"{'Nombre':<20}{'Tipo de Dato':<15}{'Valor':<30}\n")
-        f.write('-' * 65 + '\n')
-        for entry in tabla_simbolos:
-            f.write(f"{entry['nombre']:<20}{entry['tipo']:<15}{str(entry['valor']):<30}\n")
+def token_stream(code, taps=(), lexer=lexer):
+    # Single-pass token source for the parser; `taps` see every token.
+    # Pass `lexer.clone()` to tokenize independently of the shared lexer.
+    stream = TokenStream(lexer, taps)
+    stream.input(code)
+    return stream
+
+
+def ejecutar_lexer(code, report_path=None):
+    # Tokenize `code` and return the symbol table as a SymbolTable. The text
+    # report is only written when `report_path` is given.
+    tabla_simbolos = SymbolTable()
+    taps = [tabla_simbolos.add_token]
+    if TRACE.tokens:
+        taps.append(TRACE.token)
+    for _ in token_stream(code, taps=taps):
+        pass
+
+    if report_path is not None:
+        tabla_simbolos.write_report(report_path)
+    return tabla_simbolos
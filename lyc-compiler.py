@@ -1,17 +1,249 @@
+import argparse
+import cProfile
+import sys
 from pathlib import Path
 
+from ast_exporter import SubtreeDotExporter, SummaryDotExporter
+from ast_serializer import save_ast
+from batch import compile_batch, format_summary
+from bulk_lexer import BulkLexer
+from chunked_lexer import DEFAULT_CHUNK_SIZE, ChunkedLexer
+from compile_cache import DEFAULT_MAX_BYTES, CompileCache
+from compiler import CompileOptions, assemble, compile_source, fold_constants, intermediate_code
+from ir_passes import PASSES
 from parser import ejecutar_parser
-from lexer import ejecutar_lexer
+from profiler import NULL_PROFILER, Profiler
+from lexer import token_stream
+from semantic_context import DEFAULT_CONTEXT
+from symbol_table import SymbolTable
+from trace_sink import LEVELS, TRACE
 
 
-def main():
+def line_range(text):
+	# --dot-lines value: 'DESDE-HASTA' or a single line -> (first, last)
+	first, dash, last = text.partition('-')
+	try:
+		lines = (int(first), int(last if dash else first))
+	except ValueError:
+		raise argparse.ArgumentTypeError(f'rango de lineas invalido: {text!r} (se espera DESDE-HASTA, p. ej. 18-21)')
+	if not 1 <= lines[0] <= lines[1]:
+		raise argparse.ArgumentTypeError(f'rango de lineas invalido: {text!r} (DESDE debe ser >= 1 y <= HASTA)')
+	return lines
+
+
+def parse_args(argv=None):
+	ap = argparse.ArgumentParser(description='Compilador LyC')
+	ap.add_argument('inputs', nargs='*',
+		help='archivos o globs a compilar en lote (sin argumentos: resources/prueba.txt)')
+	ap.add_argument('-o', '--out-dir', type=Path, default=Path('./build'),
+		help='directorio de salida del modo lote (default: ./build)')
+	ap.add_argument('-j', '--jobs', type=int, default=None,
+		help='procesos del modo lote (default: cantidad de CPUs)')
+	ap.add_argument('--png', action='store_true',
+		help='en modo lote, renderizar tambien cada AST con Graphviz (formato: --render-format)')
+	ap.add_argument('--dot-summary', action='store_true',
+		help='exportar un DOT resumido: subarboles colapsados hasta --dot-budget nodos, una sentencia por cluster')
+	ap.add_argument('--dot-budget', type=int, default=500,
+		help='nodos maximos del DOT resumido (default: 500)')
+	ap.add_argument('--dot-depth', type=int, default=None,
+		help='en el DOT resumido, colapsar los subarboles por debajo de esta profundidad')
+	ap.add_argument('--dot-statement', type=int, default=None, metavar='N',
+		help='exportar al DOT solo la sentencia de nivel superior N (desde 0) con todo detalle')
+	ap.add_argument('--dot-lines', type=line_range, default=None, metavar='DESDE-HASTA',
+		help='exportar al DOT solo las sentencias de esas lineas con todo detalle')
+	ap.add_argument('--render-format', choices=['png', 'svg'], default='png',
+		help='formato del render de Graphviz (default: png)')
+	ap.add_argument('--render-jobs', type=int, default=2,
+		help='renders de Graphviz simultaneos en modo lote (default: 2)')
+	ap.add_argument('--wait-render', action='store_true',
+		help='esperar el render de Graphviz en lugar de dejarlo en segundo plano')
+	ap.add_argument('--ir', type=Path, default=None,
+		help='escribir el listado de cuadruplas (codigo intermedio) en este archivo')
+	ap.add_argument('--save-ast', type=Path, default=None,
+		help='guardar el AST en este archivo (.json: JSON, cualquier otra extension: binario compacto)')
+	ap.add_argument('--asm', type=Path, default=None,
+		help='generar el programa TASM (8086/.386/.387) en este archivo')
+	ap.add_argument('--naive-asm', action='store_true',
+		help='generar el assembler traduciendo cada cuadrupla via memoria (referencia para comparar)')
+	ap.add_argument('-O', dest='opt_level', type=int, choices=[0, 1, 2], default=0,
+		help='nivel de optimizacion: -O0 (default), -O1 o -O2. Las pasadas cambian las cuadruplas (--ir, '
+			'--naive-asm) y, sobre el AST, el assembler por registros (default), que desde -O1 pasa ademas por '
+			'la mirilla')
+	ap.add_argument('--disable-pass', action='append', default=[], choices=list(PASSES), metavar='PASADA',
+		help='omitir una pasada de optimizacion (se puede repetir): ' + ', '.join(PASSES))
+	ap.add_argument('--pass-stats', action='store_true',
+		help='mostrar cambios y tiempo de cada pasada de optimizacion y las reglas de mirilla aplicadas')
+	ap.add_argument('--bulk-lexer', action='store_true',
+		help='tokenizar con el lexer en bloque (mismos tokens que PLY, mas rapido)')
+	ap.add_argument('--stream', action='store_true',
+		help='leer el fuente con mmap y tokenizarlo por bloques, sin cargarlo entero en memoria')
+	ap.add_argument('--chunk-kb', type=int, default=DEFAULT_CHUNK_SIZE // 1024,
+		help='tamano de bloque de --stream en KB (default: %(default)d)')
+	ap.add_argument('--cache', action='store_true',
+		help='reusar compilaciones anteriores del mismo fuente con las mismas opciones')
+	ap.add_argument('--cache-dir', type=Path, default=None,
+		help='directorio de la cache (default: $LYC_CACHE_DIR o ./.lyc_cache)')
+	ap.add_argument('--cache-max-mb', type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024),
+		help='tamano maximo de la cache de compilaciones en MB (default: %(default).0f)')
+	ap.add_argument('--cache-info', action='store_true',
+		help='mostrar entradas y tamano de la cache de compilaciones y salir')
+	ap.add_argument('--cache-clear', action='store_true',
+		help='vaciar la cache de compilaciones y salir')
+	ap.add_argument('--trace', choices=list(LEVELS), default='verbose',
+		help='nivel de traza: off, productions, tokens o verbose (default: verbose)')
+	ap.add_argument('--trace-file', type=Path, default=None,
+		help='escribir la traza en un archivo en lugar de stdout')
+	ap.add_argument('--trace-counts', action='store_true',
+		help='contar reducciones por produccion y mostrarlas al final')
+	ap.add_argument('--profile', action='store_true',
+		help='medir tiempo de pared, CPU y memoria de cada fase y contar tokens, reducciones, busquedas y nodos')
+	ap.add_argument('--profile-json', type=Path, default=None,
+		help='guardar el perfil de --profile en este archivo JSON')
+	ap.add_argument('--profile-no-memory', action='store_true',
+		help='no medir memoria con tracemalloc (tiempos mas fieles)')
+	ap.add_argument('--cprofile', type=Path, default=None,
+		help='correr la compilacion bajo cProfile y guardar las estadisticas en este archivo')
+	return ap.parse_args(argv)
+
+
+def dot_exporter(args):
+	# Exporter for the DOT outputs (None: the full ASTDotExporter)
+	if args.dot_statement is not None or args.dot_lines is not None:
+		return SubtreeDotExporter(index=args.dot_statement, lines=args.dot_lines)
+	if args.dot_summary:
+		return SummaryDotExporter(budget=args.dot_budget, max_depth=args.dot_depth)
+	return None
+
+
+def main_batch(args):
+	batch = compile_batch(args.inputs, args.out_dir, jobs=args.jobs, render_png=args.png, opt_level=args.opt_level,
+		cache_dir=args.cache_dir, cache_max_bytes=int(args.cache_max_mb * 1024 * 1024), use_cache=args.cache,
+		bulk_lexer=args.bulk_lexer, render_format=args.render_format, render_jobs=args.render_jobs,
+		dot_exporter=dot_exporter(args))
+	print(format_summary(batch))
+	if any(r['status'] != 'ok' for r in batch['results']):
+		return 1
+	return 0
+
+
+def single_options(args, cache=None):
+	# CompileOptions of single mode, shared by the cached and uncached paths
+	return CompileOptions(
+		dot_path='./intermediate-code.dot', render_png=True, trace=TRACE, ir_path=args.ir, asm_path=args.asm,
+		naive_asm=args.naive_asm, fold=args.ir is not None or args.asm is not None, opt_level=args.opt_level,
+		ast_path=args.save_ast, dot_exporter=dot_exporter(args),
+		disabled_passes=args.disable_pass, cache=cache, bulk_lexer=args.bulk_lexer, render_format=args.render_format,
+		wait_render=args.wait_render)
+
+
+def main_cached(args, code):
+	# Single mode through the compilation cache: same outputs as below,
+	# compiled by compile_source in its own context
+	cache = CompileCache(args.cache_dir, int(args.cache_max_mb * 1024 * 1024))
+	result = compile_source(code, single_options(args, cache))
+	result.symbols.write_report(Path('./resources/tabla_simbolos.txt'))
+	if TRACE.verbose:
+		TRACE.info(cache.report())
+
+
+def main(argv=None):
+	args = parse_args(argv)
+	if args.cache_info or args.cache_clear:
+		cache = CompileCache(args.cache_dir, int(args.cache_max_mb * 1024 * 1024))
+		if args.cache_clear:
+			print(f'{cache.clear()} entrada(s) eliminadas de {cache.dir}')
+		if args.cache_info:
+			print(cache.report())
+		return 0
+	if args.inputs:
+		return main_batch(args)
+
+	profiler = NULL_PROFILER
+	if args.profile or args.profile_json is not None:
+		profiler = Profiler(memory=not args.profile_no_memory)
+		profiler.start()
+	try:
+		if args.cprofile is not None:
+			stats = cProfile.Profile()
+			status = stats.runcall(main_single, args, profiler)
+			stats.dump_stats(str(args.cprofile))
+		else:
+			status = main_single(args, profiler)
+	finally:
+		if profiler is not NULL_PROFILER:
+			profiler.stop()
+	if profiler is not NULL_PROFILER:
+		if args.profile:
+			profiler.dump()
+		if args.profile_json is not None:
+			profiler.write_json(args.profile_json)
+	return status
+
+
+def main_single(args, profiler=NULL_PROFILER):
+	trace_file = None
+	if args.trace_file is not None:
+		trace_file = TRACE.to_file(args.trace_file, args.trace)
+	TRACE.configure(args.trace, count=args.trace_counts)
+
 	path = Path('./resources/prueba.txt')
-	code = path.read_text()
+	if args.cache:
+		try:
+			with profiler.phase('compilación (cache)'):
+				main_cached(args, path.read_text())
+			if args.trace_counts:
+				TRACE.dump_counts()
+		finally:
+			if trace_file is not None:
+				trace_file.close()
+		return 0
 
-	# Run lexer (prints tokens) and parser on the exact same input
-	ejecutar_lexer(code)
-	ejecutar_parser(code)
+	# Tokenize once: the parser pulls tokens from the stream while the
+	# token dump and the symbol table collect them as taps. The text
+	# report of the symbol table is written once parsing is done.
+	tabla_simbolos = SymbolTable()
+	taps = [tabla_simbolos.add_token]
+	if TRACE.tokens:
+		taps.append(TRACE.token)
+	if args.stream:
+		# The lexer reads the file itself, one block at a time
+		tokens = token_stream(path, taps=taps, lexer=ChunkedLexer(args.chunk_kb * 1024))
+	else:
+		with profiler.phase('lectura del fuente'):
+			code = path.read_text()
+		if args.bulk_lexer:
+			tokens = token_stream(code, taps=taps, lexer=BulkLexer())
+		else:
+			tokens = token_stream(code, taps=taps)
+	try:
+		ast = ejecutar_parser(symbols=tabla_simbolos, tokens=tokens, profiler=profiler,
+			render_format=args.render_format, wait_render=args.wait_render, dot_exporter=dot_exporter(args))
+		with profiler.phase('reporte de símbolos'):
+			tabla_simbolos.write_report(Path('./resources/tabla_simbolos.txt'))
+		if args.save_ast is not None:
+			with profiler.phase('guardado del AST'):
+				save_ast(ast, args.save_ast)
+		if args.ir is not None or args.asm is not None:
+			# Same stages as compile_source, over the process-wide context
+			options = single_options(args)
+			ast = fold_constants(ast, options, DEFAULT_CONTEXT, profiler)
+			ir, passes = intermediate_code(ast, options, DEFAULT_CONTEXT, profiler)
+			if args.pass_stats and passes.passes:
+				print(passes.report())
+			if args.ir is not None:
+				args.ir.write_text(ir.listing() + '\n', encoding='utf-8')
+			if args.asm is not None:
+				asm, peephole = assemble(ast, ir, options, DEFAULT_CONTEXT, profiler)
+				if args.pass_stats and peephole is not None:
+					print(peephole.report())
+				args.asm.write_text(asm, encoding='utf-8')
+		if args.trace_counts:
+			TRACE.dump_counts()
+	finally:
+		if trace_file is not None:
+			trace_file.close()
+	return 0
 
 
 if __name__ == '__main__':
-	main()
+	sys.exit(main())
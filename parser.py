@@ -1,39 +1,25 @@
-# parser.out -> se genera solo
+# parser.out -> solo con ejecutar_parser(debug=True), junto a las tablas cacheadas
 
 # Se importan los tokens y el objeto lexer generado previamente en el lexer
-from lexer import tokens, lexer as lexing
-import ply.yacc as yacc  # analizador sintactico
+from lexer import tokens, token_stream
 from pathlib import Path
-import shutil
-import subprocess
+import copy
+import sys
 from ast_exporter import ASTDotExporter
-from ast_node import ASTNode
-from semantic_context import SEM
+from ast_node import ASTNode, FALSE, TRUE
+from semantic_context import DEFAULT_CONTEXT, SEM
+from parser_cache import build_parser, cache_report
+from profiler import NULL_PROFILER
+from render_queue import RENDERS
+from trace_sink import TRACE
 from helpers import (
-    new_temp,
     is_numeric,
     combine_numeric,
     ensure_assign_compatible,
+    diccionarioComparadores,
+    diccionarioComparadoresNot,
 )
 
-diccionarioComparadores = {
-    ">=":   "BLT",
-    ">":   "BLE",
-    "<=":   "BGT",
-    "<":   "BGE",
-    "<>":   "BEQ",
-    "==":   "BNE"
-}
-
-diccionarioComparadoresNot = {
-    ">=":   "<",
-    ">":   "<=",
-    "<=":   ">",
-    "<":   ">=",
-    "<>":   "==",
-    "==":   "<>"
-}
-
 
 precedence = (
     ('right', 'ASIGNACION'),
@@ -53,7 +39,8 @@ def p_start(p):
         p[0] = ASTNode('Program', children=prog_children)
     else:
         p[0] = ASTNode('Program', children=p[1] if isinstance(p[1], list) else [p[1]])
-    print('FIN')
+    if p.parser.trace.on:
+        p.parser.trace.production('FIN')
 
 
 def p_programa(p):
@@ -61,15 +48,16 @@ def p_programa(p):
                 | sentencia
     '''
     if len(p) == 3:
-        # append statement to program list
-        if isinstance(p[1], list):
-            p[0] = p[1] + [p[2]]
-        else:
-            p[0] = [p[1], p[2]]
-        print(f'programa sentencia -> programa')
+        # append statement to program list in place (the list is only
+        # referenced from this stack slot), keeping construction linear
+        p[1].append(p[2])
+        p[0] = p[1]
+        if p.parser.trace.on:
+            p.parser.trace.production('programa sentencia -> programa')
     else:
         p[0] = [p[1]]
-        print(f'sentencia -> programa')
+        if p.parser.trace.on:
+            p.parser.trace.production('sentencia -> programa')
 
 
 def p_sentencia(p):
@@ -79,28 +67,35 @@ def p_sentencia(p):
                 | write
                 | read
     '''
-    print(f'{p.slice[1].type} -> sentencia')
+    if p.parser.trace.on:
+        p.parser.trace.production(f'{p.slice[1].type} -> sentencia')
     p[0] = p[1]
     
     
 def p_write(p):
     '''write : WRITE A_PARENTESIS CADENA C_PARENTESIS
     '''
-    print(f'write ( CADENA ) -> write')
-    node = ASTNode('WRITE', children=['write',p[3]], dtype=None)
+    if p.parser.trace.on:
+        p.parser.trace.production('write ( CADENA ) -> write')
+    try:
+        lineno = p.lineno(1)
+    except Exception:
+        lineno = 0
+    node = ASTNode('WRITE', children=['write',p[3]], dtype=None, lineno=lineno)
     p[0] = node
     
     
 def p_read(p):
     '''read : READ A_PARENTESIS VARIABLE C_PARENTESIS
     '''
-    print(f'read ( VARIABLE ) -> read')
+    if p.parser.trace.on:
+        p.parser.trace.production('read ( VARIABLE ) -> read')
     try:
         lineno = p.lineno(3)
     except Exception:
         lineno = 0
-    SEM.ensure_declared(p[3], lineno)
-    node = ASTNode('READ', children=['read',p[3]], dtype=None)
+    p.parser.sem.ensure_declared(p[3], lineno)
+    node = ASTNode('READ', children=['read',p[3]], dtype=None, lineno=lineno)
     p[0] = node
 
 
@@ -109,7 +104,8 @@ def p_init(p):
     '''
     # Process declarations semantically; do not build AST nodes for init
     p[0] = None
-    print(f'init {{ declaracion }} -> init')
+    if p.parser.trace.on:
+        p.parser.trace.production('init { declaracion } -> init')
 
 
 def p_declaracion(p):
@@ -117,14 +113,14 @@ def p_declaracion(p):
                     | linea_declaracion
     '''
     if len(p) == 3:
-        if isinstance(p[1], list):
-            p[0] = p[1] + [p[2]]
-        else:
-            p[0] = [p[1], p[2]]
-        print(f'declaracion linea_declaracion -> declaracion')
+        p[1].append(p[2])
+        p[0] = p[1]
+        if p.parser.trace.on:
+            p.parser.trace.production('declaracion linea_declaracion -> declaracion')
     else:
         p[0] = [p[1]]
-        print(f'linea_declaracion -> declaracion')
+        if p.parser.trace.on:
+            p.parser.trace.production('linea_declaracion -> declaracion')
     
 
 def p_linea_declaracion(p):
@@ -146,16 +142,17 @@ def p_linea_declaracion(p):
     except Exception:
         lineno = 0
     for n in names:
-        SEM.set_decl(n, tipo, lineno)
+        p.parser.sem.set_decl(n, tipo, lineno)
 
-    decl_nodes = [ASTNode('Declaration', children=[ASTNode('Type', value=tipo), ASTNode('Var', value=n)]) for n in names]
+    decl_nodes = [ASTNode('Declaration', children=[ASTNode('Type', value=tipo), ASTNode('Var', value=n)], lineno=lineno) for n in names]
     # If only one variable was declared on the line, return a single node,
     # otherwise return the list so higher-level rules can flatten them.
     if len(decl_nodes) == 1:
         p[0] = decl_nodes[0]
     else:
         p[0] = decl_nodes
-    print(f'lista_variables ASIGNACION_TIPO tipo_dato -> linea_declaracion')
+    if p.parser.trace.on:
+        p.parser.trace.production('lista_variables ASIGNACION_TIPO tipo_dato -> linea_declaracion')
 
 
 def p_asignacion(p):
@@ -164,65 +161,29 @@ def p_asignacion(p):
                 | VARIABLE ASIGNACION equal_expressions
     '''
     # Assignment: VARIABLE := expresion
-    print(f'VARIABLE ASIGNACION {p.slice[3].type} -> asignacion')
+    if p.parser.trace.on:
+        p.parser.trace.production(f'VARIABLE ASIGNACION {p.slice[3].type} -> asignacion')
     # Semantic checks
     try:
         lineno = p.lineno(1)
     except Exception:
         lineno = 0
     lhs_name = p[1]
-    lhs_t = SEM.ensure_declared(lhs_name, lineno)
+    lhs_t = p.parser.sem.ensure_declared(lhs_name, lineno)
     rhs_node = p[3]
-    # Special handling: expand equalExpressions into assignment + nested IF chain targeting the LHS
+    # equalExpressions(e1..eN) stays a single EqualExpressions node (linear
+    # in N); the back ends lower it as a duplicate search over the N values
+    # and constant_folding resolves it when every argument is a literal.
     if isinstance(rhs_node, ASTNode) and rhs_node.nodetype == 'EqualExpressions':
         if lhs_t != 'Bool':
             raise Exception(f"Error semántico (línea {lineno}): equalExpressions solo puede asignarse a variables Boolean")
-
-        def build_equal_expr_chain(target_var, exprs):
-            temps = []
-            assigns_top = []
-            for i, e in enumerate(exprs):
-                tname = new_temp()
-                temps.append(tname)
-            # Assign first two expressions
-            assigns_top.append(ASTNode(':=', children=[temps[0], exprs[0]]))
-            assigns_top.append(ASTNode(':=', children=[temps[1], exprs[1]]))
-
-            # Default else branch assigns false to target
-            else_branch = ASTNode(':=', children=[target_var, ASTNode('false', dtype='Bool')])
-
-            # Build nested IFs from the end for expr3..exprN
-            n = len(exprs)
-            for k in range(n, 2, -1):
-                tk = temps[k-1]
-                assign_k = ASTNode(':=', children=[tk, exprs[k-1]])
-                comps = []
-                for i in range(0, k-1):
-                    comps.append(ASTNode('==', children=[tk, temps[i]], dtype='Bool'))
-                cond = comps[0]
-                for c in comps[1:]:
-                    cond = ASTNode('or', children=[cond, c], dtype='Bool')
-                then_true = ASTNode(':=', children=[target_var, ASTNode('true', dtype='Bool')])
-                body = ASTNode('Body', children=[then_true, else_branch])
-                if_node = ASTNode('IF', children=[cond, body])
-                else_branch = ASTNode('Block', children=[assign_k, if_node])
-
-            # Top IF compares first two temps
-            cond12 = ASTNode('==', children=[temps[0], temps[1]], dtype='Bool')
-            then_true = ASTNode(':=', children=[target_var, ASTNode('true', dtype='Bool')])
-            top_body = ASTNode('Body', children=[then_true, else_branch])
-            top_if = ASTNode('IF', children=[cond12, top_body])
-            return ASTNode('EqualExpressions', children=assigns_top + [top_if], dtype='Bool')
-
-        # rhs_node.children contains the original expressions list
-        exprs = rhs_node.children if isinstance(rhs_node.children, list) else [rhs_node.children]
-        node = build_equal_expr_chain(p[1], exprs)
+        node = ASTNode(':=', children=[p[1], rhs_node], dtype=lhs_t, lineno=lineno)
     else:
         rhs_t = getattr(rhs_node, 'dtype', None)
         if rhs_t is None:
             rhs_t = 'Unknown'
         ensure_assign_compatible(lhs_t, rhs_t, lineno, lhs_name)
-        node = ASTNode(':=', children=[p[1],p[3]], dtype=lhs_t)
+        node = ASTNode(':=', children=[p[1],p[3]], dtype=lhs_t, lineno=lineno)
     p[0] = node
 
 
@@ -237,22 +198,27 @@ def p_while(p):
         else:
             return [block]
 
+    # lineno: the WHILE keyword; end: the closing brace of the block
+    try:
+        lineno = p.lineno(1)
+        end = p.lineno(7)
+    except Exception:
+        lineno = end = 0
+
     # Validate condition type is boolean
     cond = p[3]
     if getattr(cond, 'dtype', None) != 'Bool':
-        try:
-            lineno = p.lineno(1)
-        except Exception:
-            lineno = 0
         raise Exception(f"Error semántico (línea {lineno}): la condición de while debe ser booleana")
 
     body_children = wrap_block(p[6])
     if len(body_children) == 1:
-        node = ASTNode('While', children=[p[3], body_children[0]])
+        node = ASTNode('While', children=[p[3], body_children[0]], lineno=lineno, end=end)
     else:
-        node = ASTNode('While', children=[p[3], ASTNode('Block', children=body_children)])
+        node = ASTNode('While', children=[p[3], ASTNode('Block', children=body_children)], lineno=lineno,
+                       end=end)
     p[0] = node
-    print(f'while ( condicion ) {{ programa }} -> while')
+    if p.parser.trace.on:
+        p.parser.trace.production('while ( condicion ) { programa } -> while')
     
     
 def p_if_else(p):
@@ -270,27 +236,29 @@ def p_if_else(p):
         else:
             return [block]
 
+    # lineno: the IF keyword; end: the last closing brace (of the else
+    # block when there is one)
+    try:
+        lineno = p.lineno(1)
+        end = p.lineno(len(p) - 1)
+    except Exception:
+        lineno = end = 0
+
     if len(p) == 8:
-        print(f'if ( condicion ) {{ programa }} -> if_else')
+        if p.parser.trace.on:
+            p.parser.trace.production('if ( condicion ) { programa } -> if_else')
         # flatten block statements into IF's children: [cond, stmt1, stmt2, ...]
         # Semantic: condition must be boolean
         if getattr(p[3], 'dtype', None) != 'Bool':
-            try:
-                lineno = p.lineno(1)
-            except Exception:
-                lineno = 0
             raise Exception(f"Error semántico (línea {lineno}): la condición de if debe ser booleana")
         then_children = wrap_block(p[6])
-        node = ASTNode('IF', children=[p[3]] + then_children)
+        node = ASTNode('IF', children=[p[3]] + then_children, lineno=lineno, end=end)
     else:
-        print(f'if ( condicion ) {{ programa }} else {{ programa }} -> if_else')
+        if p.parser.trace.on:
+            p.parser.trace.production('if ( condicion ) { programa } else { programa } -> if_else')
         # Build then and else subtrees. If they contain multiple statements,
         # keep them wrapped in a Block so we can attach them as left/right of Body.
         if getattr(p[3], 'dtype', None) != 'Bool':
-            try:
-                lineno = p.lineno(1)
-            except Exception:
-                lineno = 0
             raise Exception(f"Error semántico (línea {lineno}): la condición de if debe ser booleana")
         then_children = wrap_block(p[6])
         else_children = wrap_block(p[10])
@@ -305,7 +273,7 @@ def p_if_else(p):
         else_node = make_side(else_children)
 
         body = ASTNode('Body', children=[then_node, else_node])
-        node = ASTNode('IF', children=[p[3], body])
+        node = ASTNode('IF', children=[p[3], body], lineno=lineno, end=end)
     p[0] = node
 
 
@@ -327,21 +295,20 @@ def p_condicion(p):
                 lineno = p.lineno(1)
             except Exception:
                 lineno = 0
-            t1 = SEM.ensure_declared(p[1], lineno)
-            t2 = SEM.ensure_declared(p[3], lineno)
+            t1 = p.parser.sem.ensure_declared(p[1], lineno)
+            t2 = p.parser.sem.ensure_declared(p[3], lineno)
             if t1 != 'Bool' or t2 != 'Bool':
                 raise Exception(f"Error semántico (línea {lineno}): operadores lógicos requieren variables booleanas")
-            v1 = ASTNode(p[1], dtype='Bool')
-            v2 = ASTNode(p[3], dtype='Bool')
-            # Create distinct literal leaves so each comparator has its own
-            lit_true_left = ASTNode('true', dtype='Bool')
-            lit_true_right = ASTNode('true', dtype='Bool')
-            left_cmp = ASTNode('==', children=[v1, lit_true_left], dtype='Bool')
-            right_cmp = ASTNode('==', children=[v2, lit_true_right], dtype='Bool')
-            node = ASTNode(p[2], children=[left_cmp, right_cmp], dtype='Bool')
+            v1 = ASTNode(p[1], dtype='Bool', lineno=lineno)
+            v2 = ASTNode(p[3], dtype='Bool', lineno=lineno)
+            # Both comparators share the `true` literal leaf
+            left_cmp = ASTNode('==', children=[v1, TRUE], dtype='Bool', lineno=lineno)
+            right_cmp = ASTNode('==', children=[v2, TRUE], dtype='Bool', lineno=lineno)
+            node = ASTNode(p[2], children=[left_cmp, right_cmp], dtype='Bool', lineno=lineno)
             p[0] = node
             return
-        print(f'comparacion {p.slice[2].type} comparacion -> condicion')
+        if p.parser.trace.on:
+            p.parser.trace.production(f'comparacion {p.slice[2].type} comparacion -> condicion')
         t1 = getattr(p[1], 'dtype', None)
         t2 = getattr(p[3], 'dtype', None)
         if t1 != 'Bool' or t2 != 'Bool':
@@ -359,16 +326,17 @@ def p_condicion(p):
             except Exception:
                 lineno = 0
             vname = p[2]
-            vtype = SEM.ensure_declared(vname, lineno)
+            vtype = p.parser.sem.ensure_declared(vname, lineno)
             if vtype != 'Bool':
                 raise Exception(f"Error semántico (línea {lineno}): 'not' requiere una variable booleana")
             # Normalize to comparison: v == false
-            left = ASTNode(vname, dtype='Bool')
-            right = ASTNode('false', dtype='Bool')
-            node = ASTNode('==', children=[left, right], dtype='Bool')
+            left = ASTNode(vname, dtype='Bool', lineno=lineno)
+            right = FALSE
+            node = ASTNode('==', children=[left, right], dtype='Bool', lineno=lineno)
             p[0] = node
             return
-        print(f'NOT comparacion -> condicion')
+        if p.parser.trace.on:
+            p.parser.trace.production('NOT comparacion -> condicion')
         comp = p[2]
         if isinstance(comp, ASTNode) and comp.nodetype in diccionarioComparadoresNot and len(comp.children) == 2:
             inverted = diccionarioComparadoresNot[comp.nodetype]
@@ -384,21 +352,23 @@ def p_condicion(p):
     else:
         # Single comparison result or a boolean variable
         if p.slice[1].type == 'VARIABLE':
-            print(f'bool -> condicion')
+            if p.parser.trace.on:
+                p.parser.trace.production('bool -> condicion')
             try:
                 lineno = p.lineno(1)
             except Exception:
                 lineno = 0
             vname = p[1]
-            vtype = SEM.ensure_declared(vname, lineno)
+            vtype = p.parser.sem.ensure_declared(vname, lineno)
             if vtype != 'Bool':
                 raise Exception(f"Error semántico (línea {lineno}): la condición debe ser una variable booleana")
             # Normalize to comparison: v == true
-            left = ASTNode(vname, dtype='Bool')
-            right = ASTNode('true', dtype='Bool')
-            node = ASTNode('==', children=[left, right], dtype='Bool')
+            left = ASTNode(vname, dtype='Bool', lineno=lineno)
+            right = TRUE
+            node = ASTNode('==', children=[left, right], dtype='Bool', lineno=lineno)
         else:
-            print(f'comparacion -> condicion')
+            if p.parser.trace.on:
+                p.parser.trace.production('comparacion -> condicion')
             node = p[1]
             if getattr(node, 'dtype', None) != 'Bool':
                 try:
@@ -411,7 +381,8 @@ def p_condicion(p):
 def p_comparacion(p):
     '''comparacion : expresion COMPARADOR expresion
     '''
-    print(f'expresion COMPARADOR expresion -> comparacion')
+    if p.parser.trace.on:
+        p.parser.trace.production('expresion COMPARADOR expresion -> comparacion')
     left = p[1]
     right = p[3]
     op = p[2]
@@ -427,14 +398,15 @@ def p_comparacion(p):
     else:
         if not (t1 == t2 or (is_numeric(t1) and is_numeric(t2))):
             raise Exception(f"Error semántico (línea {lineno}): comparación entre tipos incompatibles {t1} y {t2}")
-    node = ASTNode(op, children=[left, right], dtype='Bool')
+    node = ASTNode(op, children=[left, right], dtype='Bool', lineno=lineno)
     p[0] = node
 
 
 def p_equal_expressions(p):
     '''equal_expressions : EQUAL_EXPRESSIONS A_PARENTESIS list_expressions C_PARENTESIS
     '''
-    print(f'equalExpressions ( list_expressions ) -> equal_expressions')
+    if p.parser.trace.on:
+        p.parser.trace.production('equalExpressions ( list_expressions ) -> equal_expressions')
     exprs = p[3] if isinstance(p[3], list) else [p[3]]
 
     # Semantic: require all expressions to be same type (or all numeric)
@@ -449,37 +421,46 @@ def p_equal_expressions(p):
             if not (t == base or (is_numeric(t) and is_numeric(base))):
                 raise Exception(f"Error semántico (línea {lineno}): equalExpressions con tipos incompatibles {base} y {t}")
 
-    # Carry the raw expressions; p_asignacion expands this into assignments
-    # and nested IFs that assign to the LHS boolean variable.
-    node = ASTNode('EqualExpressions', children=exprs, dtype='Bool')
+    # Carry the raw expressions; p_asignacion assigns the node to the LHS
+    # boolean variable.
+    node = ASTNode('EqualExpressions', children=exprs, dtype='Bool', lineno=lineno)
     p[0] = node
     
 
 def p_list_expressions(p):
-    '''list_expressions : expresion SEPARADOR_VARIABLES list_expressions
+    '''list_expressions : list_expressions SEPARADOR_VARIABLES expresion
                         | expresion
     '''
+    # Left-recursive so the parser stack stays flat and each element is
+    # appended in O(1)
     if len(p) == 4:
-        # p[1] is expresion, p[3] is list
-        if isinstance(p[3], list):
-            p[0] = [p[1]] + p[3]
-        else:
-            p[0] = [p[1], p[3]]
-        print(f'expresion , list_expressions -> list_expressions')
+        # p[1] is the list so far, p[3] the next expresion
+        p[1].append(p[3])
+        p[0] = p[1]
+        if p.parser.trace.on:
+            p.parser.trace.production('list_expressions , expresion -> list_expressions')
     else:
         p[0] = [p[1]]
-        print(f'expresion -> list_expressions')
+        if p.parser.trace.on:
+            p.parser.trace.production('expresion -> list_expressions')
 
 
 def p_conv_date(p):
     '''conv_date : CONV_DATE A_PARENTESIS DATE C_PARENTESIS
     '''
-    print(f'convDate ( DATE ) -> conv_date')
+    if p.parser.trace.on:
+        p.parser.trace.production('convDate ( DATE ) -> conv_date')
     # Build an arithmetic AST equivalent to: (anio * 10000) + (mes * 100) + dia
     # This follows the project's convention of representing expressions as
     # ASTNodes with operators '+', '*', etc., so the code generator can lower
-    # the arithmetic like any other expression.
+    # the arithmetic like any other expression. Every node is typed
+    # DateConverted (32-bit storage): anio * 10000 does not fit in an Int.
+    # The constant folding pass collapses the tree into a single literal.
     raw = p[3]
+    try:
+        lineno = p.lineno(3)
+    except Exception:
+        lineno = 0
     try:
         dia, mes, anio = map(int, raw.split('-'))
         # Basic validation (lexer already enforces general shape and ranges)
@@ -492,93 +473,100 @@ def p_conv_date(p):
                 raise ValueError(f"Fecha inválida (no es año bisiesto) '{raw}'")
 
         # Create numeric AST nodes for year, month, day and the constants
-        node_year = ASTNode(str(anio), dtype='Int')
-        node_month = ASTNode(str(mes), dtype='Int')
-        node_day = ASTNode(str(dia), dtype='Int')
-        node_10000 = ASTNode(str(10000), dtype='Int')
-        node_100 = ASTNode(str(100), dtype='Int')
+        node_year = ASTNode(str(anio), dtype='DateConverted', lineno=lineno)
+        node_month = ASTNode(str(mes), dtype='DateConverted', lineno=lineno)
+        node_day = ASTNode(str(dia), dtype='DateConverted', lineno=lineno)
+        node_10000 = ASTNode(str(10000), dtype='DateConverted', lineno=lineno)
+        node_100 = ASTNode(str(100), dtype='DateConverted', lineno=lineno)
 
         # anio * 10000
-        mul_year = ASTNode('*', children=[node_year, node_10000], dtype='Int')
+        mul_year = ASTNode('*', children=[node_year, node_10000], dtype='DateConverted', lineno=lineno)
         # mes * 100
-        mul_month = ASTNode('*', children=[node_month, node_100], dtype='Int')
+        mul_month = ASTNode('*', children=[node_month, node_100], dtype='DateConverted', lineno=lineno)
         # (mes * 100) + dia
-        add_month_day = ASTNode('+', children=[mul_month, node_day], dtype='Int')
+        add_month_day = ASTNode('+', children=[mul_month, node_day], dtype='DateConverted', lineno=lineno)
         # (anio * 10000) + ((mes * 100) + dia)
-        total = ASTNode('+', children=[mul_year, add_month_day], dtype='DateConverted')
+        total = ASTNode('+', children=[mul_year, add_month_day], dtype='DateConverted', lineno=lineno)
         p[0] = total
     except Exception as e:
         # On failure, fall back to a ConvDate node so later stages can
         # implement runtime conversion or raise an error.
         print('Warning: convDate -> building arithmetic AST failed:', e)
-        node = ASTNode('ConvDate', value=raw, dtype='DateConverted')
+        node = ASTNode('ConvDate', value=raw, dtype='DateConverted', lineno=lineno)
         p[0] = node
 
 
 def p_expresion_menos(p):
     'expresion : expresion MENOS termino'
-    print('expresion - termino -> expresion')
+    if p.parser.trace.on:
+        p.parser.trace.production('expresion - termino -> expresion')
     try:
         lineno = p.lineno(2)
     except Exception:
         lineno = 0
     t = combine_numeric(getattr(p[1], 'dtype', None), getattr(p[3], 'dtype', None), lineno, '-')
-    node = ASTNode('-', children=[p[1], p[3]], dtype=t)
+    node = ASTNode('-', children=[p[1], p[3]], dtype=t, lineno=lineno)
     p[0] = node
     
     
 def p_expresion_mas(p):
     'expresion : expresion MAS termino'
-    print('expresion + termino -> expresion')
+    if p.parser.trace.on:
+        p.parser.trace.production('expresion + termino -> expresion')
     try:
         lineno = p.lineno(2)
     except Exception:
         lineno = 0
     t = combine_numeric(getattr(p[1], 'dtype', None), getattr(p[3], 'dtype', None), lineno, '+')
-    node = ASTNode('+', children=[p[1], p[3]], dtype=t)
+    node = ASTNode('+', children=[p[1], p[3]], dtype=t, lineno=lineno)
     p[0] = node
 
 
 def p_expresion_termino(p):
     'expresion : termino'
-    print('termino -> expresion')
+    if p.parser.trace.on:
+        p.parser.trace.production('termino -> expresion')
     p[0] = p[1]
 
 
 def p_termino_multiplicacion(p):
     'termino : termino MULTIPLICACION elemento'
-    print('termino * elemento -> termino')
+    if p.parser.trace.on:
+        p.parser.trace.production('termino * elemento -> termino')
     try:
         lineno = p.lineno(2)
     except Exception:
         lineno = 0
     t = combine_numeric(getattr(p[1], 'dtype', None), getattr(p[3], 'dtype', None), lineno, '*')
-    node = ASTNode('*', children=[p[1], p[3]], dtype=t)
+    node = ASTNode('*', children=[p[1], p[3]], dtype=t, lineno=lineno)
     p[0] = node
 
 
 def p_termino_division(p):
     'termino : termino DIVISION elemento'
-    print('termino / elemento -> termino')
+    if p.parser.trace.on:
+        p.parser.trace.production('termino / elemento -> termino')
     try:
         lineno = p.lineno(2)
     except Exception:
         lineno = 0
     t = combine_numeric(getattr(p[1], 'dtype', None), getattr(p[3], 'dtype', None), lineno, '/')
     t = 'Float' if t in ('Int', 'Float') else t
-    node = ASTNode('/', children=[p[1], p[3]], dtype=t)
+    node = ASTNode('/', children=[p[1], p[3]], dtype=t, lineno=lineno)
     p[0] = node
 
 
 def p_termino_elemento(p):
     'termino : elemento'
-    print('elemento -> termino')
+    if p.parser.trace.on:
+        p.parser.trace.production('elemento -> termino')
     p[0] = p[1]
 
 
 def p_elemento_expresion(p):
     'elemento : A_PARENTESIS expresion C_PARENTESIS'
-    print('( expresion ) -> elemento')
+    if p.parser.trace.on:
+        p.parser.trace.production('( expresion ) -> elemento')
     p[0] = p[2]
 
 
@@ -588,7 +576,8 @@ def p_elemento(p):
                 | N_FLOAT
                 | CADENA
     '''
-    print(f'{p.slice[1].type} -> elemento') 
+    if p.parser.trace.on:
+        p.parser.trace.production(f'{p.slice[1].type} -> elemento')
     tok = p.slice[1].type
     try:
         lineno = p.lineno(1)
@@ -596,31 +585,36 @@ def p_elemento(p):
         lineno = 0
     if tok == 'VARIABLE':
         vname = p[1]
-        vtype = SEM.ensure_declared(vname, lineno)
-        node = ASTNode(vname, dtype=vtype)
+        vtype = p.parser.sem.ensure_declared(vname, lineno)
+        node = ASTNode(vname, dtype=vtype, lineno=lineno)
     elif tok == 'N_ENTERO':
-        node = ASTNode(str(p[1]), dtype='Int')
+        node = ASTNode(str(p[1]), dtype='Int', lineno=lineno)
     elif tok == 'N_FLOAT':
-        node = ASTNode(str(p[1]), dtype='Float')
+        node = ASTNode(str(p[1]), dtype='Float', lineno=lineno)
     elif tok == 'CADENA':
-        node = ASTNode(str(p[1]), dtype='String')
+        node = ASTNode(str(p[1]), dtype='String', lineno=lineno)
     p[0] = node
     
     
 def p_lista_variables(p):
-    '''lista_variables : VARIABLE SEPARADOR_VARIABLES lista_variables
+    '''lista_variables : lista_variables SEPARADOR_VARIABLES VARIABLE
                        | VARIABLE
     '''
+    # Left-recursive: a single VARIABLE stays a plain name, longer lists
+    # are built by appending in place
     if len(p) == 4:
-        # p[3] may be list
-        if isinstance(p[3], list):
-            p[0] = [p[1]] + p[3]
+        # p[1] may be a single name or the list so far
+        if isinstance(p[1], list):
+            p[1].append(p[3])
+            p[0] = p[1]
         else:
             p[0] = [p[1], p[3]]
-        print(f'VARIABLE , lista_variables -> lista_variables')
+        if p.parser.trace.on:
+            p.parser.trace.production('lista_variables , VARIABLE -> lista_variables')
     else:
         p[0] = p[1]
-        print(f'VARIABLE -> lista_variables')
+        if p.parser.trace.on:
+            p.parser.trace.production('VARIABLE -> lista_variables')
     
 
 def p_tipo_dato(p):
@@ -630,7 +624,8 @@ def p_tipo_dato(p):
                 | DATE_CONVERTED
                 | BOOLEAN
     '''
-    print(f'{p.slice[1].type} -> tipo_dato')
+    if p.parser.trace.on:
+        p.parser.trace.production(f'{p.slice[1].type} -> tipo_dato')
     # return a simple string representing type
     if p.slice[1].type == 'FLOAT':
         p[0] = 'Float'
@@ -649,41 +644,94 @@ def p_error(p):
     raise Exception(f"Error en la linea {p.lineno or ''} at {p.value or ''}")
 
 
-def ejecutar_parser(code):
-    # Build the parser
-    parser = yacc.yacc()
-
-    # Ensure lexer line numbers reset and parse using the lexer object so
-    # tokens come from the lexical analyzer implementation in lexer.py
-    try:
-        lexing.lineno = 1
-        print('Resetting lexer line number to 1')
-    except Exception:
-        print('Warning: lexer has no lineno attribute to reset')
-        pass
-    
-    # Load symbols from lexer-generated table before parsing (semantic checks)
+def new_parser(ctx=DEFAULT_CONTEXT, cache_dir=None, debug=False):
+    # Return a parser bound to the compilation context `ctx`. The LALR
+    # tables are built (or loaded from the cache) once per process and
+    # shared; each call gets its own shallow copy because PLY keeps the
+    # parse stacks on the parser object, so copies can run concurrently.
+    parser = copy.copy(build_parser(sys.modules[__name__], cache_dir=cache_dir, debug=debug))
+    parser.ctx = ctx
+    parser.sem = ctx.sem
+    parser.trace = ctx.trace
+    if ctx.trace.verbose:
+        ctx.trace.info(cache_report())
+    return parser
+
+
+def exportar_dot(ast, dot_path, render_png=True, trace=TRACE, fmt='png', wait=False, exporter=None):
+    # Write DOT representation of the AST. `exporter` replaces the full
+    # ASTDotExporter (e.g. ast_exporter.SummaryDotExporter). Its selection
+    # is made before dot_path is opened, and a failed selection (e.g. no
+    # statement in the --dot-lines range) raises instead of leaving an
+    # empty file behind.
+    exporter = exporter or ASTDotExporter()
+    tree = exporter.select(ast)
     try:
-        SEM.load_from_table(Path('./resources/tabla_simbolos.txt'))
+        dot_path = Path(dot_path)
+        with dot_path.open('w', encoding='utf-8') as fh:
+            exporter.write_dot(tree, fh)
+        if trace.verbose:
+            trace.info(f'Wrote AST DOT to {dot_path.resolve()}')
+        if render_png:
+            renderizar_png(dot_path, trace, fmt, wait)
     except Exception as e:
-        print('Warning: no se pudo cargar tabla de símbolos:', e)
+        print('Error while writing DOT/PNG:', e)
 
-    # Ensure we provide the same lexer instance to the parser so tokens
-    # come from `lexer.py`. PLY will call lexing.input(code) internally.
-    ast = parser.parse(code, lexer=lexing)
 
-    # Write DOT representation of the AST
-    try:
-        dot_path = Path('./intermediate-code.dot')
-        dot_text = ASTDotExporter().to_dot(ast)
-        dot_path.write_text(dot_text, encoding='utf-8')
-        print(f'Wrote AST DOT to {dot_path.resolve()}')
-
-        # If dot (Graphviz) is available, try to create a PNG
-        if shutil.which('dot'):
-            png_path = Path('./intermediate-code.png')
-            subprocess.run([shutil.which('dot'), '-Tpng', str(dot_path), '-o', str(png_path)])
-            if png_path.exists():
-                print(f'Wrote AST PNG to {png_path.resolve()}')
-    except Exception as e:
-        print('Error while writing DOT/PNG:', e)
+def renderizar_png(dot_path, trace=TRACE, fmt='png', wait=False):
+    # If dot (Graphviz) is available, render the DOT to `fmt` (png or svg)
+    # next to it in the background (see render_queue). Returns the Future
+    # of the render, or its result dict with `wait`; None without Graphviz.
+    future = RENDERS.submit(dot_path, fmt, trace)
+    if wait and future is not None:
+        return future.result()
+    return future
+
+
+def ejecutar_parser(code=None, symbols=None, tokens=None, cache_dir=None, debug=False,
+                    dot_path='./intermediate-code.dot', render_png=True, profiler=NULL_PROFILER,
+                    render_format='png', wait_render=False, dot_exporter=None):
+    # Parse using the process-wide context (SEM, helpers' temp counter and
+    # TRACE). Use compiler.compile_source for isolated compilations.
+    # `profiler` (see profiler.Profiler) times each phase and counts tokens,
+    # reductions, declaration lookups and AST nodes. The render runs in the
+    # background unless `wait_render`. `dot_exporter` replaces the full DOT
+    # export (summarized or selected subtrees, see ast_exporter).
+    with profiler.phase('tablas LALR'):
+        parser = new_parser(DEFAULT_CONTEXT, cache_dir=cache_dir, debug=debug)
+    profiler.instrument_parser(parser)
+    profiler.instrument_sem(parser.sem)
+
+    # Tokens come from a single-pass TokenStream over the lexer in lexer.py.
+    # Callers that also need the tokens (symbol table, dump) pass their own
+    # stream with taps attached so the source is only tokenized once.
+    if tokens is None:
+        tokens = token_stream(code)
+    profiler.instrument_tokens(tokens)
+
+    # Without an in-memory table, fall back to the text table written by a
+    # previous run (semantic checks)
+    if symbols is None:
+        try:
+            SEM.load_from_table(Path('./resources/tabla_simbolos.txt'))
+        except Exception as e:
+            print('Warning: no se pudo cargar tabla de símbolos:', e)
+
+    with profiler.phase('lex + parse'), profiler.count_nodes():
+        ast = parser.parse(lexer=tokens)
+
+    # The symbol table handed over by the caller is filled while tokens
+    # flow through the stream, so it is complete once parsing finishes.
+    if symbols is not None:
+        with profiler.phase('carga de símbolos'):
+            SEM.load_from_symbols(symbols)
+
+    with profiler.phase('exportación DOT'):
+        exportar_dot(ast, dot_path, render_png=False, exporter=dot_exporter)
+    if render_png:
+        with profiler.phase(f'render {render_format.upper()}'):
+            try:
+                renderizar_png(dot_path, fmt=render_format, wait=wait_render)
+            except Exception as e:
+                print('Error while writing DOT/PNG:', e)
+    return ast
@@ -0,0 +1,97 @@
+"""Persistent cache for the LALR tables built by PLY.
+
+`yacc.yacc()` inspects every `p_*` docstring and rebuilds the LALR
+automaton each time it is called. build_parser(module) hashes the grammar
+(productions, `precedence`, `tokens` and `start`) and keeps the resulting
+tables as a pickle named after that hash inside a cache directory, so the
+tables are only rebuilt when the grammar actually changes.
+"""
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+import ply.yacc as yacc
+
+# Default location of the table cache; can be overridden with the
+# LYC_CACHE_DIR environment variable or the `cache_dir` argument.
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent / '.lyc_cache'
+
+# Hit/miss counters (dict for mutability, same as helpers._temp_counter)
+CACHE_STATS = {'hits': 0, 'misses': 0}
+
+# Parsers already built in this process, keyed by grammar hash
+_built = {}
+_lock = threading.Lock()
+
+
+def resolve_cache_dir(cache_dir=None) -> Path:
+    # Explicit argument wins, then the environment, then the default
+    if cache_dir is not None:
+        return Path(cache_dir)
+    env = os.environ.get('LYC_CACHE_DIR')
+    if env:
+        return Path(env)
+    return DEFAULT_CACHE_DIR
+
+
+def grammar_hash(module: Any) -> str:
+    # Hash everything that shapes the LALR automaton. Production functions
+    # are visited in name order so the hash does not depend on dict order.
+    h = hashlib.sha256()
+    h.update(repr(getattr(module, 'start', None)).encode('utf-8'))
+    h.update(repr(getattr(module, 'precedence', None)).encode('utf-8'))
+    h.update(repr(sorted(getattr(module, 'tokens', []))).encode('utf-8'))
+    for name in sorted(dir(module)):
+        if not name.startswith('p_') or name == 'p_error':
+            continue
+        func = getattr(module, name)
+        if callable(func) and func.__doc__:
+            h.update(name.encode('utf-8'))
+            h.update(' '.join(func.__doc__.split()).encode('utf-8'))
+    return h.hexdigest()
+
+
+def build_parser(module: Any, cache_dir=None, debug: bool = False):
+    # Return a PLY parser for the grammar defined in `module`, loading the
+    # LALR tables from the cache when the grammar hash matches and building
+    # (and storing) them otherwise. `parser.out` is only written when
+    # `debug` is true, next to the cached tables.
+    key = grammar_hash(module)
+    with _lock:
+        if key in _built and not debug:
+            CACHE_STATS['hits'] += 1
+            return _built[key]
+        parser = _load_or_build(module, key, cache_dir, debug)
+        _built[key] = parser
+        return parser
+
+
+def _load_or_build(module: Any, key: str, cache_dir, debug: bool):
+    cache = resolve_cache_dir(cache_dir)
+    cache.mkdir(parents=True, exist_ok=True)
+    table_path = cache / f'parsetab-{key[:16]}.pickle'
+
+    if table_path.exists():
+        CACHE_STATS['hits'] += 1
+    else:
+        CACHE_STATS['misses'] += 1
+        # Grammar changed (or first run): drop tables of older grammars
+        for stale in cache.glob('parsetab-*.pickle'):
+            try:
+                stale.unlink()
+            except OSError:
+                pass
+
+    parser = yacc.yacc(
+        module=module,
+        picklefile=str(table_path),
+        debug=debug,
+        outputdir=str(cache),
+    )
+    return parser
+
+
+def cache_report() -> str:
+    return f"LALR table cache: {CACHE_STATS['hits']} hit(s), {CACHE_STATS['misses']} miss(es)"
@@ -0,0 +1,212 @@
+"""Peephole optimizer for the TASM instruction list of asm_generator.
+
+The optimizer makes one sweep over the (op, args) list, appending every
+instruction to an output list and then trying the RULES on the tail of
+that output. When a rule fires, its replacement takes the place of the
+tail and the rules are tried again, so rewrites that enable each other are
+applied in the same sweep. Every rule shrinks the program, so a sweep is
+linear in its length. Deleting a jump can leave an earlier label without
+references; the label is dropped by the next sweep, and sweeps repeat
+until one fires no rule (in practice two or three sweeps).
+
+    store-load        mov X, r / mov r, X         -> mov X, r
+    load-store        mov r, X / mov X, r         -> mov r, X
+    self-move         mov r, r                    -> (nothing)
+    fstp-fld          fstp X / fld X              -> fst X, or nothing if X
+                                                     is a temporary not read again
+    fistp-fild        fistp T / fild T, T unread  -> (nothing)
+    jump-next         Jxx L / [labels] / L:       -> [labels] / L:
+    jump-over-jump    Jcc L1 / JMP L2 / L1:       -> Jncc L2 / L1:
+    unreachable       JMP L / instruction         -> JMP L
+    dead-label        L: with no jump to it       -> (nothing)
+"""
+from typing import Dict, List, Optional, Tuple
+
+from asm_generator import LABEL
+
+NEGATE = {
+    'JE': 'JNE', 'JNE': 'JE',
+    'JL': 'JGE', 'JGE': 'JL', 'JLE': 'JG', 'JG': 'JLE',
+    'JB': 'JAE', 'JAE': 'JB', 'JBE': 'JA', 'JA': 'JBE',
+}
+JUMPS = frozenset(NEGATE) | {'JMP'}
+
+REGISTERS = frozenset(('eax', 'ebx', 'ecx', 'edx', 'esi', 'edi', 'ax', 'bx', 'cx', 'dx', 'si', 'di'))
+
+Instruction = Tuple[str, tuple]
+
+
+def memory_name(arg: str) -> str:
+    return arg.replace('dword ptr ', '').replace('word ptr ', '')
+
+
+def is_scratch(name: str) -> bool:
+    # Temporaries and spill slots of the generator: nobody else reads them
+    return name.startswith('__t') or name.startswith('__spill')
+
+
+class Sweep:
+    # State shared by the rules during one sweep
+    def __init__(self, code: List[Instruction]):
+        self.refs = {}   # label -> jumps to it
+        self.reads = {}  # memory operand -> instructions that mention it
+        for op, args in code:
+            if op in JUMPS:
+                self.refs[args[0]] = self.refs.get(args[0], 0) + 1
+            elif op != LABEL:
+                for a in args:
+                    name = memory_name(a)
+                    self.reads[name] = self.reads.get(name, 0) + 1
+
+    def drop_jump(self, ins: Instruction) -> None:
+        self.refs[ins[1][0]] -= 1
+
+
+# Every rule looks at the tail of `out` and returns (k, replacement) to
+# replace the last k entries, or None
+
+def store_load(out, sweep):
+    if len(out) < 2:
+        return None
+    (op1, a1), (op2, a2) = out[-2], out[-1]
+    if op1 == op2 == 'mov' and a1[1] in REGISTERS and a2[0] == a1[1] and memory_name(a2[1]) == memory_name(a1[0]):
+        return 2, [out[-2]]
+    return None
+
+
+def load_store(out, sweep):
+    if len(out) < 2:
+        return None
+    (op1, a1), (op2, a2) = out[-2], out[-1]
+    if op1 == op2 == 'mov' and a1[0] in REGISTERS and a2[1] == a1[0] and memory_name(a2[0]) == memory_name(a1[1]):
+        return 2, [out[-2]]
+    return None
+
+
+def self_move(out, sweep):
+    op, args = out[-1]
+    if op == 'mov' and args[0] == args[1]:
+        return 1, []
+    return None
+
+
+def fstp_fld(out, sweep):
+    if len(out) < 2:
+        return None
+    (op1, a1), (op2, a2) = out[-2], out[-1]
+    if op1 == 'fstp' and op2 == 'fld' and a1[0] == a2[0] and a1[0] not in ('st', 'st(0)'):
+        if is_scratch(a1[0]) and sweep.reads.get(a1[0], 0) <= 2:
+            # only this pair touches X: the value just stays on the stack
+            return 2, []
+        return 2, [('fst', a1)]
+    return None
+
+
+def fistp_fild(out, sweep):
+    # A temporary stored as an integer and reloaded at once; Int values are
+    # integral on the stack, so skipping the round trip keeps the value
+    if len(out) < 2:
+        return None
+    (op1, a1), (op2, a2) = out[-2], out[-1]
+    if op1 == 'fistp' and op2 == 'fild' and a1[0] == a2[0] and is_scratch(a1[0]) \
+            and sweep.reads.get(a1[0], 0) <= 2:
+        return 2, []
+    return None
+
+
+def jump_next(out, sweep):
+    op, args = out[-1]
+    if op != LABEL:
+        return None
+    target = args[0]
+    j = len(out) - 2
+    while j >= 0 and out[j][0] == LABEL:
+        j -= 1
+    if j >= 0 and out[j][0] in JUMPS and out[j][1][0] == target:
+        sweep.drop_jump(out[j])
+        return len(out) - j, out[j + 1:]
+    return None
+
+
+def jump_over_jump(out, sweep):
+    if len(out) < 3:
+        return None
+    (op1, a1), (op2, a2), (op3, a3) = out[-3], out[-2], out[-1]
+    if op3 == LABEL and op2 == 'JMP' and op1 in NEGATE and a1[0] == a3[0]:
+        sweep.drop_jump(out[-3])
+        return 3, [(NEGATE[op1], a2), out[-1]]
+    return None
+
+
+def unreachable(out, sweep):
+    if len(out) < 2:
+        return None
+    op, _args = out[-1]
+    if op != LABEL and out[-2][0] == 'JMP':
+        if op in JUMPS:
+            sweep.drop_jump(out[-1])
+        return 1, []
+    return None
+
+
+def dead_label(out, sweep):
+    op, args = out[-1]
+    if op == LABEL and not sweep.refs.get(args[0]):
+        return 1, []
+    return None
+
+
+RULES = (
+    ('dead-label', dead_label),
+    ('jump-next', jump_next),
+    ('jump-over-jump', jump_over_jump),
+    ('unreachable', unreachable),
+    ('self-move', self_move),
+    ('store-load', store_load),
+    ('load-store', load_store),
+    ('fstp-fld', fstp_fld),
+    ('fistp-fild', fistp_fild),
+)
+
+
+class PeepholeOptimizer:
+    def __init__(self, rules=RULES, max_sweeps: int = 10):
+        self.rules = rules
+        self.max_sweeps = max_sweeps
+        # rule name -> times it fired over all sweeps
+        self.fired: Dict[str, int] = {name: 0 for name, _ in rules}
+        self.sweeps = 0
+
+    def sweep(self, code: List[Instruction]) -> Tuple[List[Instruction], int]:
+        state = Sweep(code)
+        out = []
+        fired = 0
+        for ins in code:
+            out.append(ins)
+            while out:
+                for name, rule in self.rules:
+                    result: Optional[tuple] = rule(out, state)
+                    if result is not None:
+                        k, replacement = result
+                        out[len(out) - k:] = replacement
+                        self.fired[name] += 1
+                        fired += 1
+                        break
+                else:
+                    break
+        return out, fired
+
+    def run(self, code: List[Instruction]) -> List[Instruction]:
+        for _ in range(self.max_sweeps):
+            self.sweeps += 1
+            code, fired = self.sweep(code)
+            if not fired:
+                break
+        return code
+
+    def report(self) -> str:
+        lines = [f"{'regla':<20}{'veces':>8}"]
+        for name, _ in self.rules:
+            lines.append(f'{name:<20}{self.fired[name]:>8}')
+        lines.append(f"{'(barridos)':<20}{self.sweeps:>8}")
+        return '\n'.join(lines)
@@ -0,0 +1,189 @@
+"""Per-phase profiler of a compilation (`lyc-compiler.py --profile`).
+
+Profiler.phase(name) is a context manager that records the wall time
+(perf_counter), the CPU time (process_time) and, with `memory`, the memory
+a phase leaves allocated and its allocation peak (tracemalloc; tracing
+slows Python code down, so wall times with memory are inflated). Phases
+are listed in the order they ran.
+
+Hot paths are counted by instrumenting the objects of one compilation
+rather than the modules, so nothing is paid when profiling is off:
+
+    tokens           every token handed to the parser (lexing time too)
+    reductions       per production, through wrapped copies of the
+                     parser's productions (the shared tables are untouched)
+    ensure_declared  lookups of the semantic context
+    AST nodes        ASTNode constructions while count_nodes() is active
+
+NULL_PROFILER has the same interface and records nothing.
+"""
+import copy
+import json
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Optional, TextIO
+
+from ast_node import ASTNode
+
+
+class Profiler:
+    def __init__(self, memory: bool = True):
+        self.memory = memory
+        # {'phase', 'wall', 'cpu', 'allocated', 'peak'} per phase
+        self.phases = []
+        self.counters = Counter()
+        self.reductions = Counter()
+        self.lex_wall = 0.0
+        self.lex_cpu = 0.0
+        self.started_tracing = False
+
+    def start(self) -> None:
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+
+    def stop(self) -> None:
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    @contextmanager
+    def phase(self, name: str):
+        tracing = self.memory and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            record = {'phase': name, 'wall': time.perf_counter() - wall, 'cpu': time.process_time() - cpu,
+                      'allocated': None, 'peak': None}
+            if tracing:
+                current, peak = tracemalloc.get_traced_memory()
+                record['allocated'] = current - before
+                record['peak'] = peak - before
+            self.phases.append(record)
+
+    def instrument_parser(self, parser) -> None:
+        # Count reductions of `parser` (a copy from parser.new_parser) per
+        # production by giving it wrapped copies of its productions
+        reductions = self.reductions
+        productions = []
+        for prod in parser.productions:
+            prod = copy.copy(prod)
+            if prod.callable is not None:
+                prod.callable = _counted(prod.callable, prod.str, reductions)
+            productions.append(prod)
+        parser.productions = productions
+
+    def instrument_sem(self, sem) -> None:
+        # Count SemanticContext.ensure_declared lookups of this context
+        counters = self.counters
+        lookup = sem.ensure_declared
+
+        def ensure_declared(name, lineno):
+            counters['ensure_declared'] += 1
+            return lookup(name, lineno)
+        sem.ensure_declared = ensure_declared
+
+    def instrument_tokens(self, stream) -> None:
+        # Count the tokens of a TokenStream and time its lexer
+        lexer = stream.lexer
+        next_token = lexer.token
+        perf, process = time.perf_counter, time.process_time
+        profiler = self
+
+        class TimedLexer:
+            lineno = property(lambda _: lexer.lineno)
+
+            def token(self):
+                wall, cpu = perf(), process()
+                tok = next_token()
+                profiler.lex_wall += perf() - wall
+                profiler.lex_cpu += process() - cpu
+                if tok is not None:
+                    profiler.counters['tokens'] += 1
+                return tok
+        stream.lexer = TimedLexer()
+
+    @contextmanager
+    def count_nodes(self):
+        # Count ASTNode constructions until the block ends
+        counters = self.counters
+        init = ASTNode.__init__
+
+        def counted_init(node, *args, **kwargs):
+            counters['nodos AST'] += 1
+            init(node, *args, **kwargs)
+        ASTNode.__init__ = counted_init
+        try:
+            yield
+        finally:
+            ASTNode.__init__ = init
+
+    def to_dict(self) -> dict:
+        return {
+            'phases': self.phases,
+            'lexer': {'wall': self.lex_wall, 'cpu': self.lex_cpu},
+            'counters': dict(self.counters, reducciones=sum(self.reductions.values())),
+            'reductions': dict(self.reductions.most_common()),
+        }
+
+    def write_json(self, path) -> None:
+        with open(path, 'w', encoding='utf-8') as fh:
+            json.dump(self.to_dict(), fh, indent=2, ensure_ascii=False)
+
+    def report(self, top: int = 10) -> str:
+        header = f"{'fase':<26}{'pared ms':>10}{'cpu ms':>10}{'asignado KiB':>14}{'pico KiB':>10}"
+        lines = ['Perfil de la compilación', header, '-' * len(header)]
+        for p in self.phases:
+            allocated = f"{p['allocated'] / 1024:>14.1f}" if p['allocated'] is not None else f"{'-':>14}"
+            peak = f"{p['peak'] / 1024:>10.1f}" if p['peak'] is not None else f"{'-':>10}"
+            lines.append(f"{p['phase']:<26}{p['wall'] * 1000:>10.2f}{p['cpu'] * 1000:>10.2f}{allocated}{peak}")
+            if p['phase'] == 'lex + parse' and self.counters['tokens']:
+                lines.append(f"{'  de ello, lexer':<26}{self.lex_wall * 1000:>10.2f}{self.lex_cpu * 1000:>10.2f}")
+        total_wall = sum(p['wall'] for p in self.phases)
+        total_cpu = sum(p['cpu'] for p in self.phases)
+        lines.append(f"{'total':<26}{total_wall * 1000:>10.2f}{total_cpu * 1000:>10.2f}")
+        lines.append('')
+        counters = self.to_dict()['counters']
+        lines.append('Contadores: ' + ', '.join(f'{name} {value}' for name, value in sorted(counters.items())))
+        if self.reductions:
+            lines.append(f'Producciones más reducidas (de {len(self.reductions)}):')
+            for prod, n in self.reductions.most_common(top):
+                lines.append(f'  {n:>8}  {prod}')
+        return '\n'.join(lines)
+
+    def dump(self, out: Optional[TextIO] = None) -> None:
+        print(self.report(), file=out)
+
+
+def _counted(func, name, reductions):
+    def reduce(p):
+        reductions[name] += 1
+        return func(p)
+    return reduce
+
+
+class NullProfiler:
+    # Profiler interface that records nothing
+    def phase(self, name: str):
+        return nullcontext()
+
+    def count_nodes(self):
+        return nullcontext()
+
+    def instrument_parser(self, parser) -> None:
+        pass
+
+    def instrument_sem(self, sem) -> None:
+        pass
+
+    def instrument_tokens(self, stream) -> None:
+        pass
+
+
+NULL_PROFILER = NullProfiler()
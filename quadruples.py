@@ -0,0 +1,288 @@
+"""Quadruple (three-address) intermediate code.
+
+QuadrupleGenerator lowers the typed AST built by the parser into a
+Quadruples program in a single pass. Conditions are lowered with
+backpatching: each condition returns the list of branch quadruples still
+waiting for a target, and the target is filled in once it is known. The
+branches use the mnemonics of helpers.diccionarioComparadores:
+
+    CMP a, b      compare two operands
+    BLT/BLE/...   branch to the quadruple index stored in `res`
+    BI            unconditional branch
+    PARAM a       push one value of an equalExpressions list
+    ANYEQ n, res  res := true if two of the last n PARAM values are equal
+
+Quadruples are stored array-backed: every operand is interned in a pool
+and a quadruple is four ints in one array('i'), so a program costs 16 bytes
+per quadruple plus one pool entry per distinct operand.
+"""
+from array import array
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+from helpers import diccionarioComparadores, diccionarioComparadoresNot, new_temp
+
+BRANCHES = frozenset(diccionarioComparadores.values()) | {'BI'}
+ARITHMETIC = ('+', '-', '*', '/')
+COMPARATORS = frozenset(diccionarioComparadores)
+
+# Value of an empty slot in the code array
+NONE = -1
+
+
+class Quadruples:
+    def __init__(self):
+        # code: 4 ints per quadruple (op, arg1, arg2, res). Operands are pool
+        # indexes; for branches `res` is the target quadruple index instead.
+        self.code = array('i')
+        self.pool = []
+        self.pool_ids = {}
+        # operand -> dtype for temporaries, variables and constants
+        self.dtypes = {}
+        # operands that are literal constants (numbers, strings, booleans)
+        self.constants = set()
+
+    def intern(self, operand: Any) -> int:
+        if operand is None:
+            return NONE
+        idx = self.pool_ids.get(operand)
+        if idx is None:
+            idx = len(self.pool)
+            self.pool.append(operand)
+            self.pool_ids[operand] = idx
+        return idx
+
+    def emit(self, op: str, arg1=None, arg2=None, res=None) -> int:
+        # Append a quadruple and return its index
+        idx = len(self.code) // 4
+        res_slot = res if op in BRANCHES else self.intern(res)
+        if res_slot is None:
+            res_slot = NONE
+        self.code.extend((self.intern(op), self.intern(arg1), self.intern(arg2), res_slot))
+        return idx
+
+    def backpatch(self, indices: List[int], target: int) -> None:
+        # Point every branch in `indices` to quadruple `target`
+        code = self.code
+        for i in indices:
+            code[4 * i + 3] = target
+
+    def operand(self, slot: int):
+        return None if slot == NONE else self.pool[slot]
+
+    def quad(self, i: int) -> Tuple[str, Any, Any, Any]:
+        base = 4 * i
+        op = self.pool[self.code[base]]
+        res = self.code[base + 3]
+        if op not in BRANCHES:
+            res = self.operand(res)
+        return op, self.operand(self.code[base + 1]), self.operand(self.code[base + 2]), res
+
+    def set_quad(self, i: int, op: str, arg1=None, arg2=None, res=None) -> None:
+        base = 4 * i
+        res_slot = res if op in BRANCHES else self.intern(res)
+        self.code[base:base + 4] = array('i', (self.intern(op), self.intern(arg1), self.intern(arg2),
+                                                NONE if res_slot is None else res_slot))
+
+    @property
+    def next_index(self) -> int:
+        return len(self.code) // 4
+
+    def __len__(self) -> int:
+        return len(self.code) // 4
+
+    def __iter__(self) -> Iterator[Tuple[str, Any, Any, Any]]:
+        for i in range(len(self)):
+            yield self.quad(i)
+
+    def listing(self) -> str:
+        # Readable dump: one quadruple per line, branch targets as [n]
+        width = len(str(max(len(self) - 1, 0)))
+        lines = []
+        for i, (op, a1, a2, res) in enumerate(self):
+            if op in BRANCHES:
+                res = f'[{res}]'
+            fields = ', '.join('_' if v is None else str(v) for v in (op, a1, a2, res))
+            lines.append(f'[{i:>{width}}] ({fields})')
+        return '\n'.join(lines)
+
+
+class QuadrupleGenerator:
+    """Lower an AST into Quadruples.
+
+    `temp` creates temporaries (the compilation context's new_temp, so the
+    numbering continues after the temporaries created by the parser) and
+    `sem` is the SemanticContext used to tell variables from literals.
+    """
+    def __init__(self, temp: Optional[Callable[[], str]] = None, sem: Any = None):
+        self.temp = temp or new_temp
+        self.sem = sem
+        self.quads = Quadruples()
+
+    def generate(self, ast: Any) -> Quadruples:
+        self.quads = Quadruples()
+        self.statement(ast)
+        return self.quads
+
+    # -- operands -----------------------------------------------------------
+
+    def is_variable(self, name: str) -> bool:
+        if self.sem is None:
+            return not name[:1].isdigit() and name not in ('true', 'false')
+        entry = self.sem.symbols.get(name)
+        return bool(entry and entry.get('tipo')) and not name.startswith('_')
+
+    def leaf(self, node: Any) -> str:
+        name = node.nodetype
+        if node.dtype == 'String' and not self.is_variable(name):
+            # string literals are quoted so they never collide with names
+            name = f'"{name}"'
+        if node.dtype is not None:
+            self.quads.dtypes.setdefault(name, node.dtype)
+        if not self.is_variable(name):
+            self.quads.constants.add(name)
+        return name
+
+    def expression(self, node: Any) -> str:
+        # Emit the code of an expression and return the operand holding it.
+        # Postorder with an explicit stack (operands collected on `done`),
+        # so deeply nested expressions do not recurse.
+        q = self.quads
+        done = []
+        stack = [(node, False)]
+        while stack:
+            item, ready = stack.pop()
+            if not hasattr(item, 'nodetype'):
+                # temporaries created by the parser are plain names
+                done.append(item)
+            elif item.nodetype in ARITHMETIC and len(item.children) == 2:
+                if not ready:
+                    stack.append((item, True))
+                    stack.append((item.children[1], False))
+                    stack.append((item.children[0], False))
+                    continue
+                right = done.pop()
+                left = done.pop()
+                t = self.temp()
+                q.dtypes[t] = item.dtype
+                q.emit(item.nodetype, left, right, t)
+                done.append(t)
+            elif item.nodetype == 'ConvDate':
+                t = self.temp()
+                q.dtypes[t] = 'DateConverted'
+                q.emit('CONVDATE', item.value, None, t)
+                done.append(t)
+            else:
+                done.append(self.leaf(item))
+        return done[0]
+
+    # -- conditions ---------------------------------------------------------
+
+    def jumps(self, node: Any, when: bool) -> List[int]:
+        # Emit the code of condition `node`. Returns the branches taken when
+        # the condition evaluates to `when`; otherwise control falls through.
+        q = self.quads
+        op = node.nodetype
+        if op in COMPARATORS and len(node.children) == 2:
+            left = self.expression(node.children[0])
+            right = self.expression(node.children[1])
+            q.emit('CMP', left, right)
+            # diccionarioComparadores branches when the comparison is false
+            branch_op = op if not when else diccionarioComparadoresNot[op]
+            return [q.emit(diccionarioComparadores[branch_op])]
+        if op in ('and', 'or'):
+            left, right = node.children
+            if (op == 'and') != when:
+                # and -> false: either side false; or -> true: either side true
+                return self.jumps(left, when) + self.jumps(right, when)
+            # and -> true / or -> false: the left side short-circuits past
+            # the right one
+            skip = self.jumps(left, not when)
+            taken = self.jumps(right, when)
+            q.backpatch(skip, q.next_index)
+            return taken
+        if op == 'CondNot':
+            return self.jumps(node.children[0], not when)
+        # Any other boolean value: compare against true
+        value = self.expression(node)
+        q.constants.add('true')
+        q.emit('CMP', value, 'true')
+        return [q.emit(diccionarioComparadores['<>' if when else '=='])]
+
+    # -- statements ---------------------------------------------------------
+
+    def statement(self, node: Any) -> None:
+        # Work list of statements still to lower and of callables that
+        # close a block (branches, backpatching) once its body is emitted,
+        # so deeply nested blocks do not recurse
+        work = [node]
+        while work:
+            item = work.pop()
+            if callable(item):
+                item()
+            else:
+                work.extend(reversed(self.statement_step(item)))
+
+    def statement_step(self, node: Any) -> list:
+        # Emit the code of `node` up to its first nested statement. Returns
+        # what follows, in order: nested statements and closing callables.
+        if isinstance(node, list):
+            return node
+        q = self.quads
+        kind = node.nodetype
+        if kind in ('Program', 'Block'):
+            return list(node.children)
+        if kind == ':=':
+            target, rhs = node.children
+            if getattr(rhs, 'nodetype', None) == 'EqualExpressions':
+                # N PARAMs and one ANYEQ: linear in the number of arguments
+                for e in rhs.children:
+                    q.emit('PARAM', self.expression(e))
+                q.dtypes.setdefault(target, 'Bool')
+                q.emit('ANYEQ', len(rhs.children), None, target)
+                return []
+            src = self.expression(rhs)
+            dtype = node.dtype or getattr(rhs, 'dtype', None) or q.dtypes.get(src)
+            if dtype is not None:
+                q.dtypes.setdefault(target, dtype)
+            q.emit(':=', src, None, target)
+        elif kind == 'WRITE':
+            text = f'"{node.children[1]}"'
+            q.dtypes.setdefault(text, 'String')
+            q.constants.add(text)
+            q.emit('WRITE', text)
+        elif kind == 'READ':
+            q.emit('READ', None, None, node.children[1])
+        elif kind == 'IF':
+            cond, rest = node.children[0], node.children[1:]
+            false_jumps = self.jumps(cond, False)
+            if len(rest) == 1 and getattr(rest[0], 'nodetype', None) == 'Body':
+                then_node, else_node = rest[0].children
+                end_jump = []
+
+                def to_else():
+                    end_jump.append(q.emit('BI'))
+                    q.backpatch(false_jumps, q.next_index)
+
+                return [then_node, to_else, else_node, lambda: q.backpatch(end_jump, q.next_index)]
+            return list(rest) + [lambda: q.backpatch(false_jumps, q.next_index)]
+        elif kind == 'While':
+            cond, body = node.children
+            start = q.next_index
+            false_jumps = self.jumps(cond, False)
+
+            def loop():
+                q.emit('BI', res=start)
+                q.backpatch(false_jumps, q.next_index)
+
+            return [body, loop]
+        else:
+            raise Exception(f"Error de generación de código (línea {node.lineno}): sentencia desconocida '{kind}'")
+        return []
+
+
+def generar_cuadruplas(ast: Any, ctx: Any = None) -> Quadruples:
+    # Convenience wrapper: lower `ast` using the temporaries and symbols of
+    # the compilation context `ctx` (process-wide defaults when omitted)
+    if ctx is None:
+        return QuadrupleGenerator().generate(ast)
+    return QuadrupleGenerator(ctx.new_temp, ctx.sem).generate(ast)
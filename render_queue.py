@@ -0,0 +1,121 @@
+"""Background Graphviz rendering of DOT files.
+
+RenderQueue.submit(dot_path) reads the DOT text, hashes it and hands the
+rendering to a thread pool (`dot` runs as a subprocess, so threads do not
+contend for the GIL), returning a Future at once: the compilation goes on
+while Graphviz works. The text is passed to `dot` on stdin, so a DOT file
+rewritten by a later compilation does not affect a pending render.
+
+A render is skipped when the output (`<dot>.png` or `<dot>.svg`) exists and
+was rendered from a DOT with the same hash. The hash of the last render of
+each output is stored in `<cache dir>/renders` (see
+parser_cache.resolve_cache_dir), so output directories only hold the
+images.
+
+The queue is bounded: submit() blocks while `max_pending` renders are
+queued or running, so a batch run cannot pile up thousands of DOT texts.
+wait() blocks until every submitted render is done. RENDERS is the
+process-wide queue used by parser.renderizar_png; its pending renders are
+finished before the interpreter exits.
+"""
+import hashlib
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+from parser_cache import resolve_cache_dir
+from trace_sink import TRACE
+
+FORMATS = ('png', 'svg')
+
+
+class RenderQueue:
+    def __init__(self, workers: int = 2, max_pending: int = 8, cache_dir=None):
+        self.workers = workers
+        self.cache_dir = cache_dir
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.pool = None
+        self.futures = []
+        self.lock = threading.Lock()
+        # Counters of this queue (dict for mutability, as CACHE_STATS)
+        self.stats = {'rendered': 0, 'skipped': 0, 'errors': 0}
+
+    def stamp_path(self, output: Path) -> Path:
+        key = hashlib.sha256(str(output.resolve()).encode('utf-8')).hexdigest()
+        return resolve_cache_dir(self.cache_dir) / 'renders' / f'{key}.sha256'
+
+    def submit(self, dot_path, fmt: str = 'png', trace=TRACE) -> Optional[Future]:
+        # Queue the render of `dot_path`; None when Graphviz is not installed
+        if fmt not in FORMATS:
+            raise Exception(f"Formato de render desconocido '{fmt}' (opciones: {', '.join(FORMATS)})")
+        dot = shutil.which('dot')
+        if dot is None:
+            return None
+        dot_path = Path(dot_path)
+        source = dot_path.read_bytes()
+        self.slots.acquire()
+        with self.lock:
+            if self.pool is None:
+                self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='render')
+            future = self.pool.submit(self.render, dot, source, dot_path.with_suffix(f'.{fmt}'), fmt, trace)
+            self.futures.append(future)
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def render(self, dot: str, source: bytes, output: Path, fmt: str, trace) -> dict:
+        # Run `dot` unless `output` already shows this DOT text
+        start = time.perf_counter()
+        digest = hashlib.sha256(source).hexdigest()
+        stamp = self.stamp_path(output)
+        result = {'output': str(output), 'status': 'skipped', 'seconds': 0.0}
+        try:
+            if output.exists() and stamp.exists() and stamp.read_text(encoding='utf-8') == digest:
+                self.count('skipped')
+                if trace.verbose:
+                    trace.info(f'AST {fmt.upper()} sin cambios: {output.resolve()}')
+                return result
+            proc = subprocess.run([dot, f'-T{fmt}', '-o', str(output)], input=source, capture_output=True)
+            if proc.returncode != 0 or not output.exists():
+                raise Exception(proc.stderr.decode('utf-8', 'replace').strip() or f'dot terminó con {proc.returncode}')
+            stamp.parent.mkdir(parents=True, exist_ok=True)
+            stamp.write_text(digest, encoding='utf-8')
+            result['status'] = 'rendered'
+            self.count('rendered')
+            if trace.verbose:
+                trace.info(f'Wrote AST {fmt.upper()} to {output.resolve()}')
+        except Exception as e:
+            result['status'] = 'error'
+            result['error'] = str(e)
+            self.count('errors')
+            print(f'Error while rendering {output}:', e)
+        finally:
+            result['seconds'] = time.perf_counter() - start
+        return result
+
+    def count(self, key: str) -> None:
+        with self.lock:
+            self.stats[key] += 1
+
+    def wait(self) -> List[dict]:
+        # Block until every render submitted so far is done; their results
+        with self.lock:
+            futures, self.futures = self.futures, []
+        return [f.result() for f in futures]
+
+    def shutdown(self) -> None:
+        self.wait()
+        with self.lock:
+            if self.pool is not None:
+                self.pool.shutdown()
+                self.pool = None
+
+    def report(self) -> str:
+        s = self.stats
+        return f"render: {s['rendered']} generado(s), {s['skipped']} sin cambios, {s['errors']} con error"
+
+
+RENDERS = RenderQueue()
@@ -1,8 +1,14 @@
 from pathlib import Path
 
+from helpers import _temp_counter, new_temp
+from trace_sink import TRACE, Trace
+
 
 class SemanticContext:
     def __init__(self):
+        self.reset()
+
+    def reset(self):
         # symbols: name -> { 'tipo': str, 'valor': any }
         self.symbols = {}
         # track duplicates in declarations
@@ -17,13 +23,31 @@ class SemanticContext:
             if not line.strip():
                 continue
             # Fixed-width columns used by lexer when writing the table
+            # (line and use count follow the value; not needed here)
             name = line[0:20].strip()
             tipo = line[20:35].strip()
-            valor = line[35:].strip()
+            valor = line[35:65].strip()
             self.symbols[name] = {'tipo': tipo, 'valor': valor}
             if tipo:
                 self.declared.add(name)
 
+    def load_from_symbols(self, table):
+        # Load the in-memory SymbolTable produced by the lexer. Same semantics
+        # as load_from_table, without the text round trip. The table may be
+        # filled while parsing (token stream taps), so an untyped lexer entry
+        # never overrides a type already set by a declaration. The table
+        # has one entry per distinct name, so this is O(distinct symbols).
+        if table is None:
+            return
+        for name, entry in table.index.items():
+            tipo = entry['tipo']
+            current = self.symbols.get(name)
+            if current is not None and current.get('tipo') and not tipo:
+                continue
+            self.symbols[name] = {'tipo': tipo, 'valor': entry['valor']}
+            if tipo:
+                self.declared.add(name)
+
     def set_decl(self, name: str, dtype: str, lineno: int):
         # Duplicate definition if already declared with a type
         if name in self.declared:
@@ -41,6 +65,23 @@ class SemanticContext:
         return entry['tipo']
 
 
+class CompilationContext:
+    # Mutable state of one compilation: semantic context, temporaries
+    # counter and trace sink. The parser reaches it through `p.parser.ctx`
+    # so concurrent compilations never share declarations or temp numbers.
+    def __init__(self, sem=None, temps=None, trace=None):
+        self.sem = sem if sem is not None else SemanticContext()
+        self.temps = temps if temps is not None else {'i': 0}
+        self.trace = trace if trace is not None else Trace()
+
+    def new_temp(self):
+        return new_temp(self.temps)
+
+
 # Singleton context used by the parser
 SEM = SemanticContext()
 
+# Process-wide compilation context backed by the singletons above, used by
+# ejecutar_parser to keep its historical behaviour
+DEFAULT_CONTEXT = CompilationContext(SEM, _temp_counter, TRACE)
+
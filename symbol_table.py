@@ -0,0 +1,107 @@
+"""In-memory symbol table built by the lexer.
+
+SymbolTable keeps one entry per distinct symbol, so it grows with the
+number of different names and literals, not with the length of the
+program:
+
+    symbols    variable name -> entry (names are interned)
+    constants  constant pool, (tipo, valor) -> entry: every occurrence of
+               the same literal shares one entry named `_<valor>`
+    index      name -> entry for both, the lookup SemanticContext uses
+
+Each entry is a dict with 'nombre', 'tipo', 'valor', 'linea' (line of the
+first occurrence) and 'usos' (number of occurrences). `entries` lists them
+in order of first appearance, as the text report `tabla_simbolos.txt`
+does. When two literals of different types share a name (`1` and "1"),
+both stay in the pool and the index keeps the first one.
+"""
+import sys
+from pathlib import Path
+
+
+# Token types that produce constant entries and the data type they carry
+CONSTANT_TYPES = {
+    'N_ENTERO': 'Int',
+    'N_FLOAT': 'Float',
+    'CADENA': 'String',
+    'DATE': 'Date',
+    'DATE_CONVERTED': 'DateConverted',
+}
+
+
+class SymbolTable:
+    def __init__(self):
+        # entries: distinct entries in order of first appearance
+        self.entries = []
+        self.symbols = {}
+        self.constants = {}
+        self.index = {}
+
+    def new_entry(self, nombre: str, tipo: str, valor, linea: int) -> dict:
+        entry = {'nombre': nombre, 'tipo': tipo, 'valor': valor, 'linea': linea, 'usos': 1}
+        self.entries.append(entry)
+        self.index.setdefault(nombre, entry)
+        return entry
+
+    def add(self, nombre: str, linea: int = 0) -> dict:
+        # Variable occurrence: O(1), one entry per name
+        entry = self.symbols.get(nombre)
+        if entry is not None:
+            entry['usos'] += 1
+            return entry
+        nombre = sys.intern(nombre)
+        entry = self.symbols[nombre] = self.new_entry(nombre, '', '', linea)
+        return entry
+
+    def add_constant(self, tipo: str, valor, linea: int = 0) -> dict:
+        # Literal occurrence: O(1), one pool entry per (tipo, valor)
+        key = (tipo, valor)
+        entry = self.constants.get(key)
+        if entry is not None:
+            entry['usos'] += 1
+            return entry
+        entry = self.constants[key] = self.new_entry(sys.intern(f'_{valor}'), tipo, valor, linea)
+        return entry
+
+    def add_lexeme(self, tipo: str, valor, linea: int = 0):
+        # Guardar variables (solo nombre)
+        if tipo == 'VARIABLE':
+            return self.add(valor, linea)
+        # Guardar constantes (nombre, tipo, valor)
+        if tipo in CONSTANT_TYPES:
+            return self.add_constant(CONSTANT_TYPES[tipo], valor, linea)
+        return None
+
+    def add_token(self, token):
+        self.add_lexeme(token.type, token.value, token.lineno)
+
+    def get(self, nombre: str):
+        return self.index.get(nombre)
+
+    def constant(self, tipo: str, valor):
+        return self.constants.get((tipo, valor))
+
+    def __contains__(self, nombre: str) -> bool:
+        return nombre in self.index
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def occurrences(self) -> int:
+        # Symbol occurrences seen by the lexer (sum of the use counts)
+        return sum(entry['usos'] for entry in self.entries)
+
+    def write_report(self, path: Path):
+        # Fixed-width text report (the columns of the original
+        # resources/tabla_simbolos.txt plus first line and use count).
+        # Only written on request.
+        path = Path(path)
+        with path.open('w', encoding='utf-8') as f:
+            f.write(f"{'Nombre':<20}{'Tipo de Dato':<15}{'Valor':<30}{'Línea':>6}{'Usos':>6}\n")
+            f.write('-' * 77 + '\n')
+            for entry in self.entries:
+                f.write(f"{entry['nombre']:<20}{entry['tipo']:<15}{str(entry['valor']):<30}"
+                        f"{entry['linea']:>6}{entry['usos']:>6}\n")
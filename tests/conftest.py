@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The compiler modules live at the top of the repository and the shared
+# workloads and lexer corpora under benchmarks/
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
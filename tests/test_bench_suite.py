@@ -0,0 +1,31 @@
+"""bench_suite says when there is no baseline to compare against.
+
+No baseline is committed (timings depend on the machine): without one the
+suite prints that nothing was compared, and --save-baseline creates the
+file the next runs compare with.
+"""
+import bench_suite
+from workloads import arithmetic_program
+
+
+def run(monkeypatch, capsys, *argv):
+    monkeypatch.setattr(bench_suite, 'WORKLOADS', {'sentencias': lambda scale: arithmetic_program(20 * scale)})
+    status = bench_suite.main(['--repeat', '1', *argv])
+    return status, capsys.readouterr().out.splitlines()[-1]
+
+
+def test_missing_baseline_is_reported(monkeypatch, capsys, tmp_path):
+    baseline = tmp_path / 'baseline.json'
+    status, last = run(monkeypatch, capsys, '--baseline', str(baseline))
+    assert status == 0
+    assert last == f'sin referencia en {baseline}: no se comparo nada (guardarla primero con --save-baseline)'
+    assert not baseline.exists()
+
+
+def test_saved_baseline_is_compared(monkeypatch, capsys, tmp_path):
+    baseline = tmp_path / 'baseline.json'
+    run(monkeypatch, capsys, '--baseline', str(baseline), '--save-baseline')
+    assert baseline.exists()
+    status, last = run(monkeypatch, capsys, '--baseline', str(baseline), '--min-seconds', '10', '--min-kb', '1e6')
+    assert status == 0
+    assert last == 'sin regresiones (umbral 25%)'
@@ -0,0 +1,90 @@
+"""A cached compilation writes the same outputs as an uncached one.
+
+Every output (DOT, saved AST, IR listing, asm) of compile_source without a
+cache is compared with the outputs of the same compilation through a
+CompileCache, on the miss that stores the entry and on the hit that reads
+it back. The DOT shows the tree as parsed, before constant folding.
+Deeply nested programs are stored and loaded as well (the trees of an
+entry do not go through pickle's recursion, see tests/test_deep_nesting.py).
+"""
+from pathlib import Path
+
+import pytest
+
+from ast_exporter import ASTDotExporter
+from batch import compile_batch
+from compile_cache import CompileCache
+from compiler import CompileOptions, compile_source
+from workloads import arithmetic_program, equal_expressions_program, nested_program
+
+RESOURCES = Path(__file__).resolve().parent.parent / 'resources'
+
+FOLDABLE = '''init {
+    a, b : Int
+    e : Bool
+}
+a := 10 - 2 * 3
+b := a - (4 + 1)
+e := equalExpressions(1 + 1, 2, a)
+'''
+
+PROGRAMS = [
+    pytest.param((RESOURCES / 'prueba.txt').read_text(encoding='utf-8'), id='prueba'),
+    pytest.param(FOLDABLE, id='plegable'),
+    pytest.param(arithmetic_program(50), id='aritmetica'),
+    pytest.param(equal_expressions_program(20, constant=True), id='equal-expressions'),
+]
+
+OUTPUTS = ('dot', 'ast', 'ir', 'asm')
+
+# Nesting depth well past Python's default recursion limit
+DEPTH = 3000
+
+
+def compile_to(text: str, out: Path, opt_level: int, cache=None):
+    out.mkdir()
+    options = CompileOptions(dot_path=out / 'p.dot', ast_path=out / 'p.ast', ir_path=out / 'p.ir',
+                             asm_path=out / 'p.asm', opt_level=opt_level, cache=cache)
+    result = compile_source(text, options)
+    return result, {name: (out / f'p.{name}').read_bytes() for name in OUTPUTS}
+
+
+@pytest.mark.parametrize('opt_level', [0, 2])
+@pytest.mark.parametrize('text', PROGRAMS)
+def test_cached_outputs_match_uncached(text, opt_level, tmp_path):
+    result, expected = compile_to(text, tmp_path / 'directo', opt_level)
+    cache = CompileCache(tmp_path / 'cache')
+    miss, stored = compile_to(text, tmp_path / 'miss', opt_level, cache)
+    hit, loaded = compile_to(text, tmp_path / 'hit', opt_level, cache)
+    assert not miss.cached and hit.cached
+    assert stored == expected
+    assert loaded == expected
+    assert expected['dot'].decode('utf-8') == ASTDotExporter().to_dot(result.parsed)
+
+
+def test_dot_shows_the_tree_before_folding(tmp_path):
+    result, outputs = compile_to(FOLDABLE, tmp_path / 'directo', 0)
+    assert result.ast is not result.parsed
+    assert outputs['dot'].decode('utf-8') != ASTDotExporter().to_dot(result.ast)
+
+
+@pytest.mark.parametrize('kind', ['if', 'while'])
+def test_deep_programs_are_cached(kind, tmp_path):
+    text = nested_program(DEPTH, kind)
+    result, expected = compile_to(text, tmp_path / 'directo', 2)
+    cache = CompileCache(tmp_path / 'cache')
+    miss, stored = compile_to(text, tmp_path / 'miss', 2, cache)
+    hit, loaded = compile_to(text, tmp_path / 'hit', 2, cache)
+    assert not miss.cached and hit.cached
+    assert stored == expected
+    assert loaded == expected
+    assert hit.ast.to_string() == result.ast.to_string()
+
+
+def test_deep_program_in_cached_batch(tmp_path):
+    source = tmp_path / 'anidado.txt'
+    source.write_text(nested_program(DEPTH, 'while'), encoding='utf-8')
+    for _ in range(2):
+        batch = compile_batch([str(source)], tmp_path / 'build', jobs=1, use_cache=True, cache_dir=tmp_path / 'cache')
+        assert [(r['status'], r['diagnostics']) for r in batch['results']] == [('ok', [])]
+    assert batch['results'][0]['cache'] == 'hit'
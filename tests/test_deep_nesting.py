@@ -0,0 +1,70 @@
+"""Deeply nested programs go through every stage without recursion.
+
+The parser and the DOT exporter never recursed; these tests keep the
+later stages (constant folding, quadruples, AST passes, assembler) that
+way. 3000
+nested blocks are well past Python's default recursion limit.
+"""
+import pytest
+
+from compiler import CompileOptions, compile_source, parse
+from constant_folding import ConstantFolder
+from semantic_context import CompilationContext
+from trace_sink import Trace
+from workloads import nested_program
+
+DEPTH = 3000
+
+
+def parse_only(text: str):
+    ctx = CompilationContext(trace=Trace())
+    return parse(text, CompileOptions(fold=False), ctx)[0], ctx
+
+
+@pytest.mark.parametrize('kind', ['if', 'while'])
+def test_fold_deep_blocks(kind):
+    ast, ctx = parse_only(nested_program(DEPTH, kind))
+    folder = ConstantFolder(ctx.sem)
+    assert folder.fold(ast) is ast
+    assert folder.folded == 0
+
+
+def test_fold_deep_constant_expression():
+    # 1 + (1 + (1 + ...)) folds to a single literal
+    text = 'init {\n    a : Int\n}\na := ' + '1 + (' * DEPTH + '1' + ')' * DEPTH + '\n'
+    ast, ctx = parse_only(text)
+    folder = ConstantFolder(ctx.sem)
+    folded = folder.fold(ast)
+    assert folder.folded == DEPTH
+    assert folded.children[0].children[1].nodetype == str(DEPTH + 1)
+
+
+@pytest.mark.parametrize('naive', [False, True])
+@pytest.mark.parametrize('kind', ['if', 'while'])
+def test_lower_deep_blocks(kind, naive, tmp_path):
+    result = compile_source(nested_program(DEPTH, kind),
+                            CompileOptions(ir_path=tmp_path / 'p.ir', asm_path=tmp_path / 'p.asm', naive_asm=naive))
+    # one comparison and one branch per block (plus the loop branch)
+    branches = sum(1 for op, *_ in result.ir if op in ('BLE', 'BGE', 'BI'))
+    assert branches == DEPTH * (2 if kind == 'while' else 1)
+    assert result.asm.count('ET_') >= DEPTH
+
+
+@pytest.mark.parametrize('kind', ['if', 'while'])
+def test_optimize_deep_blocks(kind, tmp_path):
+    # `b` is never read: -O2 removes its store from the register asm, and
+    # with it every `if` left empty (a `while` may not end, so it stays)
+    result = compile_source(nested_program(DEPTH, kind), CompileOptions(asm_path=tmp_path / 'p.asm', opt_level=2))
+    assert '_b, ' not in result.asm
+    if kind == 'while':
+        assert result.asm.count('ET_') >= DEPTH
+    else:
+        assert 'ET_' not in result.asm
+
+
+def test_quadruples_deep_expression():
+    text = 'init {\n    a : Int\n}\na := ' + 'a + (' * DEPTH + '1' + ')' * DEPTH + '\n'
+    result = compile_source(text)
+    ops = [op for op, *_ in result.ir]
+    assert ops.count('+') == DEPTH
+    assert ops[-1] == ':='
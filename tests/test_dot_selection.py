@@ -0,0 +1,114 @@
+"""--dot-statement / --dot-lines select whole top-level statements.
+
+A block statement (IF, While) spans from its keyword to its closing brace,
+so any line inside the block, nested blocks included, selects the
+statement. The selection is made before the DOT file is opened: a range
+with no statement raises and leaves the previous file untouched, with and
+without the compilation cache. Malformed --dot-lines values are rejected
+by argparse.
+"""
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+from ast_exporter import ASTDotExporter, SubtreeDotExporter, select_statements, subtree_stats
+from ast_serializer import from_bytes, from_json, to_bytes, to_json
+from compile_cache import CompileCache
+from compiler import CompileOptions, compile_source, parse
+from semantic_context import CompilationContext
+from trace_sink import Trace
+
+ROOT = Path(__file__).resolve().parent.parent
+
+NESTED = '''init {
+    a : Int
+}
+a := 1
+while (a < 10) {
+    if (a > 5) {
+        write("mayor")
+    } else {
+        a := a + 1
+    }
+    a := a + 2
+}
+write("fin")
+'''
+
+PROGRAMS = [
+    pytest.param((ROOT / 'resources' / 'prueba.txt').read_text(encoding='utf-8'), id='prueba'),
+    pytest.param(NESTED, id='anidado'),
+]
+
+
+def parsed(text: str):
+    ast, _, _ = parse(text, CompileOptions(), CompilationContext(trace=Trace()))
+    return ast
+
+
+def load_cli():
+    spec = importlib.util.spec_from_file_location('lyc_compiler', ROOT / 'lyc-compiler.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_block_statements_span_to_closing_brace():
+    ast = parsed(NESTED)
+    spans = [(s.nodetype, subtree_stats(s)[id(s)][1:]) for s in ast.children]
+    assert spans == [(':=', (4, 4)), ('While', (5, 12)), ('WRITE', (13, 13))]
+    inner = ast.children[1].children[1].children[0]
+    assert (inner.nodetype, inner.lineno, inner.end) == ('IF', 6, 10)
+
+
+@pytest.mark.parametrize('text', PROGRAMS)
+def test_every_line_selects_its_statement(text):
+    ast = parsed(text)
+    stats = subtree_stats(ast)
+    for s in ast.children:
+        _, first, last = stats[id(s)]
+        for line in range(first, last + 1):
+            assert select_statements(ast, lines=(line, line)) == [s]
+
+
+def test_range_selects_every_statement_it_touches():
+    ast = parsed(NESTED)
+    assert select_statements(ast, lines=(11, 13)) == list(ast.children[1:])
+    assert SubtreeDotExporter(lines=(8, 8)).to_dot(ast) == SubtreeDotExporter(index=1).to_dot(ast)
+
+
+@pytest.mark.parametrize('save, load', [
+    pytest.param(to_bytes, from_bytes, id='binario'),
+    pytest.param(to_json, from_json, id='json'),
+])
+def test_serialized_ast_keeps_closing_lines(save, load):
+    ast = parsed(NESTED)
+    loaded = load(save(ast))
+    assert [subtree_stats(s)[id(s)] for s in loaded.children] == [subtree_stats(s)[id(s)] for s in ast.children]
+
+
+@pytest.mark.parametrize('cached', [False, True], ids=['sin-cache', 'con-cache'])
+def test_failed_selection_leaves_dot_untouched(cached, tmp_path):
+    dot_path = tmp_path / 'p.dot'
+    cache = CompileCache(tmp_path / 'cache') if cached else None
+    compile_source(NESTED, CompileOptions(dot_path=dot_path, cache=cache))
+    before = dot_path.read_text(encoding='utf-8')
+    assert before == ASTDotExporter().to_dot(parsed(NESTED))
+    options = CompileOptions(dot_path=dot_path, cache=cache, dot_exporter=SubtreeDotExporter(lines=(40, 50)))
+    with pytest.raises(Exception, match='Ninguna sentencia entre las líneas 40 y 50'):
+        compile_source(NESTED, options)
+    assert dot_path.read_text(encoding='utf-8') == before
+
+
+@pytest.mark.parametrize('value, lines', [('18-21', (18, 21)), ('20', (20, 20))])
+def test_dot_lines_argument(value, lines):
+    assert load_cli().parse_args(['--dot-lines', value]).dot_lines == lines
+
+
+@pytest.mark.parametrize('value', ['x', '3-', '-3', '5-2', '0-4'])
+def test_dot_lines_argument_rejected(value, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        load_cli().parse_args(['--dot-lines', value])
+    assert exit_info.value.code == 2
+    assert 'rango de lineas invalido' in capsys.readouterr().err
@@ -0,0 +1,77 @@
+"""IncrementalParser.program() matches a full parse, line numbers included.
+
+Edits that add or remove lines move the statements below them. Their
+nodes are rebuilt with the new lines instead of being changed in place,
+so an AST returned before an edit keeps the lines it had.
+"""
+import pytest
+
+from ast_node import TRUE, ASTNode
+from compiler import CompileOptions, parse
+from incremental import IncrementalParser, reline
+from semantic_context import CompilationContext
+from trace_sink import Trace
+
+PROGRAM = '''init {
+    a, b : Int
+    e : Bool
+}
+a := 1
+if (e) {
+    b := 2
+    write("positivo")
+}
+while (a < 10) {
+    a := a + 1
+}
+b := a * 2
+'''
+
+
+def lines(ast):
+    # (nodetype, lineno, end) of every node, in preorder
+    out = []
+    stack = [ast]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ASTNode):
+            out.append((node.nodetype, node.lineno, node.end))
+            stack.extend(reversed(node.children))
+    return out
+
+
+def full_parse(text: str):
+    ast, _, _ = parse(text, CompileOptions(), CompilationContext(trace=Trace()))
+    return ast
+
+
+@pytest.mark.parametrize('anchor, replacement', [
+    pytest.param('a := 1\n', 'a := 1\n\n\n', id='agregar-lineas'),
+    pytest.param('if', '\n\nif', id='lineas-antes-del-if'),
+    pytest.param('    b := 2\n', '', id='quitar-linea'),
+    pytest.param('b := a * 2', 'b := a * 2\nwrite("fin")', id='nueva-sentencia'),
+])
+def test_lines_match_full_parse(anchor, replacement):
+    inc = IncrementalParser(PROGRAM)
+    before = inc.program()
+    expected_before = lines(before)
+    start = PROGRAM.index(anchor)
+    inc.edit(start, start + len(anchor), replacement)
+    after = inc.program()
+    assert lines(after) == lines(full_parse(inc.text))
+    # The AST of the previous text is left as it was
+    assert lines(before) == expected_before
+    assert expected_before == lines(full_parse(PROGRAM))
+
+
+def test_reline_copies_nodes_and_keeps_shared_leaves():
+    ast = full_parse(PROGRAM)
+    statement = ast.children[1]
+    moved, = reline([statement], 3)
+    assert moved is not statement
+    assert (statement.lineno, statement.end) == (6, 9)
+    assert (moved.lineno, moved.end) == (9, 12)
+    assert moved.to_string() == statement.to_string()
+    # The condition `e` is `e == true`: the shared leaf is reused
+    condition = moved.children[0]
+    assert condition.children[1] is TRUE
@@ -0,0 +1,54 @@
+"""The bulk and chunked lexers produce the same tokens as the PLY lexer.
+
+Tokens are compared as (type, value, lineno, lexpos), and a lexical error
+as its message, over the edge cases of the lexer benchmarks, the sample
+programs and generated workloads. The chunked lexer is run with several
+chunk sizes, so tokens, comments and multi-byte characters cross the
+buffer cuts.
+"""
+from pathlib import Path
+
+import pytest
+
+from bench_chunked import CHUNK_CASES, CHUNK_SIZES, chunked_tokens
+from bench_lexer import EDGE_CASES, bulk_tokens, ply_tokens
+from workloads import (arithmetic_program, equal_expressions_program, init_program, nested_program,
+                       strings_program)
+
+RESOURCES = Path(__file__).resolve().parent.parent / 'resources'
+SAMPLES = ('prueba', 'lexer_test', 'parser_test', 'assembler_test')
+
+PROGRAMS = [pytest.param(text, id=f'borde-{i}') for i, text in enumerate(EDGE_CASES + CHUNK_CASES)]
+PROGRAMS += [pytest.param((RESOURCES / f'{name}.txt').read_text(encoding='utf-8'), id=name) for name in SAMPLES]
+PROGRAMS += [
+    pytest.param(arithmetic_program(200), id='aritmetica'),
+    pytest.param(nested_program(40), id='if-anidados'),
+    pytest.param(init_program(200), id='init'),
+    pytest.param(equal_expressions_program(100), id='equal-expressions'),
+    pytest.param(strings_program(50), id='cadenas'),
+]
+
+
+@pytest.mark.parametrize('text', PROGRAMS)
+def test_bulk_lexer_matches_ply(text):
+    assert bulk_tokens(text) == ply_tokens(text)
+
+
+@pytest.mark.parametrize('chunk_size', CHUNK_SIZES)
+@pytest.mark.parametrize('text', PROGRAMS)
+def test_chunked_lexer_matches_ply(text, chunk_size, tmp_path):
+    path = tmp_path / 'programa.txt'
+    path.write_text(text, encoding='utf-8')
+    assert chunked_tokens(path, chunk_size) == ply_tokens(text)
+
+
+def test_chunked_lexer_comment_closed_past_the_cut(tmp_path):
+    # The comment closes after the cut of the buffer where it opened and a
+    # later `+#` sits inside a string
+    text = 'init {\n c : String\n}\n#+ nota\n fin +# c := "a"\nwrite("uso +# aqui")\n'
+    path = tmp_path / 'programa.txt'
+    path.write_text(text, encoding='utf-8')
+    expected = ply_tokens(text)
+    assert expected[-1][0] != 'error'
+    for chunk_size in range(1, len(text) + 2):
+        assert chunked_tokens(path, chunk_size) == expected, chunk_size
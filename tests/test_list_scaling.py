@@ -0,0 +1,121 @@
+"""Long lists parse in linear time with a flat parser stack.
+
+list_expressions and lista_variables used to be right-recursive. The
+reference parser here is built from the same grammar with those two
+rules right-recursive again (as in the original grammar); its actions
+build cons cells that the consuming rules flatten, so it stays linear
+too and can parse the same 100k-item lists. Both parsers must give the
+same DOT and the same declarations, and the parser in use must keep its
+symbol stack depth independent of the list length.
+"""
+import copy
+import types
+
+import pytest
+
+import parser as lyc_parser
+from ast_exporter import ASTDotExporter
+from lexer import lexer as base_lexer, token_stream
+from parser_cache import build_parser
+from semantic_context import CompilationContext
+from trace_sink import Trace
+from workloads import arithmetic_program, equal_expressions_program, init_program
+
+ITEMS = 100_000
+
+
+def flatten(cells):
+    # (head, tail) cells of the reference parser -> list
+    out = []
+    while isinstance(cells, tuple):
+        head, cells = cells
+        out.append(head)
+    if cells is not None:
+        out.append(cells)
+    return out
+
+
+def p_list_expressions(p):
+    '''list_expressions : expresion SEPARADOR_VARIABLES list_expressions
+                        | expresion
+    '''
+    p[0] = (p[1], p[3]) if len(p) == 4 else (p[1], None)
+
+
+def p_lista_variables(p):
+    '''lista_variables : VARIABLE SEPARADOR_VARIABLES lista_variables
+                       | VARIABLE
+    '''
+    p[0] = (p[1], p[3]) if len(p) == 4 else p[1]
+
+
+def consuming(rule, index):
+    # `rule` with its list argument p[index] flattened first, kept at the
+    # line of `rule` so PLY orders the productions as in parser.py
+    def action(p):
+        if isinstance(p[index], tuple):
+            p[index] = flatten(p[index])
+        rule(p)
+    action.__doc__ = rule.__doc__
+    action.co_firstlineno = rule.__code__.co_firstlineno
+    return action
+
+
+def at_line_of(action, rule):
+    action.co_firstlineno = rule.__code__.co_firstlineno
+    return action
+
+
+@pytest.fixture(scope='module')
+def right_recursive(tmp_path_factory):
+    module = types.ModuleType('right_recursive_parser')
+    module.__file__ = __file__
+    for name in ('tokens', 'precedence', 'start'):
+        if hasattr(lyc_parser, name):
+            setattr(module, name, getattr(lyc_parser, name))
+    for name in dir(lyc_parser):
+        if name.startswith('p_'):
+            setattr(module, name, getattr(lyc_parser, name))
+    module.p_list_expressions = at_line_of(p_list_expressions, lyc_parser.p_list_expressions)
+    module.p_lista_variables = at_line_of(p_lista_variables, lyc_parser.p_lista_variables)
+    module.p_equal_expressions = consuming(lyc_parser.p_equal_expressions, 3)
+    module.p_linea_declaracion = consuming(lyc_parser.p_linea_declaracion, 1)
+    # Own cache directory: a new grammar hash drops the cached tables of
+    # other grammars
+    return build_parser(module, cache_dir=tmp_path_factory.mktemp('lalr'))
+
+
+def parse(parser, text: str):
+    # (DOT, declarations, max symbol stack depth) of `text`
+    ctx = CompilationContext(trace=Trace())
+    parser = copy.copy(parser)
+    parser.ctx, parser.sem, parser.trace = ctx, ctx.sem, ctx.trace
+    depth = {'max': 0}
+
+    def sample(_tok):
+        depth['max'] = max(depth['max'], len(getattr(parser, 'symstack', ())))
+
+    ast = parser.parse(lexer=token_stream(text, taps=[sample], lexer=base_lexer.clone()))
+    declared = [(name, ctx.sem.symbols[name]['tipo']) for name in ctx.sem.symbols]
+    return ASTDotExporter().to_dot(ast), declared, depth['max']
+
+
+@pytest.mark.parametrize('program', [
+    pytest.param(lambda n: equal_expressions_program(n, constant=True), id='equalExpressions'),
+    pytest.param(lambda n: init_program(n, n), id='init-una-linea'),
+])
+def test_long_lists_match_right_recursive_grammar(program, right_recursive):
+    text = program(ITEMS)
+    dot, declared, depth = parse(lyc_parser.new_parser(CompilationContext(trace=Trace())), text)
+    expected_dot, expected_declared, expected_depth = parse(right_recursive, text)
+    assert dot == expected_dot
+    assert declared == expected_declared
+    # The right-recursive stack holds the whole list; ours does not grow
+    assert expected_depth > ITEMS
+    assert depth < 20
+
+
+def test_statement_list_keeps_stack_flat():
+    dot, _, depth = parse(lyc_parser.new_parser(CompilationContext(trace=Trace())), arithmetic_program(ITEMS))
+    assert dot.count(' -> ') > ITEMS
+    assert depth < 20
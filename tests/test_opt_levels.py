@@ -0,0 +1,122 @@
+"""Which outputs the optimization levels change.
+
+The IR passes rewrite the quadruples, so they change the IR listing and
+the naive asm (lowered from the quadruples). The default register asm is
+lowered from the AST: ast_passes applies the same passes to it, and from
+-O1 on the peephole optimizer runs as well. With every pass disabled only
+the peephole remains.
+"""
+import pytest
+
+from asm_generator import AsmGenerator
+from compiler import CompileOptions, compile_source
+from ast_passes import AstPass
+from ir_passes import PASSES, Pass
+from peephole import PeepholeOptimizer
+
+# a copy to propagate, a constant branch and a loop
+PROGRAM = '''init {
+    a, b : Int
+}
+a := b + 2
+if (1 > 2) {
+    b := a * 3
+}
+while (a < b) {
+    a := a + 1
+}
+'''
+
+# `c` is never read: both stores to it go, and then the store to `a`
+DEAD_STORE = '''init {
+    a, c : Int
+}
+a := 1
+c := a + 1
+c := 2
+write("fin")
+'''
+
+# only the else branch can run; the loop never starts
+CONSTANT_BRANCH = '''init {
+    a : Int
+}
+a := 1
+if (1 > 2 or 3 < 2) {
+    write("nunca")
+} else {
+    write("siempre")
+}
+while (not 2 > 1) {
+    a := a + 1
+}
+write("fin")
+'''
+
+
+def compile_at(opt_level, naive=False, disabled=(), program=PROGRAM):
+    return compile_source(program, CompileOptions(opt_level=opt_level, naive_asm=naive, disabled_passes=disabled))
+
+
+def asm_of(opt_level, naive=False, disabled=(), program=PROGRAM, *, tmp_path):
+    path = tmp_path / f'O{opt_level}-{naive}-{len(disabled)}.asm'
+    compile_source(program, CompileOptions(asm_path=path, opt_level=opt_level, naive_asm=naive,
+                                           disabled_passes=disabled))
+    return path.read_text(encoding='utf-8')
+
+
+def peephole_only(program):
+    # Register asm of `program` with no AST pass, through the peephole
+    result = compile_at(0, program=program)
+    gen = AsmGenerator(result.sem)
+    return gen.render(PeepholeOptimizer().run(gen.generate(result.ast, result.ir)))
+
+
+def test_passes_change_the_quadruples():
+    o0, o2 = compile_at(0).ir, compile_at(2).ir
+    assert len(o2) < len(o0)
+    assert 'CMP, 1, 2' in o0.listing() and 'CMP, 1, 2' not in o2.listing()
+
+
+def test_passes_change_the_naive_asm(tmp_path):
+    assert asm_of(2, naive=True, tmp_path=tmp_path) != asm_of(2, naive=True, disabled=tuple(PASSES),
+                                                                tmp_path=tmp_path)
+
+
+def test_dead_stores_change_the_register_asm(tmp_path):
+    o1 = asm_of(1, program=DEAD_STORE, tmp_path=tmp_path)
+    assert o1 != asm_of(0, program=DEAD_STORE, tmp_path=tmp_path)
+    assert '_c, ' not in o1 and '_a, ' not in o1
+    assert o1 == asm_of(2, program=DEAD_STORE, tmp_path=tmp_path)
+    assert asm_of(1, disabled=('dead-stores',), program=DEAD_STORE, tmp_path=tmp_path) == peephole_only(DEAD_STORE)
+
+
+def test_constant_branches_change_the_register_asm(tmp_path):
+    o2 = asm_of(2, program=CONSTANT_BRANCH, tmp_path=tmp_path)
+    assert o2 != asm_of(1, program=CONSTANT_BRANCH, tmp_path=tmp_path)
+    assert 'cmp' not in o2 and 'JMP' not in o2 and '"nunca"' not in o2
+    assert '"siempre"' in o2
+    disabled = asm_of(2, disabled=('constant-branches',), program=CONSTANT_BRANCH, tmp_path=tmp_path)
+    assert disabled == peephole_only(CONSTANT_BRANCH)
+
+
+def test_ast_passes_leave_the_result_ast(tmp_path):
+    # compile_source returns the folded AST, before the AST passes
+    assert compile_at(2, program=CONSTANT_BRANCH).ast.to_string() == \
+        compile_at(0, program=CONSTANT_BRANCH).ast.to_string()
+
+
+@pytest.mark.parametrize('opt_level', [1, 2])
+def test_register_asm_with_every_pass_disabled_is_the_peephole(opt_level, tmp_path):
+    assert asm_of(opt_level, disabled=tuple(PASSES), tmp_path=tmp_path) == peephole_only(PROGRAM)
+
+
+def test_register_asm_from_o1_is_the_peephole_of_o0(tmp_path):
+    # every variable of PROGRAM is read: -O1 has no store to remove
+    assert asm_of(1, tmp_path=tmp_path) == peephole_only(PROGRAM)
+
+
+@pytest.mark.parametrize('base', [Pass, AstPass])
+def test_pass_is_abstract(base):
+    with pytest.raises(TypeError):
+        base()
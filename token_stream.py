@@ -0,0 +1,44 @@
+"""Single-pass token stream shared by every consumer of the lexer.
+
+TokenStream wraps the PLY lexer and exposes the `input()`/`token()` pair
+that `parser.parse(lexer=...)` expects, so the parser pulls tokens straight
+from it. Every token handed out is also passed to the registered taps
+(symbol table collection, token dump, counters...), which means the source
+is tokenized exactly once and all consumers see the same tokens.
+"""
+from typing import Any, Callable, Iterable
+
+
+class TokenStream:
+    def __init__(self, lexer: Any, taps: Iterable[Callable] = ()):
+        self.lexer = lexer
+        self.taps = list(taps)
+        self.count = 0
+
+    def add_tap(self, tap: Callable) -> None:
+        self.taps.append(tap)
+
+    def input(self, code: str) -> None:
+        # Start a new source; line numbers restart at 1
+        self.lexer.input(code)
+        self.lexer.lineno = 1
+        self.count = 0
+
+    def token(self):
+        tok = self.lexer.token()
+        if tok is not None:
+            self.count += 1
+            for tap in self.taps:
+                tap(tok)
+        return tok
+
+    @property
+    def lineno(self) -> int:
+        return self.lexer.lineno
+
+    def __iter__(self):
+        while True:
+            tok = self.token()
+            if tok is None:
+                return
+            yield tok
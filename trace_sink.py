@@ -0,0 +1,99 @@
+"""Level-based trace sink for the lexer and the grammar actions.
+
+Grammar actions guard every message with `if p.parser.trace.on:`, the
+Trace of the compilation context the parser is bound to (the process-wide
+TRACE for ejecutar_parser, a per-compilation Trace for compile_source), so
+a disabled trace costs a single attribute check per reduction: the message
+is not even formatted. Levels are cumulative:
+
+    off          nothing is written
+    productions  one line per reduction
+    tokens       productions plus one line per token
+    verbose      tokens plus informational messages (cache, output files)
+
+Output goes to any file-like sink (stdout by default, a file, or an
+in-memory buffer), and per-production reduction counters can be kept and
+dumped at the end of a run.
+"""
+import io
+import sys
+from collections import Counter
+from typing import Optional, TextIO
+
+OFF = 0
+PRODUCTIONS = 1
+TOKENS = 2
+VERBOSE = 3
+
+LEVELS = {
+    'off': OFF,
+    'productions': PRODUCTIONS,
+    'tokens': TOKENS,
+    'verbose': VERBOSE,
+}
+
+
+class Trace:
+    def __init__(self, level=OFF, sink: Optional[TextIO] = None, count: bool = False):
+        self.counts = Counter()
+        self.configure(level, sink, count)
+
+    def configure(self, level=None, sink: Optional[TextIO] = None, count: Optional[bool] = None) -> None:
+        # Change level/sink/counting; omitted arguments keep their value.
+        # The boolean flags are precomputed so hot paths only read them.
+        if level is not None:
+            self.level = LEVELS[level] if isinstance(level, str) else level
+        if sink is not None:
+            self.sink = sink
+        elif not hasattr(self, 'sink'):
+            self.sink = sys.stdout
+        if count is not None:
+            self.count = count
+        self.productions = self.level >= PRODUCTIONS
+        self.tokens = self.level >= TOKENS
+        self.verbose = self.level >= VERBOSE
+        # `on` is what grammar actions check before building a message
+        self.on = self.productions or self.count
+
+    def to_file(self, path, level=None) -> TextIO:
+        # Send the trace to `path`; the caller closes the returned handle
+        f = open(path, 'w', encoding='utf-8')
+        self.configure(level, f)
+        return f
+
+    def to_buffer(self, level=None) -> io.StringIO:
+        # Send the trace to an in-memory buffer and return it
+        buf = io.StringIO()
+        self.configure(level, buf)
+        return buf
+
+    def production(self, msg: str) -> None:
+        if self.count:
+            self.counts[msg] += 1
+        if self.productions:
+            self.sink.write(msg + '\n')
+
+    def token(self, token) -> None:
+        # Usable as a TokenStream tap
+        if self.tokens:
+            self.sink.write(f'TOKEN: {token.type} LEXEMA: {token.value}\n')
+
+    def info(self, msg: str) -> None:
+        if self.verbose:
+            self.sink.write(msg + '\n')
+
+    def reset_counts(self) -> None:
+        self.counts = Counter()
+
+    def dump_counts(self, out: Optional[TextIO] = None) -> None:
+        # Write the reduction counters, most frequent first
+        out = out or self.sink
+        total = sum(self.counts.values())
+        out.write(f"{'Reducciones':>12}  Produccion\n")
+        for msg, n in self.counts.most_common():
+            out.write(f'{n:>12}  {msg}\n')
+        out.write(f'{total:>12}  TOTAL\n')
+
+
+# Process-wide trace used by the lexer and parser (disabled by default)
+TRACE = Trace()